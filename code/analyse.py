@@ -1,17 +1,80 @@
-import copy
+import sys
+import datetime as date
+from collections import namedtuple
 
 from db import DB
+from period import Period
+from rebuild import Rebuild
+
+
+# The rows yielded by the Analysis class.
+HabitRow = namedtuple("HabitRow", ["name", "start_date", "valid_till", "periodicity", "status", "current_streak",
+                                   "longest_streak", "break_count", "last_break", "last_check_day",
+                                   "last_check_week"])
+PeriodicityRow = namedtuple("PeriodicityRow", ["name", "periodicity", "status"])
+StreakRow = namedtuple("StreakRow", ["name", "status", "longest_streak"])
+ActionRow = namedtuple("ActionRow", ["name", "checked_off", "date"])
+StruggleRow = namedtuple("StruggleRow", ["name", "completed", "missed", "miss_rate"])
+RankingRow = namedtuple("RankingRow", ["name", "completed", "missed", "miss_rate", "breaks", "longest_gap"])
+LeaderRow = namedtuple("LeaderRow", ["habit_id", "name", "status", "periodicity", "current_streak",
+                                     "longest_streak"])
+EventRow = namedtuple("EventRow", ["name", "kind", "date", "checked_off", "logged_at"])
+AsOfRow = namedtuple("AsOfRow", ["name", "date", "status", "current_streak", "longest_streak", "break_count",
+                                 "last_break"])
 
 
 class Analysis:
     """The Analysis class consists of essential methods for analysing the Habit data.
 
+    The iter_* methods yield the rows as named tuples, fetching them from the database in chunks, so the memory doesn't
+    grow with the size of the result. The other methods print the rows with render() and return them as a list.
+
     Methods:
+        all_habits(db): Prints and returns a list of all habits, in spite of their status.
         currently_tracked_habits(db): Prints and returns a list of all currently tracked habits.
         same_periodicity_habits(db): Prints and returns a list of all habits with the same periodicity.
         habits_longest_streak(db): Prints and returns the longest run streak of all defined habits.
         given_habits_longest_streak(db, habit: str = None): Prints and returns the longest run streak for a given habit.
+        leaderboard(db, by="longest_streak", status=None, periodicity=None, after=None, limit=20): Prints and returns a
+        page of the habits with the longest streaks.
+        all_actions(db, name): Prints and returns all actions' history of a certain habit.
+        struggled_most(db, start=None, end=None, limit=None): Prints and returns the habits ranked by their miss rate.
+        struggle_ranking(db, start=None, end=None, limit=None): Prints and returns the habits ranked by their misses,
+        breaks and longest gaps computed from the Tracker table.
+        streak_as_of(db, name, day): Prints and returns the streak data of a habit as they were at the end of the day.
+        iter_all_habits(db, size=1000): Yields all habits, in spite of their status.
+        iter_currently_tracked_habits(db, size=1000): Yields all currently tracked habits.
+        iter_same_periodicity_habits(db, periodicity, size=1000): Yields all habits with the given periodicity.
+        iter_habits_longest_streak(db, size=1000): Yields the longest run streak of all defined habits.
+        iter_leaderboard(db, by="longest_streak", status=None, periodicity=None, after=None, limit=20, size=1000):
+        Yields a page of the habits with the longest streaks.
+        iter_all_actions(db, name, size=1000): Yields all actions' history of a certain habit.
+        iter_struggled_most(db, start, end, limit=None, size=1000): Yields the habits ranked by their miss rate.
+        iter_struggle_ranking(db, start, end, limit=None, size=1000): Yields the habits ranked by their misses, breaks
+        and longest gaps computed from the Tracker table.
+        iter_streak_as_of(db, name, days): Yields the streak data of a habit as they were at the end of every day.
+        iter_events(db, name, size=1000): Yields the logged events of the habits with the name, also of the deleted
+        ones.
+        render(rows, header, file=None): Prints the header and the rows one by one.
     """
+    # The headers printed before the rows.
+    HABIT_HEADER = ("Name", "Start date", "Expiration date", "Periodicity", "Status", "Current streak",
+                    "Longest streak", "Break count", "Last break date", "Last checked-off day", "Last checked-off week")
+    PERIODICITY_HEADER = ("Name", "Periodicity", "Status")
+    STREAK_HEADER = ("Name", "Status", "Longest streak")
+    ACTION_HEADER = ("Name", "Check-off", "Date")
+    STRUGGLE_HEADER = ("Name", "Completed", "Missed", "Miss rate")
+    RANKING_HEADER = ("Name", "Completed", "Missed", "Miss rate", "Breaks", "Longest gap")
+    LEADERBOARD_HEADER = ("Id", "Name", "Status", "Periodicity", "Current streak", "Longest streak")
+    # The streaks, by which the leaderboards are ordered.
+    LEADERBOARD_ORDERS = ("longest_streak", "current_streak")
+    EVENT_HEADER = ("Name", "Event", "Date", "Check-off", "Logged at")
+    AS_OF_HEADER = ("Name", "Date", "Status", "Current streak", "Longest streak", "Break count", "Last break date")
+    # The columns of the HabitRow.
+    HABIT_COLUMNS = """habit.name, habit.start_date, habit.valid_till, habit.periodicity, habit.status,
+        streak.current_streak, streak.longest_streak, streak.break_count, streak.last_break, habit.last_check_day,
+        habit.last_check_week"""
+
     @staticmethod
     def all_habits(db):
         """
@@ -22,13 +85,9 @@ class Analysis:
         :return: Returns a list of all habits, in spite of their status.
         :rtype: list
         """
-        data = DB.get_habit_data(db)
-        raw_data = copy.deepcopy(data)
-        data.insert(0, ("Name", "Start date", "Expiration date", "Periodicity", "Status", "Current streak",
-                        "Longest streak", "Break count", "Last break date", "Last checked-off day",
-                        "Last checked-off week"))
-        print('\n'.join(map(str, data)))
-        return raw_data
+        data = list(Analysis.iter_all_habits(db))
+        Analysis.render(data, Analysis.HABIT_HEADER)
+        return data
 
     @staticmethod
     def currently_tracked_habits(db):
@@ -40,20 +99,9 @@ class Analysis:
         :return: Returns a list of all currently tracked habits.
         :rtype: list
         """
-        cur = db.cursor()
-        cur.execute("""SELECT habit.name, habit.start_date, habit.valid_till, habit.periodicity, habit.status, 
-        streak.current_streak, streak.longest_streak, streak.break_count, streak.last_break, habit.last_check_day,
-        habit.last_check_week
-        FROM habit
-        LEFT JOIN streak on habit.habit_id = streak.habit_id
-        WHERE habit.status = 'Still in progress'""")
-        data = cur.fetchall()
-        raw_data = copy.deepcopy(data)
-        data.insert(0, ("Name", "Start date", "Expiration date", "Periodicity", "Status", "Current streak",
-                        "Longest streak", "Break count", "Last break date", "Last checked-off day",
-                        "Last checked-off week"))
-        print('\n'.join(map(str, data)))
-        return raw_data
+        data = list(Analysis.iter_currently_tracked_habits(db))
+        Analysis.render(data, Analysis.HABIT_HEADER)
+        return data
 
     @staticmethod
     def same_periodicity_habits(db):
@@ -68,14 +116,9 @@ class Analysis:
         periodicity = input("What is the periodicity of a habit?\n")
         if periodicity != "Weekly" and periodicity != "Daily":
             return print(f"\nThere is no \"{periodicity}\" periodicity!\n")
-        cur = db.cursor()
-        cur.execute("""SELECT name, periodicity, status FROM habit
-        WHERE periodicity = ?""", (periodicity,))
-        select = cur.fetchall()
-        raw_select = copy.deepcopy(select)
-        select.insert(0, ("Name", "Periodicity", "Status"))
-        print('\n'.join(map(str, select)))
-        return raw_select
+        select = list(Analysis.iter_same_periodicity_habits(db, periodicity))
+        Analysis.render(select, Analysis.PERIODICITY_HEADER)
+        return select
 
     @staticmethod
     def habits_longest_streak(db):
@@ -87,14 +130,9 @@ class Analysis:
         :return: Returns the longest run streak of all defined habits.
         :rtype: list
         """
-        cur = db.cursor()
-        cur.execute("""SELECT habit.name, habit.status, streak.longest_streak FROM habit
-        LEFT JOIN streak on habit.habit_id = streak.habit_id""")
-        select = cur.fetchall()
-        raw_select = copy.deepcopy(select)
-        select.insert(0, ("Name", "Status", "Longest streak"))
-        print('\n'.join(map(str, select)))
-        return raw_select
+        select = list(Analysis.iter_habits_longest_streak(db))
+        Analysis.render(select, Analysis.STREAK_HEADER)
+        return select
 
     @staticmethod
     def given_habits_longest_streak(db, habit: str = None):
@@ -114,15 +152,40 @@ class Analysis:
         cur = db.cursor()
         cur.execute("""SELECT habit.name, habit.status, streak.longest_streak FROM habit
         LEFT JOIN streak on habit.habit_id = streak.habit_id
-        WHERE habit.name = ?""", (habit,))
+        WHERE habit.name = ? AND habit.user_id = ?""", (habit, DB.user_of(db)))
         try:
-            select = cur.fetchall()
+            select = [StreakRow._make(row) for row in cur.fetchall()]
         except TypeError:
             return print(f"\nHabit with {habit} name doesn't exist!\n")
-        raw_select = copy.deepcopy(select)
-        select.insert(0, ("Name", "Status", "Longest streak"))
-        print('\n'.join(map(str, select)))
-        return raw_select
+        Analysis.render(select, Analysis.STREAK_HEADER)
+        return select
+
+    @staticmethod
+    def leaderboard(db, by="longest_streak", status=None, periodicity=None, after=None, limit=20):
+        """
+        Prints and returns a page of the habits with the longest streaks, see iter_leaderboard().
+
+        :param db: The database, to which you are connected.
+        :type db: class
+        :param by: The streak, by which the habits are ordered, i.e. "longest_streak" or "current_streak" (default
+        "longest_streak").
+        :type by: str
+        :param status: The status of the habits, if not passed, the habits in spite of their status (default None).
+        :type status: str
+        :param periodicity: The periodicity of the habits, if not passed, the habits of both periodicities (default
+        None).
+        :type periodicity: str
+        :param after: The (streak, habit id) of the last habit of the previous page, if not passed, the first page is
+        returned (default None).
+        :type after: tuple
+        :param limit: The count of habits on the page (default 20).
+        :type limit: int
+        :return: Returns the page of habits.
+        :rtype: list
+        """
+        select = list(Analysis.iter_leaderboard(db, by, status, periodicity, after, limit))
+        Analysis.render(select, Analysis.LEADERBOARD_HEADER)
+        return select
 
     @staticmethod
     def all_actions(db, name):
@@ -136,12 +199,436 @@ class Analysis:
         :return: Returns all actions' history of a certain habit.
         :rtype: list
         """
+        select = list(Analysis.iter_all_actions(db, name))
+        Analysis.render(select, Analysis.ACTION_HEADER)
+        return select
+
+    @staticmethod
+    def struggled_most(db, start=None, end=None, limit=None):
+        """
+        Prints and returns the habits ranked by their miss rate, i.e. the habits the user struggled with most come
+        first. If the dates are not passed, the last month is ranked.
+
+        :param db: The database, to which you are connected.
+        :type db: class
+        :param start: The first day of the ranked date range (default None).
+        :type start: str
+        :param end: The last day of the ranked date range (default None).
+        :type end: str
+        :param limit: The count of returned habits, if not passed, all habits are returned (default None).
+        :type limit: int
+        :return: Returns the habits ranked by their miss rate.
+        :rtype: list
+        """
+        if not start or not end:
+            last_day = date.date.today().replace(day=1) - date.timedelta(days=1)
+            start, end = str(last_day.replace(day=1)), str(last_day)
+        select = list(Analysis.iter_struggled_most(db, start, end, limit))
+        Analysis.render(select, Analysis.STRUGGLE_HEADER)
+        return select
+
+    @staticmethod
+    def struggle_ranking(db, start=None, end=None, limit=None):
+        """
+        Prints and returns the habits ranked by their misses, breaks and longest gaps, i.e. the habits the user
+        struggled with most come first. If the dates are not passed, the last month is ranked.
+
+        :param db: The database, to which you are connected.
+        :type db: class
+        :param start: The first day of the ranked date range (default None).
+        :type start: str
+        :param end: The last day of the ranked date range (default None).
+        :type end: str
+        :param limit: The count of returned habits, if not passed, all habits are returned (default None).
+        :type limit: int
+        :return: Returns the ranked habits.
+        :rtype: list
+        """
+        if not start or not end:
+            last_day = date.date.today().replace(day=1) - date.timedelta(days=1)
+            start, end = str(last_day.replace(day=1)), str(last_day)
+        select = list(Analysis.iter_struggle_ranking(db, start, end, limit))
+        Analysis.render(select, Analysis.RANKING_HEADER)
+        return select
+
+    @staticmethod
+    def streak_as_of(db, name, day):
+        """
+        Prints and returns the streak data of a habit as they were at the end of the day, i.e. after the check-offs
+        until the day, see iter_streak_as_of().
+
+        :param db: The database, to which you are connected.
+        :type db: class
+        :param name: The name of a habit.
+        :type name: str
+        :param day: The day as an ISO date, a date or an ordinal.
+        :type day: str
+        :return: Returns the streak data, or None if there is no such a habit.
+        :rtype: AsOfRow
+        """
+        select = list(Analysis.iter_streak_as_of(db, name, [day]))
+        if not select:
+            return print(f"\nHabit with {name} name doesn't exist!\n")
+        Analysis.render(select, Analysis.AS_OF_HEADER)
+        return select[0]
+
+    @staticmethod
+    def iter_all_habits(db, size=1000):
+        """
+        Yields all habits, in spite of their status.
+
+        :param db: The database, to which you are connected.
+        :type db: class
+        :param size: The count of rows fetched at once (default 1000).
+        :type size: int
+        :return: Yields the habits as HabitRow tuples.
+        :rtype: generator
+        """
+        cur = db.cursor()
+        cur.execute(f"""SELECT {Analysis.HABIT_COLUMNS}
+        FROM habit_iso AS habit
+        LEFT JOIN streak_iso AS streak on habit.habit_id = streak.habit_id
+        WHERE habit.user_id = ?
+        ORDER BY habit.habit_id""", (DB.user_of(db),))
+        yield from Analysis._fetch(cur, HabitRow, size)
+
+    @staticmethod
+    def iter_currently_tracked_habits(db, size=1000):
+        """
+        Yields all currently tracked habits.
+
+        :param db: The database, to which you are connected.
+        :type db: class
+        :param size: The count of rows fetched at once (default 1000).
+        :type size: int
+        :return: Yields the habits as HabitRow tuples.
+        :rtype: generator
+        """
+        cur = db.cursor()
+        cur.execute(f"""SELECT {Analysis.HABIT_COLUMNS}
+        FROM habit_iso AS habit
+        LEFT JOIN streak_iso AS streak on habit.habit_id = streak.habit_id
+        WHERE habit.user_id = ? AND habit.status = 'Still in progress'
+        ORDER BY habit.habit_id""", (DB.user_of(db),))
+        yield from Analysis._fetch(cur, HabitRow, size)
+
+    @staticmethod
+    def iter_same_periodicity_habits(db, periodicity, size=1000):
+        """
+        Yields all habits with the given periodicity.
+
+        :param db: The database, to which you are connected.
+        :type db: class
+        :param periodicity: The periodicity of a habit (i.e. "Daily", "Weekly").
+        :type periodicity: str
+        :param size: The count of rows fetched at once (default 1000).
+        :type size: int
+        :return: Yields the habits as PeriodicityRow tuples.
+        :rtype: generator
+        """
         cur = db.cursor()
-        cur.execute("""SELECT habit.name, tracker.checked_off, tracker.date  FROM tracker
+        cur.execute("""SELECT name, periodicity, status FROM habit
+        WHERE user_id = ? AND periodicity = ?
+        ORDER BY habit_id""", (DB.user_of(db), periodicity))
+        yield from Analysis._fetch(cur, PeriodicityRow, size)
+
+    @staticmethod
+    def iter_habits_longest_streak(db, size=1000):
+        """
+        Yields the longest run streak of all defined habits.
+
+        :param db: The database, to which you are connected.
+        :type db: class
+        :param size: The count of rows fetched at once (default 1000).
+        :type size: int
+        :return: Yields the longest streaks as StreakRow tuples.
+        :rtype: generator
+        """
+        cur = db.cursor()
+        cur.execute("""SELECT habit.name, habit.status, streak.longest_streak FROM habit
+        LEFT JOIN streak on habit.habit_id = streak.habit_id
+        WHERE habit.user_id = ?
+        ORDER BY habit.habit_id""", (DB.user_of(db),))
+        yield from Analysis._fetch(cur, StreakRow, size)
+
+    @staticmethod
+    def iter_leaderboard(db, by="longest_streak", status=None, periodicity=None, after=None, limit=20, size=1000):
+        """
+        Yields a page of the habits with the longest streaks, ordered by the streak and then by the habit's id, both
+        descending. The pages are found by their keys instead of an OFFSET: the next page starts after the (streak,
+        habit id) of the last habit of the previous page. The Streak table is walked along the index of the user's
+        streaks, from the key on, and every habit is looked up by its id, so a page costs about as many index entries
+        as it has habits, however many habits the other users have, unless the filters skip many habits. The habits,
+        which haven't been checked-off yet, have no streaks and aren't ranked.
+
+        :param db: The database, to which you are connected.
+        :type db: class
+        :param by: The streak, by which the habits are ordered, i.e. "longest_streak" or "current_streak" (default
+        "longest_streak").
+        :type by: str
+        :param status: The status of the habits, if not passed, the habits in spite of their status (default None).
+        :type status: str
+        :param periodicity: The periodicity of the habits, if not passed, the habits of both periodicities (default
+        None).
+        :type periodicity: str
+        :param after: The (streak, habit id) of the last habit of the previous page, if not passed, the first page is
+        yielded (default None).
+        :type after: tuple
+        :param limit: The count of habits on the page, if None, all the following habits are yielded (default 20).
+        :type limit: int
+        :param size: The count of rows fetched at once (default 1000).
+        :type size: int
+        :return: Yields the habits as LeaderRow tuples.
+        :rtype: generator
+        :raises ValueError: If the habits can't be ordered by the streak.
+        """
+        if by not in Analysis.LEADERBOARD_ORDERS:
+            raise ValueError(f"The habits can't be ordered by \"{by}\"!")
+        conditions = ["streak.user_id = ?"]
+        parameters = [DB.user_of(db)]
+        if status:
+            conditions.append("habit.status = ?")
+            parameters.append(status)
+        if periodicity:
+            conditions.append("habit.periodicity = ?")
+            parameters.append(periodicity)
+        if after is not None:
+            conditions.append(f"(streak.{by}, streak.habit_id) < (?, ?)")
+            streak, habit_id = after
+            parameters += [int(streak), int(habit_id)]
+        limit_clause = ""
+        if limit is not None:
+            limit_clause = "LIMIT ?"
+            parameters.append(limit)
+        cur = db.cursor()
+        # The CROSS JOIN keeps the Streak table in the outer loop, so the rows come in the order of the (user, streak,
+        # habit id) index and the walk stops at the limit, instead of sorting all habits of the user.
+        cur.execute(f"""SELECT streak.habit_id, habit.name, habit.status, habit.periodicity, streak.current_streak,
+        streak.longest_streak
+        FROM streak CROSS JOIN habit on habit.habit_id = streak.habit_id
+        WHERE {" AND ".join(conditions)}
+        ORDER BY streak.{by} DESC, streak.habit_id DESC
+        {limit_clause}""", parameters)
+        yield from Analysis._fetch(cur, LeaderRow, size)
+
+    @staticmethod
+    def iter_all_actions(db, name, size=1000):
+        """
+        Yields all actions' history of a certain habit.
+
+        :param db: The database, to which you are connected.
+        :type db: class
+        :param name: The name of a habit.
+        :type name: str
+        :param size: The count of rows fetched at once (default 1000).
+        :type size: int
+        :return: Yields the check-offs as ActionRow tuples.
+        :rtype: generator
+        """
+        cur = db.cursor()
+        cur.execute("""SELECT habit.name, tracker.checked_off, tracker.date FROM tracker_iso AS tracker
         LEFT JOIN habit on tracker.habit_id = habit.habit_id
-        WHERE habit.name = ?""", (name,))
-        select = cur.fetchall()
-        raw_select = copy.deepcopy(select)
-        select.insert(0, ("Name", "Check-off", "Date"))
-        print('\n'.join(map(str, select)))
-        return raw_select
+        WHERE habit.name = ? AND habit.user_id = ?""", (name, DB.user_of(db)))
+        yield from Analysis._fetch(cur, ActionRow, size)
+
+    @staticmethod
+    def iter_struggled_most(db, start, end, limit=None, size=1000):
+        """
+        Yields the habits ranked by their miss rate in the date range, which is calculated from the Rollup table only,
+        i.e. from the completed and missed periods, which start in the date range.
+
+        :param db: The database, to which you are connected.
+        :type db: class
+        :param start: The first day of the date range.
+        :type start: str
+        :param end: The last day of the date range.
+        :type end: str
+        :param limit: The count of yielded habits, if not passed, all habits are yielded (default None).
+        :type limit: int
+        :param size: The count of rows fetched at once (default 1000).
+        :type size: int
+        :return: Yields the habits as StruggleRow tuples.
+        :rtype: generator
+        """
+        cur = db.cursor()
+        cur.execute("""SELECT habit.name, SUM(rollup.completed), SUM(rollup.missed),
+        ROUND(CAST(SUM(rollup.missed) AS REAL) / (SUM(rollup.completed) + SUM(rollup.missed)), 4) AS miss_rate
+        FROM rollup
+        JOIN habit on rollup.habit_id = habit.habit_id
+        WHERE rollup.period_start BETWEEN ? AND ? AND habit.user_id = ?
+        GROUP BY rollup.habit_id
+        ORDER BY miss_rate DESC, SUM(rollup.missed) DESC, habit.name
+        LIMIT ?""", (DB.ordinal(start), DB.ordinal(end), DB.user_of(db), -1 if limit is None else limit))
+        yield from Analysis._fetch(cur, StruggleRow, size)
+
+    @staticmethod
+    def iter_struggle_ranking(db, start, end, limit=None, size=1000):
+        """
+        Yields the habits ranked by their miss rate in the date range, then by their missed periods and by their
+        longest gaps, all computed in one query from the Tracker table.
+
+        Only the periods, which start in the date range and end before its end, are ranked, and only until the habit
+        expires, or until it ended if it isn't in progress anymore. The missed periods between the check-offs are found
+        by comparing every check-off's period with the previous one's, using the LAG() window function, so no habit is
+        replayed in Python. A period is missed, if it wasn't checked-off at all, or if its check-off was unsuccessful.
+
+        :param db: The database, to which you are connected.
+        :type db: class
+        :param start: The first day of the date range.
+        :type start: str
+        :param end: The last day of the date range.
+        :type end: str
+        :param limit: The count of yielded habits, if not passed, all habits are yielded (default None).
+        :type limit: int
+        :param size: The count of rows fetched at once (default 1000).
+        :type size: int
+        :return: Yields the habits as RankingRow tuples, where the breaks are the count of interrupted streaks and the
+        longest gap is the most periods missed in a row.
+        :rtype: generator
+        """
+        cur = db.cursor()
+        cur.execute("""WITH periods AS (
+            SELECT habit_id, name, start_date, length,
+            (MAX(:start, start_date) - start_date + length - 1) / length AS first_index,
+            (MIN(:end, CASE WHEN status = 'Still in progress' THEN valid_till ELSE end_date END) - start_date + 1)
+            / length - 1 AS last_index
+            FROM (SELECT *, CASE periodicity WHEN 'Weekly' THEN 7 ELSE 1 END AS length FROM habit)
+            WHERE user_id = :user AND start_date <= :end
+        ), checks AS (
+            SELECT periods.habit_id, periods.name, periods.first_index, periods.last_index, tracker.checked_off,
+            (tracker.date - periods.start_date) / periods.length AS period,
+            (tracker.date - periods.start_date) / periods.length - 1 - COALESCE(LAG((tracker.date - periods.start_date)
+            / periods.length) OVER (PARTITION BY periods.habit_id ORDER BY tracker.date), periods.first_index - 1)
+            AS gap
+            FROM periods
+            LEFT JOIN tracker on tracker.habit_id = periods.habit_id
+            AND tracker.date BETWEEN periods.start_date + periods.first_index * periods.length
+            AND periods.start_date + (periods.last_index + 1) * periods.length - 1
+        ), totals AS (
+            SELECT name, TOTAL(checked_off) AS completed, TOTAL(checked_off = 0) AS failed,
+            TOTAL(MAX(gap, 0)) AS skipped, TOTAL(gap > 0) AS gaps, COALESCE(MAX(gap), 0) AS gap,
+            MAX(last_index - COALESCE(MAX(period), first_index - 1), 0) AS trailing
+            FROM checks
+            GROUP BY habit_id
+        )
+        SELECT name, CAST(completed AS INTEGER), CAST(failed + skipped + trailing AS INTEGER) AS missed,
+        ROUND((failed + skipped + trailing) / (completed + failed + skipped + trailing), 4) AS miss_rate,
+        CAST(failed + gaps + (trailing > 0) AS INTEGER), MAX(gap, trailing) AS longest_gap
+        FROM totals
+        WHERE completed + failed + skipped + trailing > 0
+        ORDER BY miss_rate DESC, missed DESC, longest_gap DESC, name
+        LIMIT :limit""", {"start": DB.ordinal(start), "end": DB.ordinal(end), "user": DB.user_of(db),
+                          "limit": -1 if limit is None else limit})
+        yield from Analysis._fetch(cur, RankingRow, size)
+
+    @staticmethod
+    def iter_streak_as_of(db, name, days):
+        """
+        Yields the streak data of a habit as they were at the end of every day, e.g. for the charts of the habit's
+        history. The history isn't replayed from the start: the state of every day is replayed from the latest
+        snapshot taken before the end of the day (see DB.SNAPSHOT_PERIODS), so every day costs two index lookups and
+        the replay of at most DB.SNAPSHOT_PERIODS check-offs. The habit isn't broken by the periods missed after its
+        last check-off until the day, just like the Streak table isn't updated until the next check-off.
+
+        :param db: The database, to which you are connected.
+        :type db: class
+        :param name: The name of a habit.
+        :type name: str
+        :param days: The days as ISO dates, dates or ordinals, in any order.
+        :type days: iterable
+        :return: Yields the streak data as AsOfRow tuples, nothing if there is no such a habit.
+        :rtype: generator
+        """
+        cur = db.cursor()
+        cur.execute("SELECT habit_id, start_date, valid_till, periodicity FROM habit WHERE name = ? AND user_id = ?",
+                    (name, DB.user_of(db)))
+        habit = cur.fetchone()
+        if not habit:
+            return
+        habit_id, start_date, valid_till, periodicity = habit
+        period = Period(date.date.fromordinal(start_date), periodicity)
+        for day in days:
+            day = DB.ordinal(day)
+            cur.execute("""SELECT day, last_index, current_streak, longest_streak, break_count, last_break, status
+            FROM streak_snapshot
+            WHERE habit_id = ? AND day <= ?
+            ORDER BY day DESC LIMIT 1""", (habit_id, day))
+            snapshot = cur.fetchone()
+            # The habit without any snapshot, e.g. one created before the snapshots, is replayed from the start.
+            since, state = (snapshot[0], snapshot[1:]) if snapshot else (0, Rebuild.START)
+            cur.execute("""SELECT date, checked_off FROM tracker
+            WHERE habit_id = ? AND date > ? AND date <= ?
+            ORDER BY date, tracker_id""", (habit_id, since, day))
+            for _, state in Rebuild.states(period, valid_till, cur.fetchall(), state):
+                pass
+            _, current_streak, longest_streak, break_count, last_break, status = state
+            if day < start_date:
+                status = "Not started"
+            yield AsOfRow(name, str(date.date.fromordinal(day)), status, current_streak, longest_streak, break_count,
+                          str(date.date.fromordinal(last_break)) if last_break else "Not broken")
+
+    @staticmethod
+    def iter_events(db, name, size=1000):
+        """
+        Yields the logged events of the habits with the name in the order they were logged, also of the deleted habits,
+        e.g. to audit how a habit got its state.
+
+        :param db: The database, to which you are connected.
+        :type db: class
+        :param name: The name of a habit.
+        :type name: str
+        :param size: The count of rows fetched at once (default 1000).
+        :type size: int
+        :return: Yields the events as EventRow tuples.
+        :rtype: generator
+        """
+        cur = db.cursor()
+        cur.execute("""SELECT json_extract(created.data, '$.name'), event.kind, event.day, event.checked_off,
+        event.logged_at FROM habit_event_iso AS event
+        JOIN habit_event AS created on created.habit_id = event.habit_id AND created.kind = 'create'
+        WHERE json_extract(created.data, '$.name') = ? AND json_extract(created.data, '$.user_id') = ?
+        ORDER BY event.event_id""", (name, DB.user_of(db)))
+        yield from Analysis._fetch(cur, EventRow, size)
+
+    @staticmethod
+    def render(rows, header, file=None):
+        """
+        Prints the header and the rows one by one, so the rows can be printed while they are fetched.
+
+        :param rows: The rows, e.g. yielded by one of the iter_* methods.
+        :type rows: iterable
+        :param header: The names of the columns.
+        :type header: tuple
+        :param file: The file to print to, if not passed, prints to the standard output (default None).
+        :type file: class
+        :return: Returns the count of printed rows.
+        :rtype: int
+        """
+        file = file or sys.stdout
+        print(header, file=file)
+        count = 0
+        for row in rows:
+            print(tuple(row), file=file)
+            count += 1
+        return count
+
+    @staticmethod
+    def _fetch(cur, row_type, size):
+        """
+        Yields the rows of the executed query, fetching them in chunks.
+
+        :param cur: The cursor with the executed query.
+        :type cur: class
+        :param row_type: The named tuple, to which the rows are converted.
+        :type row_type: class
+        :param size: The count of rows fetched at once.
+        :type size: int
+        :return: Yields the rows as named tuples.
+        :rtype: generator
+        """
+        while True:
+            rows = cur.fetchmany(size)
+            if not rows:
+                break
+            for row in rows:
+                yield row_type._make(row)
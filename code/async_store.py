@@ -0,0 +1,335 @@
+import asyncio
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from analyse import Analysis
+from db import DB
+from repository import HabitRepository
+
+
+# The state of a habit after a check-off, copied from the writer's cached habit, which keeps changing.
+CheckOffRow = namedtuple("CheckOffRow", ["name", "status", "current_streak", "longest_streak", "break_count",
+                                         "last_break", "last_check"])
+
+
+class AsyncHabitStore:
+    """The AsyncHabitStore class lets asyncio programs use the habit tracker without blocking the event loop.
+
+    All writes run on one writer thread with its own connection, so they never wait for each other's locks, while the
+    reads run on a small pool of read-only connections. With the "concurrent" profile (the WAL journal), the readers
+    and the writer don't block each other.
+
+    Attributes:
+        name (str): Name of a database.
+        readers (int): The count of reader connections (default 4).
+        profile (str): The connection profile, see DB.PROFILES (default "concurrent").
+        chunk_size (int): The count of rows passed from a reader thread to the event loop at once (default 500).
+        user (str): The user, whose habits the store reads and writes (default "default").
+
+    Methods:
+        open(): Opens the writer connection, the reader connections are opened when they are first used.
+        close(): Closes all connections.
+        create(name, description, start_date, valid_till, periodicity): Creates a habit.
+        check_off(name, check, check_date=None): Checks-off a habit.
+        check_off_many(name, checks): Checks-off a habit many times at once.
+        delete(name): Deletes a habit.
+        iterate(query, *args): Yields the rows of one of the Analysis.iter_* methods asynchronously.
+        all_habits(): Yields all habits, in spite of their status.
+        currently_tracked_habits(): Yields all currently tracked habits.
+        same_periodicity_habits(periodicity): Yields all habits with the given periodicity.
+        habits_longest_streak(): Yields the longest run streak of all defined habits.
+        all_actions(name): Yields all actions' history of a certain habit.
+        struggled_most(start, end, limit=None): Yields the habits ranked by their miss rate.
+    """
+    def __init__(self, name="main.db", readers=4, profile="concurrent", chunk_size=500, user=DB.DEFAULT_USER):
+        """
+        Initializes an AsyncHabitStore instance.
+
+        :param name: Name of a database.
+        :type name: str
+        :param readers: The count of reader connections (default 4).
+        :type readers: int
+        :param profile: The connection profile, see DB.PROFILES (default "concurrent").
+        :type profile: str
+        :param chunk_size: The count of rows passed from a reader thread to the event loop at once (default 500).
+        :type chunk_size: int
+        :param user: The user, whose habits the store reads and writes (default "default").
+        :type user: str
+        """
+        self.name = name
+        self.readers = readers
+        self.profile = profile
+        self.chunk_size = chunk_size
+        self.user = user
+        # Every thread keeps its own connection, since a connection can't be shared between threads.
+        self._local = threading.local()
+        # The connections of the reader threads.
+        self._connections = []
+        self._lock = threading.Lock()
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="habit-writer",
+                                          initializer=self._open_writer)
+        self._readers = ThreadPoolExecutor(max_workers=readers, thread_name_prefix="habit-reader",
+                                           initializer=self._open_reader)
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    def _open_writer(self):
+        """
+        Opens the connection of the writer thread, which creates the tables and keeps the checked-off habits cached.
+
+        :return: None
+        """
+        self._local.db = DB.get_db(self.name, self.profile, user=self.user)
+        self._local.repository = HabitRepository(self._local.db)
+
+    def _open_reader(self):
+        """
+        Opens the read-only connection of a reader thread, bound to the store's user.
+
+        :return: None
+        """
+        # The connection is used only by its thread, but it's closed by close() from another one.
+        self._local.db = DB.connect(self.name, self.user, read_only=True, check_same_thread=False)
+        with self._lock:
+            self._connections.append(self._local.db)
+
+    async def _write(self, function, *args):
+        """
+        Calls the function with the writer's connection and repository on the writer thread.
+
+        :param function: The function.
+        :type function: function
+        :param args: The arguments of the function, passed after the connection and the repository.
+        :type args: tuple
+        :return: Returns whatever the function returns.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._writer, lambda: function(self._local.db, self._local.repository,
+                                                                         *args))
+
+    async def open(self):
+        """
+        Opens the writer connection, which creates the database if it doesn't exist, so the readers can open it.
+
+        :return: None
+        """
+        await self._write(lambda db, repository: None)
+
+    async def close(self):
+        """
+        Waits for the running calls and closes all connections.
+
+        :return: None
+        """
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self._shutdown)
+
+    def _shutdown(self):
+        """
+        Stops the threads and closes their connections.
+
+        :return: None
+        """
+        def close_writer():
+            if hasattr(self._local, "repository"):
+                self._local.repository.close()
+                DB.db_close(self._local.db)
+
+        self._writer.submit(close_writer)
+        self._writer.shutdown(wait=True)
+        self._readers.shutdown(wait=True)
+        with self._lock:
+            for db in self._connections:
+                DB.db_close(db)
+            self._connections.clear()
+
+    async def create(self, name, description, start_date, valid_till, periodicity):
+        """
+        Creates a habit.
+
+        :param name: The name of a habit.
+        :type name: str
+        :param description: The description of a habit.
+        :type description: str
+        :param start_date: The start date of a habit.
+        :type start_date: str
+        :param valid_till: The expiration date of a habit.
+        :type valid_till: str
+        :param periodicity: The periodicity of a habit (i.e. "Daily", "Weekly").
+        :type periodicity: str
+        :return: Returns True if the habit was created, False if a habit with such a name already exists.
+        :rtype: bool
+        """
+        def create(db, repository):
+            return not DB.add_habit(db, name, description, start_date, valid_till, periodicity)
+        return await self._write(create)
+
+    async def check_off(self, name, check, check_date=None):
+        """
+        Checks-off a habit, which is in progress.
+
+        :param name: The name of a habit.
+        :type name: str
+        :param check: The check-off (i.e. True or False).
+        :type check: bool
+        :param check_date: The check-off date, if not passed, the present day (default None).
+        :type check_date: str
+        :return: Returns the habit's state after the check-off, None if there is no such a habit in progress, or
+        ConnectionError if the check-off date is earlier than the last check-off or its period is already checked-off.
+        :rtype: CheckOffRow
+        """
+        def check_off(db, repository):
+            habit = repository.get_by_name(name)
+            if habit is None:
+                return None
+            if repository.check_off(habit, check, check_date) == ConnectionError:
+                return ConnectionError
+            return CheckOffRow(habit.name, habit.status, habit.current_streak, habit.longest_streak,
+                               habit.break_count, habit.last_break, habit.last_check)
+        return await self._write(check_off)
+
+    async def check_off_many(self, name, checks):
+        """
+        Checks-off a habit, which is in progress, many times at once.
+
+        :param name: The name of a habit.
+        :type name: str
+        :param checks: The check-offs as (check, check_date) pairs.
+        :type checks: list
+        :return: Returns the count of stored check-offs, or None if there is no such a habit in progress.
+        :rtype: int
+        """
+        def check_off_many(db, repository):
+            habit = repository.get_by_name(name)
+            if habit is not None:
+                return repository.check_off_many(habit, checks)
+        return await self._write(check_off_many)
+
+    async def delete(self, name):
+        """
+        Deletes a habit.
+
+        :param name: The name of a habit.
+        :type name: str
+        :return: None
+        """
+        await self._write(lambda db, repository: DB.delete_habit(db, name))
+
+    async def iterate(self, query, *args):
+        """
+        Yields the rows of one of the Analysis.iter_* methods, which runs on a reader thread. The rows are passed to
+        the event loop in chunks, and the reader waits while the chunks aren't consumed, so the memory stays bounded.
+
+        :param query: The Analysis.iter_* method.
+        :type query: function
+        :param args: The arguments of the method, passed after the connection.
+        :type args: tuple
+        :return: Yields the rows.
+        :rtype: async generator
+        """
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(maxsize=2)
+        stop = threading.Event()
+        done = object()
+
+        def produce():
+            chunk = []
+            try:
+                for row in query(self._local.db, *args):
+                    chunk.append(row)
+                    if len(chunk) >= self.chunk_size:
+                        asyncio.run_coroutine_threadsafe(queue.put(chunk), loop).result()
+                        chunk = []
+                        if stop.is_set():
+                            return
+                if chunk:
+                    asyncio.run_coroutine_threadsafe(queue.put(chunk), loop).result()
+            finally:
+                asyncio.run_coroutine_threadsafe(queue.put(done), loop).result()
+
+        future = loop.run_in_executor(self._readers, produce)
+        finished = False
+        try:
+            while True:
+                chunk = await queue.get()
+                if chunk is done:
+                    finished = True
+                    break
+                for row in chunk:
+                    yield row
+        finally:
+            stop.set()
+            while not finished:
+                # The reader is released from waiting for the queue, if the iteration was stopped early.
+                finished = await queue.get() is done
+            await future
+
+    def all_habits(self):
+        """
+        Yields all habits, in spite of their status.
+
+        :return: Yields the habits as HabitRow tuples.
+        :rtype: async generator
+        """
+        return self.iterate(Analysis.iter_all_habits)
+
+    def currently_tracked_habits(self):
+        """
+        Yields all currently tracked habits.
+
+        :return: Yields the habits as HabitRow tuples.
+        :rtype: async generator
+        """
+        return self.iterate(Analysis.iter_currently_tracked_habits)
+
+    def same_periodicity_habits(self, periodicity):
+        """
+        Yields all habits with the given periodicity.
+
+        :param periodicity: The periodicity of a habit (i.e. "Daily", "Weekly").
+        :type periodicity: str
+        :return: Yields the habits as PeriodicityRow tuples.
+        :rtype: async generator
+        """
+        return self.iterate(Analysis.iter_same_periodicity_habits, periodicity)
+
+    def habits_longest_streak(self):
+        """
+        Yields the longest run streak of all defined habits.
+
+        :return: Yields the longest streaks as StreakRow tuples.
+        :rtype: async generator
+        """
+        return self.iterate(Analysis.iter_habits_longest_streak)
+
+    def all_actions(self, name):
+        """
+        Yields all actions' history of a certain habit.
+
+        :param name: The name of a habit.
+        :type name: str
+        :return: Yields the check-offs as ActionRow tuples.
+        :rtype: async generator
+        """
+        return self.iterate(Analysis.iter_all_actions, name)
+
+    def struggled_most(self, start, end, limit=None):
+        """
+        Yields the habits ranked by their miss rate in the date range.
+
+        :param start: The first day of the date range.
+        :type start: str
+        :param end: The last day of the date range.
+        :type end: str
+        :param limit: The count of yielded habits, if not passed, all habits are yielded (default None).
+        :type limit: int
+        :return: Yields the habits as StruggleRow tuples.
+        :rtype: async generator
+        """
+        return self.iterate(Analysis.iter_struggled_most, start, end, limit)
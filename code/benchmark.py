@@ -0,0 +1,202 @@
+import argparse
+import contextlib
+import datetime as date
+import json
+import os
+import random
+import sys
+import time
+
+from analyse import Analysis
+from db import DB
+from fixtures import Fixtures
+from habit_track import DbHabit
+
+
+class Benchmark:
+    """The Benchmark class measures the hot paths of the DB, DbHabit and Analysis classes on a synthetic database.
+
+    The database is generated by Fixtures.generate(), so it has every derived table, e.g. the snapshots and the event
+    log, and the measured check-offs do the same work as on a real database.
+
+    Attributes:
+        name (str): Name of the benchmark database.
+        habits (int): The count of generated habits.
+        days (int): The count of days, during which the habits are checked-off.
+        seed (int): The seed of the random generator, the same seed generates the same database.
+        repeat (int): The count of calls of every measured operation.
+
+    Methods:
+        run(): Generates the database and measures every operation.
+        measure(function, calls): Calls the function with every arguments and returns the statistics of the calls.
+        compare(results, baseline, tolerance=1.25): Returns the operations, which got slower than in the baseline.
+    """
+    def __init__(self, name, habits=1000, days=30, seed=0, repeat=100):
+        """
+        Initializes a Benchmark instance.
+
+        :param name: Name of the benchmark database, which is overwritten.
+        :type name: str
+        :param habits: The count of generated habits (default 1000).
+        :type habits: int
+        :param days: The count of days, during which the habits are checked-off (default 30).
+        :type days: int
+        :param seed: The seed of the random generator (default 0).
+        :type seed: int
+        :param repeat: The count of calls of every measured operation (default 100).
+        :type repeat: int
+        """
+        self.name = name
+        self.habits = habits
+        self.days = days
+        self.seed = seed
+        self.repeat = repeat
+
+    def run(self):
+        """
+        Generates the database and measures every operation.
+
+        :return: Returns the statistics of every operation by its name.
+        :rtype: dict
+        """
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(self.name + suffix):
+                os.remove(self.name + suffix)
+        db = DB.get_db(self.name)
+        rng = random.Random(self.seed)
+        results = {}
+        try:
+            started = time.perf_counter()
+            # The fixtures fill every derived table, e.g. the snapshots and the event log, like the real check-offs do.
+            count = Fixtures.generate(db, self.habits, self.days, self.seed)
+            results["generate"] = {"count": count, "total": round(time.perf_counter() - started, 6)}
+            # Only the habits in progress can be checked-off.
+            tracked = db.execute("SELECT habit_id, name FROM habit WHERE status = 'Still in progress' "
+                                 "ORDER BY habit_id").fetchall()
+            sample = rng.sample(tracked, min(self.repeat, len(tracked)))
+            names = [name for _, name in sample]
+            start, end = str(Fixtures.START), str(Fixtures.START + date.timedelta(days=self.days + 60))
+            # The printed messages aren't a part of the measured work.
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                habits = [DbHabit.load(db, habit_id) for habit_id, _ in sample]
+                results["add_habit_check"] = self.measure(
+                    lambda habit: habit.add_habit_check(db, True, self._next_period(habit)),
+                    [(habit,) for habit in habits])
+                results["name_to_id"] = self.measure(lambda name: DB.name_to_id(db, name), [(x,) for x in names])
+                few = [()] * max(1, self.repeat // 10)
+                results["get_habit_data"] = self.measure(lambda: DB.get_habit_data(db), few)
+                for operation in ("iter_all_habits", "iter_currently_tracked_habits", "iter_habits_longest_streak",
+                                  "iter_leaderboard"):
+                    results[operation] = self.measure(lambda: sum(1 for _ in getattr(Analysis, operation)(db)), few)
+                results["iter_same_periodicity_habits"] = self.measure(
+                    lambda: sum(1 for _ in Analysis.iter_same_periodicity_habits(db, "Weekly")), few)
+                results["iter_all_actions"] = self.measure(
+                    lambda name: sum(1 for _ in Analysis.iter_all_actions(db, name)), [(x,) for x in names])
+                results["iter_events"] = self.measure(
+                    lambda name: sum(1 for _ in Analysis.iter_events(db, name)), [(x,) for x in names])
+                results["iter_streak_as_of"] = self.measure(
+                    lambda name: sum(1 for _ in Analysis.iter_streak_as_of(db, name, [start, end])),
+                    [(x,) for x in names])
+                results["iter_struggled_most"] = self.measure(
+                    lambda: sum(1 for _ in Analysis.iter_struggled_most(db, start, end, 10)), few)
+                results["iter_struggle_ranking"] = self.measure(
+                    lambda: sum(1 for _ in Analysis.iter_struggle_ranking(db, start, end, 10)), few)
+                results["delete_habit"] = self.measure(lambda name: DB.delete_habit(db, name), [(x,) for x in names])
+        finally:
+            DB.db_close(db)
+        return results
+
+    @staticmethod
+    def _next_period(habit):
+        """
+        Returns the first day of the period after the last checked-off one, or the start date if the habit hasn't been
+        checked-off yet.
+
+        :param habit: The habit.
+        :type habit: DbHabit
+        :return: Returns the date.
+        :rtype: str
+        """
+        if not habit.last_check:
+            return habit.start_date
+        days = 7 if habit.periodicity == "Weekly" else 1
+        return str(date.date.fromisoformat(habit.last_check) + date.timedelta(days=days))
+
+    @staticmethod
+    def measure(function, calls):
+        """
+        Calls the function with every arguments and returns the statistics of the calls.
+
+        :param function: The measured function.
+        :type function: function
+        :param calls: The arguments of every call.
+        :type calls: list
+        :return: Returns the count of calls, the total seconds, the calls per second, and the 50th and the 99th
+        percentiles of the latency in milliseconds.
+        :rtype: dict
+        """
+        latencies = []
+        for args in calls:
+            started = time.perf_counter()
+            function(*args)
+            latencies.append(time.perf_counter() - started)
+        latencies.sort()
+        total = sum(latencies)
+        return {
+            "count": len(latencies),
+            "total": round(total, 6),
+            "throughput": round(len(latencies) / total, 2) if total else None,
+            "p50_ms": round(latencies[int(0.50 * (len(latencies) - 1))] * 1000, 4),
+            "p99_ms": round(latencies[int(0.99 * (len(latencies) - 1))] * 1000, 4),
+        }
+
+    @staticmethod
+    def compare(results, baseline, tolerance=1.25):
+        """
+        Returns the operations, whose 50th or 99th latency percentile is more than tolerance times the baseline's.
+
+        :param results: The statistics returned by run().
+        :type results: dict
+        :param baseline: The statistics of the baseline run.
+        :type baseline: dict
+        :param tolerance: The allowed slowdown (default 1.25).
+        :type tolerance: float
+        :return: Returns the (operation, percentile, baseline, result) rows of the regressions.
+        :rtype: list
+        """
+        regressions = []
+        for operation, stats in results.items():
+            for percentile in ("p50_ms", "p99_ms"):
+                before = baseline.get(operation, {}).get(percentile)
+                if before and stats.get(percentile) is not None and stats[percentile] > before * tolerance:
+                    regressions.append((operation, percentile, before, stats[percentile]))
+        return regressions
+
+
+# Executed when invoked directly, e.g. "python benchmark.py --habits 100000 --days 50 --baseline baseline.json".
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks the habit tracker on a synthetic database.")
+    parser.add_argument("--db", default="benchmark.db", help="the benchmark database, which is overwritten")
+    parser.add_argument("--habits", type=int, default=1000, help="the count of generated habits")
+    parser.add_argument("--days", type=int, default=30, help="the count of days, during which the habits are "
+                                                             "checked-off")
+    parser.add_argument("--seed", type=int, default=0, help="the seed of the random generator")
+    parser.add_argument("--repeat", type=int, default=100, help="the count of calls of every operation")
+    parser.add_argument("--baseline", help="the JSON results to compare with, the regressions fail the run")
+    parser.add_argument("--tolerance", type=float, default=1.25, help="the allowed slowdown against the baseline")
+    parser.add_argument("--save", help="the file, to which the JSON results are written")
+    arguments = parser.parse_args()
+    benchmark = Benchmark(arguments.db, arguments.habits, arguments.days, arguments.seed, arguments.repeat)
+    run_results = {"parameters": {"habits": arguments.habits, "days": arguments.days, "seed": arguments.seed,
+                                  "repeat": arguments.repeat},
+                   "results": benchmark.run()}
+    if arguments.save:
+        with open(arguments.save, "w") as file:
+            json.dump(run_results, file, indent=2)
+    print(json.dumps(run_results, indent=2))
+    if arguments.baseline:
+        with open(arguments.baseline) as file:
+            found = Benchmark.compare(run_results["results"], json.load(file)["results"], arguments.tolerance)
+        for row in found:
+            print("Regression: {} {} {} ms -> {} ms".format(*row), file=sys.stderr)
+        sys.exit(1 if found else 0)
@@ -1,18 +1,56 @@
 import sqlite3
+import contextlib
+import threading
+import time
 import datetime as date
 
 
+class Connection(sqlite3.Connection):
+    """The Connection class is a database connection, which keeps its own user and transaction depth, so they are
+    forgotten together with the connection, see DB.connect().
+
+    Attributes:
+        user (str): The user, whose habits the connection reads and writes.
+        transactions (int): The depth of the currently open transactions, see DB.transaction().
+    """
+    user = "default"
+    transactions = 0
+
+
 class DB:
     """The DB class consists of essential methods for interacting with database.
 
     Methods:
-        get_db(name="main.db"): Creates a connection with a database.
+        get_db(name="main.db", profile="default", check_same_thread=True, user="default", **pragmas): Creates a
+        connection with a database.
+        connect(name="main.db", user="default", read_only=False, check_same_thread=True): Opens a connection bound to
+        the user, without creating the tables.
+        set_user(db, user): Binds the connection to the user, whose habits it reads and writes.
+        user_of(db): Returns the user, to whom the connection is bound.
+        ordinal(day): Returns the ordinal of the day, which is stored instead of its ISO date.
+        snapshot_due(last_index, index): Returns whether a snapshot is taken after the check-off of the period.
+        retry(function, *args, retries=5, delay=0.05, **kwargs): Calls the function again, while the database is
+        locked.
+        checkpoint(db, mode="PASSIVE"): Copies the WAL journal's pages back into the database.
+        start_checkpoints(name="main.db", interval=60.0, mode="PASSIVE"): Checkpoints the database periodically in a
+        background thread.
         create_tables(db): Creates the Habit, Streak and Track tables in the database, if they don't exist already.
+        migrate(db): Upgrades the database schema to the latest version.
+        log_events(db, habit_ids=None): Logs the events of the habits, which were stored without the DB methods.
+        transaction(db): Groups the database calls into one transaction, which is committed once at the end.
+        add_listener(listener): Registers a function, which is called when a habit's data is updated or deleted.
+        remove_listener(listener): Unregisters a function registered by add_listener().
         add_habit(db, name, description, start_date, valid_till, periodicity): Inserts the habit's data into the Habit
         table.
+        insert_habit(db, name, description, start_date, valid_till, periodicity): Inserts the habit's data into the
+        Habit table and returns its id.
         habit_check(db, name, check, check_date): Inserts the habit's data into the Tracker table.
+        habit_checks(db, name, checks): Inserts many check-offs of a habit into the Tracker table at once.
         add_streak(db, name, current_streak, longest_streak, break_count, last_break): Inserts the habit's data
         into the Streak table.
+        add_rollup(db, name, rollup): Adds the completed and missed check-offs of the periods to the Rollup table.
+        add_snapshots_by_id(db, habit_id, snapshots): Inserts the snapshots of a habit's state into the
+        StreakSnapshot table.
         update_habit(db, name, streak, last_check, status, end_date): Updates the habit's data in the Habit table.
         update_streak(db, name, current_streak, longest_streak, break_count, last_break): Updates the habit's data
         in the Streak table.
@@ -21,26 +59,454 @@ class DB:
         delete_habit(db, name): Deletes certain habit data from the Habit table.
         delete_streak(db, name): Deletes the certain habit data from the Streak table.
         delete_tracker(db, name): Deletes the certain habit data from the Tracker table.
+        delete_rollup(db, name): Deletes the certain habit data from the Rollup table.
+        delete_snapshots_by_id(db, habit_id): Deletes the certain habit data from the StreakSnapshot table.
+        id_of(db, name): Returns the habit's id, in spite of the habit's status.
         name_to_id(db, name): Returns the habit's id, when the habit's name is passed and the habit's status is "Still
         in progress".
         db_close(db): Closes the database.
+
+    Every method writing the rows of a habit found by its name has a *_by_id() variant, e.g. habit_check_by_id(db,
+    habit_id, check, check_date), which finds the rows by the habit's id instead, so a habit with a known id, e.g. a
+    DbHabit, isn't looked up by its name again.
     """
+    # The user of the connections, which aren't bound to any user, and of the habits created before the users.
+    DEFAULT_USER = "default"
+    # The Julian day of the day before 0001-01-01, i.e. julianday(date) - JULIAN_OFFSET is the ordinal of the date,
+    # and date(ordinal + JULIAN_OFFSET) is the ISO date of the ordinal.
+    JULIAN_OFFSET = 1721424.5
+    # The count of periods, after which a new snapshot of a habit's state is taken, so a past state is replayed from
+    # at most this many check-offs.
+    SNAPSHOT_PERIODS = 16
+    # The tables storing the days as ordinals, with their definitions and their day columns.
+    ORDINAL_TABLES = {
+        "habit": ("""
+            CREATE TABLE {} (
+                habit_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT,
+                description TEXT,
+                start_date INTEGER,
+                valid_till INTEGER,
+                periodicity TEXT,
+                status TEXT,
+                streak INTEGER,
+                last_check INTEGER,
+                end_date INTEGER,
+                last_check_day INTEGER,
+                user_id TEXT NOT NULL DEFAULT 'default',
+                UNIQUE (user_id, name)
+            )
+            """, ("start_date", "valid_till", "last_check", "end_date", "last_check_day")),
+        "streak": ("""
+            CREATE TABLE {} (
+                habit_id INTEGER PRIMARY KEY,
+                current_streak INTEGER,
+                longest_streak INTEGER,
+                break_count INTEGER,
+                last_break INTEGER,
+                FOREIGN KEY (habit_id) REFERENCES habit(habit_id)
+            )
+            """, ("last_break",)),
+        "tracker": ("""
+            CREATE TABLE {} (
+                tracker_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                habit_id INTEGER,
+                checked_off INTEGER,
+                date INTEGER,
+                FOREIGN KEY (habit_id) REFERENCES habit(habit_id)
+            )
+            """, ("date",)),
+        "rollup": ("""
+            CREATE TABLE {} (
+                habit_id INTEGER,
+                period_start INTEGER,
+                completed INTEGER,
+                missed INTEGER,
+                PRIMARY KEY (habit_id, period_start),
+                FOREIGN KEY (habit_id) REFERENCES habit(habit_id)
+            ) WITHOUT ROWID
+            """, ("period_start",)),
+    }
+    # The views presenting the ordinals of the tables as ISO dates, for the reports and for reading the database by
+    # hand. The last checked-off week of a "Weekly" habit isn't stored, since it's derived from the last check.
+    VIEWS = {
+        "habit_iso": f"""
+            CREATE VIEW IF NOT EXISTS habit_iso AS
+            SELECT habit_id, name, description, date(start_date + {JULIAN_OFFSET}) AS start_date,
+            date(valid_till + {JULIAN_OFFSET}) AS valid_till, periodicity, status, streak,
+            date(last_check + {JULIAN_OFFSET}) AS last_check, date(end_date + {JULIAN_OFFSET}) AS end_date,
+            CASE WHEN last_check IS NULL THEN NULL WHEN periodicity = 'Weekly'
+            THEN date(last_check + {JULIAN_OFFSET}) || ' : ' || date(last_check + 6 + {JULIAN_OFFSET}) ELSE ''
+            END AS last_check_week,
+            date(last_check_day + {JULIAN_OFFSET}) AS last_check_day, user_id
+            FROM habit
+            """,
+        "streak_iso": f"""
+            CREATE VIEW IF NOT EXISTS streak_iso AS
+            SELECT habit_id, current_streak, longest_streak, break_count,
+            COALESCE(date(last_break + {JULIAN_OFFSET}), 'Not broken') AS last_break
+            FROM streak
+            """,
+        "tracker_iso": f"""
+            CREATE VIEW IF NOT EXISTS tracker_iso AS
+            SELECT tracker_id, habit_id, checked_off, date(date + {JULIAN_OFFSET}) AS date
+            FROM tracker
+            """,
+        "rollup_iso": f"""
+            CREATE VIEW IF NOT EXISTS rollup_iso AS
+            SELECT habit_id, date(period_start + {JULIAN_OFFSET}) AS period_start, completed, missed
+            FROM rollup
+            """,
+    }
+    # The kinds of the events logged when a habit's status becomes "Broken" or "Completed".
+    ENDED_EVENTS = {"Broken": "break", "Completed": "complete"}
+    # The statement logging the creation of the habits selected from the Habit table.
+    CREATE_EVENT = """
+        INSERT INTO
+        habit_event(habit_id, kind, day, data)
+        SELECT habit_id, 'create', start_date, json_object('name', name, 'description', description, 'valid_till',
+        valid_till, 'periodicity', periodicity, 'user_id', user_id)
+        FROM habit
+        """
+    # The functions called with the database and the habit's name, when the habit's data is updated or deleted.
+    _listeners = []
+    # The schema migrations, the statements of the n-th migration upgrade the database to the version n.
+    # The version of a database is stored in its "user_version" pragma.
+    MIGRATIONS = [
+        (
+            # Version 1: The indexes for the tracker history and the habit lists.
+            "CREATE INDEX IF NOT EXISTS tracker_habit_date ON tracker(habit_id, date)",
+            "CREATE INDEX IF NOT EXISTS habit_status_periodicity ON habit(status, periodicity)",
+            "CREATE INDEX IF NOT EXISTS habit_periodicity ON habit(periodicity)",
+        ),
+        (
+            # Version 2: The completed and missed check-offs per habit and period, see Rebuild.backfill_rollup().
+            """
+            CREATE TABLE IF NOT EXISTS rollup (
+                habit_id INTEGER,
+                period_start TEXT,
+                completed INTEGER,
+                missed INTEGER,
+                PRIMARY KEY (habit_id, period_start),
+                FOREIGN KEY (habit_id) REFERENCES habit(habit_id)
+            ) WITHOUT ROWID
+            """,
+            "CREATE INDEX IF NOT EXISTS rollup_period_start ON rollup(period_start)",
+        ),
+        (
+            # Version 3: The habits are owned by the users, a habit's name is unique only among its user's habits.
+            lambda db: DB._partition_habits(db),
+            "CREATE INDEX IF NOT EXISTS habit_user_status_periodicity ON habit(user_id, status, periodicity)",
+            "CREATE INDEX IF NOT EXISTS habit_user_periodicity ON habit(user_id, periodicity)",
+        ),
+        (
+            # Version 4: The days are stored as ordinals, the ISO dates are presented by the views.
+            lambda db: DB._store_ordinals(db),
+            "CREATE INDEX IF NOT EXISTS tracker_habit_date ON tracker(habit_id, date)",
+            "CREATE INDEX IF NOT EXISTS rollup_period_start ON rollup(period_start)",
+            "CREATE INDEX IF NOT EXISTS habit_user_status_periodicity ON habit(user_id, status, periodicity)",
+            "CREATE INDEX IF NOT EXISTS habit_user_periodicity ON habit(user_id, periodicity)",
+            *VIEWS.values(),
+        ),
+        (
+            # Version 5: The count of committed lines of every imported file, see Transfer.load().
+            """
+            CREATE TABLE IF NOT EXISTS import_checkpoint (
+                user_id TEXT,
+                source TEXT,
+                line INTEGER,
+                PRIMARY KEY (user_id, source)
+            ) WITHOUT ROWID
+            """,
+        ),
+        (
+            # Version 6: The snapshots of the habits' states, from which a past state is replayed, see
+            # Analysis.streak_as_of().
+            """
+            CREATE TABLE IF NOT EXISTS streak_snapshot (
+                habit_id INTEGER,
+                day INTEGER,
+                last_index INTEGER,
+                current_streak INTEGER,
+                longest_streak INTEGER,
+                break_count INTEGER,
+                last_break INTEGER,
+                status TEXT,
+                PRIMARY KEY (habit_id, day),
+                FOREIGN KEY (habit_id) REFERENCES habit(habit_id)
+            ) WITHOUT ROWID
+            """,
+        ),
+        (
+            # Version 7: The append-only log of every habit's creation, check-off, break, completion and deletion, from
+            # which the Habit and the Streak tables are recovered, see Rebuild.recover().
+            """
+            CREATE TABLE IF NOT EXISTS habit_event (
+                event_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                habit_id INTEGER,
+                kind TEXT,
+                day INTEGER,
+                checked_off INTEGER,
+                data TEXT,
+                logged_at TEXT DEFAULT CURRENT_TIMESTAMP
+            )
+            """,
+            "CREATE INDEX IF NOT EXISTS habit_event_habit_kind_day ON habit_event(habit_id, kind, day)",
+            lambda db: DB.log_events(db),
+            """
+            CREATE TRIGGER IF NOT EXISTS habit_event_no_update BEFORE UPDATE ON habit_event
+            BEGIN
+                SELECT RAISE(ABORT, 'The habit events are append-only!');
+            END
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS habit_event_no_delete BEFORE DELETE ON habit_event
+            BEGIN
+                SELECT RAISE(ABORT, 'The habit events are append-only!');
+            END
+            """,
+            f"""
+            CREATE VIEW IF NOT EXISTS habit_event_iso AS
+            SELECT event_id, habit_id, kind, date(day + {JULIAN_OFFSET}) AS day, checked_off, data, logged_at
+            FROM habit_event
+            """,
+        ),
+        (
+            # Version 8: The indexes of the leaderboards, see Analysis.iter_leaderboard(). Every entry ends with the
+            # rowid, i.e. the habit_id, so an index is ordered by (streak, habit_id) as the leaderboard's pages are.
+            "CREATE INDEX IF NOT EXISTS streak_longest ON streak(longest_streak)",
+            "CREATE INDEX IF NOT EXISTS streak_current ON streak(current_streak)",
+        ),
+        (
+            # Version 9: The streaks are owned by their habits' users, so a leaderboard's page walks only the index
+            # entries of the connection's user, and the indexes of version 8 are replaced by the users' ones.
+            lambda db: DB._own_streaks(db),
+            "DROP INDEX IF EXISTS streak_longest",
+            "DROP INDEX IF EXISTS streak_current",
+            "CREATE INDEX IF NOT EXISTS streak_user_longest ON streak(user_id, longest_streak, habit_id)",
+            "CREATE INDEX IF NOT EXISTS streak_user_current ON streak(user_id, current_streak, habit_id)",
+        ),
+    ]
+    # The connection profiles, which set the pragmas of the connections opened by get_db().
+    PROFILES = {
+        # The SQLite defaults: the rollback journal, where a writer blocks the readers.
+        "default": {},
+        # The WAL journal: the readers never block the writer, and the writer never blocks the readers.
+        "concurrent": {
+            "journal_mode": "WAL",
+            # With WAL, NORMAL is safe from corruption and syncs only on checkpoints.
+            "synchronous": "NORMAL",
+            # The negative value is in KiB, i.e. a 64 MiB page cache.
+            "cache_size": -65536,
+            # The database is read through a 256 MiB memory map.
+            "mmap_size": 268435456,
+            # The milliseconds a connection waits for a lock before the "database is locked" error.
+            "busy_timeout": 5000,
+            # The pages, after which the WAL journal is checkpointed automatically by the committing connection.
+            "wal_autocheckpoint": 1000,
+        },
+    }
+
     @classmethod
-    def get_db(cls, name="main.db"):
+    def get_db(cls, name="main.db", profile="default", check_same_thread=True, user=DEFAULT_USER, **pragmas):
         """
         Creates a connection with a database.
 
+        The profile sets the pragmas of the connection (see DB.PROFILES):
+            "default": Keeps the SQLite defaults, i.e. the rollback journal.
+            "concurrent": Switches the database to the WAL journal, so the readers (e.g. the reports of the Analysis
+            class) never block the writer and the writer never blocks the readers. The writes are synced only on the
+            checkpoints, a larger page cache and a memory map are used, and a locked database is waited for 5 seconds.
+            The WAL journal should be checkpointed periodically, see checkpoint() and start_checkpoints().
+        Every pragma can also be passed as a keyword argument, e.g. get_db(profile="concurrent", cache_size=-8192).
+
         :param name: Name of a database.
         :type name: str
+        :param profile: The name of the connection profile (default "default").
+        :type profile: str
+        :param check_same_thread: Whether the connection can be used only by the thread, which created it, pass False
+        only if the connection is never used by two threads at once (default True).
+        :type check_same_thread: bool
+        :param user: The user, whose habits the connection reads and writes (default "default").
+        :type user: str
+        :param pragmas: The pragmas overriding the profile.
+        :type pragmas: dict
         :return: Returns the database.
         :rtype: class
         """
-        db = sqlite3.connect(name, timeout=5)
+        db = cls.connect(name, user, check_same_thread=check_same_thread)
+        for pragma, value in dict(cls.PROFILES[profile], **pragmas).items():
+            if not pragma.isidentifier():
+                raise ValueError(f"There is no \"{pragma}\" pragma!")
+            # Switching the journal mode needs an exclusive lock, so it is retried while other connections use it.
+            cls.retry(db.execute, f"PRAGMA {pragma} = {value}")
         cls.create_tables(db)
         return db
 
+    @classmethod
+    def connect(cls, name="main.db", user=DEFAULT_USER, read_only=False, check_same_thread=True):
+        """
+        Opens a connection bound to the user, without setting the pragmas or creating the tables, e.g. to read a
+        database written by another connection.
+
+        :param name: Name of a database.
+        :type name: str
+        :param user: The user, whose habits the connection reads and writes (default "default").
+        :type user: str
+        :param read_only: Whether the database is opened read-only, in which case it must exist (default False).
+        :type read_only: bool
+        :param check_same_thread: Whether the connection can be used only by the thread, which created it (default
+        True).
+        :type check_same_thread: bool
+        :return: Returns the database.
+        :rtype: class
+        """
+        db = sqlite3.connect(f"file:{name}?mode=ro" if read_only else name, timeout=5,
+                             check_same_thread=check_same_thread, factory=Connection, uri=read_only)
+        cls.set_user(db, user)
+        return db
+
+    @classmethod
+    def set_user(cls, db, user):
+        """
+        Binds the connection to the user, so every method of the DB, DbHabit and Analysis classes called with the
+        connection reads and writes only the user's habits. The user is kept by the connection itself, so only the
+        connections opened by connect() or get_db() can be bound.
+
+        :param db: The database, to which you are connected.
+        :type db: class
+        :param user: The user.
+        :type user: str
+        :return: None
+        """
+        if not isinstance(db, Connection):
+            raise TypeError("Only the connections opened by DB.connect() or DB.get_db() can be bound to a user!")
+        db.user = str(user)
+
+    @classmethod
+    def user_of(cls, db):
+        """
+        Returns the user, to whom the connection is bound.
+
+        :param db: The database, to which you are connected.
+        :type db: class
+        :return: Returns the user, or DEFAULT_USER if the connection wasn't opened by connect() or get_db().
+        :rtype: str
+        """
+        if not isinstance(db, Connection):
+            return cls.DEFAULT_USER
+        return db.user
+
     @staticmethod
-    def create_tables(db):
+    def ordinal(day):
+        """
+        Returns the ordinal of the day, which is stored instead of its ISO date.
+
+        :param day: The day as an ISO date, a date or an ordinal, the empty values and the "Not broken" and the
+        "Not ended" placeholders are stored as NULL.
+        :type day: str
+        :return: Returns the ordinal, or None if there is no day.
+        :rtype: int
+        """
+        if day is None or day in ("", "Not broken", "Not ended"):
+            return None
+        if isinstance(day, int):
+            return day
+        if isinstance(day, str):
+            day = date.date.fromisoformat(day)
+        return day.toordinal()
+
+    @classmethod
+    def snapshot_due(cls, last_index, index):
+        """
+        Returns whether a snapshot of the habit's state is taken after the check-off, i.e. whether the check-off is
+        the first one of a block of SNAPSHOT_PERIODS periods.
+
+        :param last_index: The index of the period checked-off before, -1 if there is none.
+        :type last_index: int
+        :param index: The index of the checked-off period.
+        :type index: int
+        :return: Returns True if the snapshot is taken.
+        :rtype: bool
+        """
+        return index // cls.SNAPSHOT_PERIODS != last_index // cls.SNAPSHOT_PERIODS
+
+    @staticmethod
+    def retry(function, *args, retries=5, delay=0.05, **kwargs):
+        """
+        Calls the function, and while it fails because the database is locked by another connection, calls it again,
+        doubling the waiting time after every attempt.
+
+        :param function: The function, which uses the database.
+        :type function: function
+        :param args: The positional arguments of the function.
+        :type args: tuple
+        :param retries: The count of retries (default 5).
+        :type retries: int
+        :param delay: The seconds to wait before the first retry (default 0.05).
+        :type delay: float
+        :param kwargs: The keyword arguments of the function.
+        :type kwargs: dict
+        :return: Returns whatever the function returns.
+        """
+        for attempt in range(retries + 1):
+            try:
+                return function(*args, **kwargs)
+            except sqlite3.OperationalError as error:
+                if attempt == retries or not ("locked" in str(error) or "busy" in str(error)):
+                    raise
+                time.sleep(delay * 2 ** attempt)
+
+    @classmethod
+    def checkpoint(cls, db, mode="PASSIVE"):
+        """
+        Copies the pages of the WAL journal back into the database, so the journal doesn't grow without bounds. The
+        "PASSIVE" mode doesn't wait for the readers and the writer, while "FULL", "RESTART" and "TRUNCATE" do.
+
+        :param db: The database, to which you are connected.
+        :type db: class
+        :param mode: The checkpoint mode (default "PASSIVE").
+        :type mode: str
+        :return: Returns whether the checkpoint was blocked, the pages in the journal and the checkpointed pages.
+        :rtype: tuple
+        """
+        if mode not in ("PASSIVE", "FULL", "RESTART", "TRUNCATE"):
+            raise ValueError(f"There is no \"{mode}\" checkpoint mode!")
+        return cls.retry(db.execute, f"PRAGMA wal_checkpoint({mode})").fetchone()
+
+    @classmethod
+    def start_checkpoints(cls, name="main.db", interval=60.0, mode="PASSIVE"):
+        """
+        Checkpoints the database periodically in a background thread, which uses its own connection.
+
+        :param name: Name of a database.
+        :type name: str
+        :param interval: The seconds between the checkpoints (default 60.0).
+        :type interval: float
+        :param mode: The checkpoint mode (default "PASSIVE").
+        :type mode: str
+        :return: Returns the event, which stops the checkpoints when it is set.
+        :rtype: class
+        """
+        stop = threading.Event()
+
+        def run():
+            db = sqlite3.connect(name, timeout=5)
+            try:
+                while not stop.wait(interval):
+                    try:
+                        cls.checkpoint(db, mode)
+                    except sqlite3.OperationalError:
+                        # The database stayed locked, the next interval will try again.
+                        pass
+            finally:
+                db.close()
+
+        threading.Thread(target=run, name="habit-tracker-checkpoints", daemon=True).start()
+        return stop
+
+    @classmethod
+    def create_tables(cls, db):
         """
         Creates the Habit, Streak and Track tables in the database, if they don't exist already.
 
@@ -88,10 +554,278 @@ class DB:
         )
         """)
 
-        db.commit()
+        cls._commit(db)
+        cls.migrate(db)
+
+    @classmethod
+    def migrate(cls, db):
+        """
+        Upgrades the database schema to the latest version, by running the migrations the database hasn't got yet.
+        Every migration runs in its own transaction together with the version update, so an interrupted upgrade can be
+        continued by calling migrate() again.
+
+        :param db: The database, to which you are connected.
+        :type db: class
+        :return: Returns the version of the database schema.
+        :rtype: int
+        """
+        version = db.execute("PRAGMA user_version").fetchone()[0]
+        for number, migration in enumerate(cls.MIGRATIONS[version:], start=version + 1):
+            with cls.transaction(db):
+                for statement in migration:
+                    if callable(statement):
+                        statement(db)
+                    else:
+                        db.execute(statement)
+                db.execute(f"PRAGMA user_version = {number}")
+        return max(version, len(cls.MIGRATIONS))
 
     @staticmethod
-    def add_habit(db, name, description, start_date, valid_till, periodicity):
+    def _own_streaks(db):
+        """
+        Adds the user_id column to the Streak table and gives every streak to its habit's user.
+
+        :param db: The database, to which you are connected.
+        :type db: class
+        :return: None
+        """
+        if "user_id" not in (column[1] for column in db.execute("PRAGMA table_info(streak)")):
+            db.execute("ALTER TABLE streak ADD COLUMN user_id TEXT")
+        db.execute("UPDATE streak SET user_id = (SELECT user_id FROM habit WHERE habit.habit_id = streak.habit_id)")
+
+    @staticmethod
+    def _partition_habits(db):
+        """
+        Rebuilds the Habit table with the user_id column, since SQLite can't change the UNIQUE constraint of a column.
+        The existing habits are given to the DEFAULT_USER and keep their ids.
+
+        :param db: The database, to which you are connected.
+        :type db: class
+        :return: None
+        """
+        if "user_id" in (column[1] for column in db.execute("PRAGMA table_info(habit)")):
+            return
+        DB._drop_views(db)
+        columns = ("habit_id, name, description, start_date, valid_till, periodicity, status, streak, last_check, "
+                   "end_date, last_check_week, last_check_day")
+        db.execute(f"""
+        CREATE TABLE habit_partitioned (
+            habit_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT,
+            description TEXT,
+            start_date TEXT,
+            valid_till TEXT,
+            periodicity TEXT,
+            status TEXT,
+            streak INTEGER,
+            last_check TEXT,
+            end_date TEXT,
+            last_check_week TEXT,
+            last_check_day TEXT,
+            user_id TEXT NOT NULL DEFAULT '{DB.DEFAULT_USER}',
+            UNIQUE (user_id, name)
+        )
+        """)
+        db.execute(f"INSERT INTO habit_partitioned({columns}) SELECT {columns} FROM habit")
+        # The ids of the deleted habits aren't given again.
+        sequence = db.execute("SELECT seq FROM sqlite_sequence WHERE name = 'habit'").fetchone()
+        db.execute("DROP TABLE habit")
+        db.execute("ALTER TABLE habit_partitioned RENAME TO habit")
+        if sequence:
+            db.execute("DELETE FROM sqlite_sequence WHERE name = 'habit'")
+            db.execute("INSERT INTO sqlite_sequence(name, seq) VALUES ('habit', ?)", sequence)
+
+    @classmethod
+    def _store_ordinals(cls, db):
+        """
+        Rebuilds the tables, which store the days as ISO dates, converting the dates into ordinals. The values, which
+        aren't dates, e.g. the "Not broken" last break, become NULL. The rows keep their ids.
+
+        :param db: The database, to which you are connected.
+        :type db: class
+        :return: None
+        """
+        for table, (definition, days) in cls.ORDINAL_TABLES.items():
+            types = {column[1]: column[2] for column in db.execute(f"PRAGMA table_info({table})")}
+            if all(types.get(day) == "INTEGER" for day in days):
+                continue
+            # A table, to which a view refers, can't be renamed, the views are created again by the migration.
+            cls._drop_views(db)
+            db.execute(definition.format(f"{table}_ordinal"))
+            columns = [column[1] for column in db.execute(f"PRAGMA table_info({table}_ordinal)")
+                       if column[1] in types]
+            values = [f"CAST(julianday({column}) - {cls.JULIAN_OFFSET} AS INTEGER)" if column in days else column
+                      for column in columns]
+            db.execute(f"INSERT INTO {table}_ordinal({', '.join(columns)}) SELECT {', '.join(values)} FROM {table}")
+            # The ids of the deleted rows aren't given again.
+            sequence = db.execute("SELECT seq FROM sqlite_sequence WHERE name = ?", (table,)).fetchone()
+            db.execute(f"DROP TABLE {table}")
+            db.execute(f"ALTER TABLE {table}_ordinal RENAME TO {table}")
+            if sequence:
+                db.execute("DELETE FROM sqlite_sequence WHERE name = ?", (table,))
+                db.execute("INSERT INTO sqlite_sequence(name, seq) VALUES (?, ?)", (table, sequence[0]))
+
+    @classmethod
+    def _drop_views(cls, db):
+        """
+        Drops the views of the ISO dates.
+
+        :param db: The database, to which you are connected.
+        :type db: class
+        :return: None
+        """
+        for view in cls.VIEWS:
+            db.execute(f"DROP VIEW IF EXISTS {view}")
+
+    @classmethod
+    def log_events(cls, db, habit_ids=None):
+        """
+        Logs the events of the habits, which were stored without the DB methods, e.g. before the event log: the
+        creation of every habit, every check-off of an existing habit in the order of the Tracker table, and the break
+        or the completion of the ended habits.
+
+        :param db: The database, to which you are connected.
+        :type db: class
+        :param habit_ids: The ids of the habits, if not passed, the events of all habits are logged (default None).
+        :type habit_ids: list
+        :return: None
+        """
+        where = ""
+        if habit_ids is not None:
+            habit_ids = list(habit_ids)
+            where = f" WHERE habit_id IN ({', '.join('?' * len(habit_ids))})"
+        cur = db.cursor()
+        cur.execute(cls.CREATE_EVENT + where + " ORDER BY habit_id", habit_ids or ())
+        cur.execute(f"""
+        INSERT INTO
+        habit_event(habit_id, kind, day, checked_off)
+        SELECT habit_id, 'check', date, checked_off FROM tracker{where or " WHERE 1"}
+        AND habit_id IN (SELECT habit_id FROM habit) ORDER BY tracker_id
+        """, habit_ids or ())
+        cur.execute(f"""
+        INSERT INTO
+        habit_event(habit_id, kind, day)
+        SELECT habit_id, CASE status WHEN 'Broken' THEN 'break' ELSE 'complete' END, end_date
+        FROM habit{where or " WHERE 1"} AND status IN ('Broken', 'Completed') ORDER BY habit_id
+        """, habit_ids or ())
+        cls._commit(db)
+
+    @classmethod
+    @contextlib.contextmanager
+    def transaction(cls, db):
+        """
+        Groups the database calls into one transaction, which is committed once at the end, or rolled back if an
+        exception is raised. While the transaction is open, the methods of the DB class don't commit by themselves.
+        Nested transactions are created as savepoints, so they can be rolled back without affecting the outer one.
+        The outer transaction waits for the other writers, retrying while the database is locked.
+
+        :param db: The database, to which you are connected.
+        :type db: class
+        :return: Returns the database.
+        :rtype: class
+        """
+        if not isinstance(db, Connection):
+            raise TypeError("Only the connections opened by DB.connect() or DB.get_db() can open a transaction!")
+        depth = db.transactions
+        savepoint = f"habit_tracker_{depth}"
+        if depth:
+            db.execute(f"SAVEPOINT {savepoint}")
+        elif not db.in_transaction:
+            # The write lock is taken at the beginning, so the transaction can't fail with "database is locked" halfway.
+            cls.retry(db.execute, "BEGIN IMMEDIATE")
+        db.transactions = depth + 1
+        try:
+            yield db
+        except BaseException:
+            if depth:
+                db.execute(f"ROLLBACK TO {savepoint}")
+                db.execute(f"RELEASE {savepoint}")
+            else:
+                db.rollback()
+            raise
+        else:
+            if depth:
+                db.execute(f"RELEASE {savepoint}")
+            else:
+                db.commit()
+        finally:
+            db.transactions = depth
+
+    @classmethod
+    def _commit(cls, db):
+        """
+        Commits the changes, unless they are a part of a transaction opened by transaction().
+
+        :param db: The database, to which you are connected.
+        :type db: class
+        :return: None
+        """
+        if not getattr(db, "transactions", 0):
+            db.commit()
+
+    @classmethod
+    def add_listener(cls, listener):
+        """
+        Registers a function, which is called with the database and the habit's name, when the habit's data is updated
+        or deleted, e.g. to drop the habit from a cache.
+
+        :param listener: The function.
+        :type listener: function
+        :return: None
+        """
+        cls._listeners.append(listener)
+
+    @classmethod
+    def remove_listener(cls, listener):
+        """
+        Unregisters a function registered by add_listener().
+
+        :param listener: The function.
+        :type listener: function
+        :return: None
+        """
+        if listener in cls._listeners:
+            cls._listeners.remove(listener)
+
+    @classmethod
+    def _notify(cls, db, name):
+        """
+        Calls the registered listeners with the database and the habit's name.
+
+        :param db: The database, to which you are connected.
+        :type db: class
+        :param name: The name of a habit.
+        :type name: str
+        :return: None
+        """
+        for listener in cls._listeners:
+            listener(db, name)
+
+    @classmethod
+    def _notify_id(cls, db, habit_id, name=None):
+        """
+        Calls the registered listeners with the database and the name of the habit with the id, the name is read only
+        if it isn't passed and there are listeners.
+
+        :param db: The database, to which you are connected.
+        :type db: class
+        :param habit_id: The id of a habit.
+        :type habit_id: int
+        :param name: The name of the habit (default None).
+        :type name: str
+        :return: None
+        """
+        if not cls._listeners:
+            return
+        if name is None:
+            row = db.execute("SELECT name FROM habit WHERE habit_id = ?", (habit_id,)).fetchone()
+            if not row:
+                return
+            name = row[0]
+        cls._notify(db, name)
+
+    @classmethod
+    def add_habit(cls, db, name, description, start_date, valid_till, periodicity):
         """
         Inserts the habit's data into the Habit table.
 
@@ -107,7 +841,32 @@ class DB:
         :type valid_till: str
         :param periodicity: The periodicity of a habit (i.e. "Daily", "Weekly").
         :type periodicity: str
-        :return: None
+        :return: Returns True if a habit with such a name already exists, otherwise None.
+        :rtype: bool
+        """
+        if cls.insert_habit(db, name, description, start_date, valid_till, periodicity) is None:
+            return True
+
+    @classmethod
+    def insert_habit(cls, db, name, description, start_date, valid_till, periodicity):
+        """
+        Inserts the habit's data into the Habit table, like add_habit(), but returns the new habit's id, so the habit's
+        rows can be written by the *_by_id() methods without looking the habit up by its name.
+
+        :param db: The database, to which you are connected.
+        :type db: class
+        :param name: The name of a habit.
+        :type name: str
+        :param description: The description of a habit.
+        :type description: str
+        :param start_date: The start date of a habit.
+        :type start_date: str
+        :param valid_till: The expiration date of a habit.
+        :type valid_till: str
+        :param periodicity: The periodicity of a habit (i.e. "Daily", "Weekly").
+        :type periodicity: str
+        :return: Returns the habit's id, or None if a habit with such a name already exists.
+        :rtype: int
         """
         cur = db.cursor()
         if not start_date:
@@ -115,14 +874,18 @@ class DB:
         try:
             cur.execute("""
             INSERT INTO
-            habit(name, description, start_date, valid_till, periodicity, status)
-            VALUES (?, ?, ?, ?, ?, ?)
-            """, (name, description, start_date, valid_till, periodicity, "Still in progress"))
+            habit(name, description, start_date, valid_till, periodicity, status, user_id)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, (name, description, cls.ordinal(start_date), cls.ordinal(valid_till), periodicity, "Still in progress",
+                  cls.user_of(db)))
         except sqlite3.IntegrityError:
             print(f"\nYou can't create a habit with name: {name}\nBecause it already exists!\nBefore creating a new"
                   f"habit with {name} name\nYou should delete the previous one!\n")
-            return True
-        db.commit()
+            return None
+        habit_id = cur.lastrowid
+        cur.execute(cls.CREATE_EVENT + " WHERE habit_id = ?", (habit_id,))
+        cls._commit(db)
+        return habit_id
 
     @classmethod
     def habit_check(cls, db, name, check, check_date, status="Still in progress"):
@@ -141,16 +904,82 @@ class DB:
         :type status: str
         :return:
         """
+        cls.habit_check_by_id(db, cls.name_to_id(db, name, status), check, check_date)
+
+    @classmethod
+    def habit_check_by_id(cls, db, habit_id, check, check_date):
+        """
+        Inserts the habit's data into the Tracker table.
+
+        :param db: The database, to which you are connected.
+        :type db: class
+        :param habit_id: The id of a habit.
+        :type habit_id: int
+        :param check: The check-off (i.e. True or False).
+        :type check: bool
+        :param check_date: The check date.
+        :type check_date: str
+        :return: None
+        """
         cur = db.cursor()
-        habit_id = cls.name_to_id(db, name, status)
         if not check_date:
             check_date = str(date.date.today())
         cur.execute("""
             INSERT INTO
             tracker(habit_id, checked_off, date)
             VALUES (?, ?, ?)
-            """, (habit_id, check, check_date))
-        db.commit()
+            """, (habit_id, check, cls.ordinal(check_date)))
+        cur.execute("""
+            INSERT INTO
+            habit_event(habit_id, kind, day, checked_off)
+            VALUES (?, 'check', ?, ?)
+            """, (habit_id, cls.ordinal(check_date), check))
+        cls._commit(db)
+
+    @classmethod
+    def habit_checks(cls, db, name, checks, status="Still in progress"):
+        """
+        Inserts many check-offs of a habit into the Tracker table at once.
+
+        :param db: The database, to which you are connected.
+        :type db: class
+        :param name: The name of a habit.
+        :type name: str
+        :param checks: The check-offs as (check, check_date) pairs.
+        :type checks: list
+        :param status: The status of a habit.
+        :type status: str
+        :return: None
+        """
+        cls.habit_checks_by_id(db, cls.name_to_id(db, name, status), checks)
+
+    @classmethod
+    def habit_checks_by_id(cls, db, habit_id, checks):
+        """
+        Inserts many check-offs of a habit into the Tracker table at once.
+
+        :param db: The database, to which you are connected.
+        :type db: class
+        :param habit_id: The id of a habit.
+        :type habit_id: int
+        :param checks: The check-offs as (check, check_date) pairs.
+        :type checks: list
+        :return: None
+        """
+        cur = db.cursor()
+        today = date.date.today().toordinal()
+        rows = [(habit_id, check, cls.ordinal(check_date) or today) for check, check_date in checks]
+        cur.executemany("""
+            INSERT INTO
+            tracker(habit_id, checked_off, date)
+            VALUES (?, ?, ?)
+            """, rows)
+        cur.executemany("""
+            INSERT INTO
+            habit_event(habit_id, kind, day, checked_off)
+            VALUES (?1, 'check', ?3, ?2)
+            """, rows)
+        cls._commit(db)
 
     @classmethod
     def add_streak(cls, db, name, current_streak, longest_streak, break_count, last_break):
@@ -171,27 +1000,110 @@ class DB:
         :type last_break: str
         :return: None
         """
+        habit_id = cls.id_of(db, name)
+        if habit_id is not None:
+            cls.add_streak_by_id(db, habit_id, current_streak, longest_streak, break_count, last_break, name)
+
+    @classmethod
+    def add_streak_by_id(cls, db, habit_id, current_streak, longest_streak, break_count, last_break, name=None):
+        """
+        Inserts the habit's data into the Streak table.
+
+        :param db: The database, to which you are connected.
+        :type db: class
+        :param habit_id: The id of a habit.
+        :type habit_id: int
+        :param current_streak: The current streak of a habit.
+        :type current_streak: int
+        :param longest_streak: The longest streak of a habit.
+        :type longest_streak: int
+        :param break_count: The count of breaks of a habit.
+        :type break_count: int
+        :param last_break: The date of last break of a habit.
+        :type last_break: str
+        :param name: The name of a habit passed to the listeners, if not passed, it's read only if there are listeners
+        (default None).
+        :type name: str
+        :return: None
+        """
         cur = db.cursor()
-        if not last_break:
-            last_break = "Not broken"
         try:
+            # The habit, which isn't broken, has no last break date.
             cur.execute("""
             INSERT INTO
-            streak(habit_id)
-            SELECT habit_id FROM habit
-            WHERE name = ?
-            """, (name,))
-            cur.execute("""
-            UPDATE streak
-            SET current_streak = ?, longest_streak = ?, break_count = ?, last_break = ?
-            WHERE habit_id IN (
-                SELECT habit_id FROM habit
-                WHERE name = ?
-            );
-            """, (current_streak, longest_streak, break_count, last_break, name))
+            streak(habit_id, current_streak, longest_streak, break_count, last_break, user_id)
+            VALUES (?1, ?2, ?3, ?4, ?5, (SELECT user_id FROM habit WHERE habit_id = ?1))
+            """, (habit_id, current_streak, longest_streak, break_count, cls.ordinal(last_break)))
         except sqlite3.IntegrityError:
             print("\n You are trying to interact with habit, that doesn't exist!\n")
-        db.commit()
+        cls._notify_id(db, habit_id, name)
+        cls._commit(db)
+
+    @classmethod
+    def add_rollup(cls, db, name, rollup):
+        """
+        Adds the completed and missed check-offs of the periods to the Rollup table, the counts of the periods, which
+        are already in the table, are increased.
+
+        :param db: The database, to which you are connected.
+        :type db: class
+        :param name: The name of a habit.
+        :type name: str
+        :param rollup: The (first day of the period, completed count, missed count) rows.
+        :type rollup: list
+        :return: None
+        """
+        habit_id = cls.id_of(db, name)
+        if habit_id is not None:
+            cls.add_rollup_by_id(db, habit_id, rollup)
+
+    @classmethod
+    def add_rollup_by_id(cls, db, habit_id, rollup):
+        """
+        Adds the completed and missed check-offs of the periods to the Rollup table, the counts of the periods, which
+        are already in the table, are increased.
+
+        :param db: The database, to which you are connected.
+        :type db: class
+        :param habit_id: The id of a habit.
+        :type habit_id: int
+        :param rollup: The (first day of the period, completed count, missed count) rows.
+        :type rollup: list
+        :return: None
+        """
+        cur = db.cursor()
+        cur.executemany("""
+        INSERT INTO
+        rollup(habit_id, period_start, completed, missed)
+        VALUES (?, ?, ?, ?)
+        ON CONFLICT(habit_id, period_start) DO UPDATE
+        SET completed = completed + excluded.completed, missed = missed + excluded.missed
+        """, ((habit_id, cls.ordinal(period_start), completed, missed) for period_start, completed, missed in rollup))
+        cls._commit(db)
+
+    @classmethod
+    def add_snapshots_by_id(cls, db, habit_id, snapshots):
+        """
+        Inserts the snapshots of a habit's state into the StreakSnapshot table, a snapshot of the same day is replaced.
+
+        :param db: The database, to which you are connected.
+        :type db: class
+        :param habit_id: The id of a habit.
+        :type habit_id: int
+        :param snapshots: The (check-off date, index of the last checked period, current streak, longest streak, break
+        count, last break date, status) rows, see Rebuild.states().
+        :type snapshots: list
+        :return: None
+        """
+        cur = db.cursor()
+        cur.executemany("""
+        INSERT OR REPLACE INTO
+        streak_snapshot(habit_id, day, last_index, current_streak, longest_streak, break_count, last_break, status)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, ((habit_id, cls.ordinal(day), last_index, current_streak, longest_streak, break_count,
+               cls.ordinal(last_break) or None, status)
+              for day, last_index, current_streak, longest_streak, break_count, last_break, status in snapshots))
+        cls._commit(db)
 
     @classmethod
     def update_habit(cls, db, name, streak, last_check, status, end_date, last_check_week, last_check_day):
@@ -210,25 +1122,57 @@ class DB:
         :type status: str
         :param end_date: The date when the habit's status has become "Completed" or "Broken".
         :type end_date: str
-        :param last_check_week: The last checked-off week.
+        :param last_check_week: The last checked-off week, which isn't stored, since it's derived from the last_check.
         :type last_check_week: str
         :param last_check_day: The last checked-off day's date.
         :type last_check_day: str
         :return: None
         """
+        habit_id = cls.id_of(db, name)
+        if habit_id is not None:
+            cls.update_habit_by_id(db, habit_id, streak, last_check, status, end_date, last_check_day, name)
+
+    @classmethod
+    def update_habit_by_id(cls, db, habit_id, streak, last_check, status, end_date, last_check_day, name=None):
+        """
+        Updates the habit's data in the Habit table.
+
+        :param db: The database, to which you are connected.
+        :type db: class
+        :param habit_id: The id of a habit.
+        :type habit_id: int
+        :param streak: The boolean value.
+        :type streak: bool
+        :param last_check: The date of last check of a habit.
+        :type last_check: str
+        :param status: The status of the habit.
+        :type status: str
+        :param end_date: The date when the habit's status has become "Completed" or "Broken".
+        :type end_date: str
+        :param last_check_day: The last checked-off day's date.
+        :type last_check_day: str
+        :param name: The name of a habit passed to the listeners, if not passed, it's read only if there are listeners
+        (default None).
+        :type name: str
+        :return: None
+        """
         cur = db.cursor()
-        try:
+        cur.execute("""
+            UPDATE habit
+            SET streak = ?, last_check = ?, status = ?, end_date = ?, last_check_day = ?
+            WHERE habit_id = ?
+            """, (streak, cls.ordinal(last_check), status, cls.ordinal(end_date), cls.ordinal(last_check_day),
+                  habit_id))
+        if status in cls.ENDED_EVENTS:
+            # The break or the completion is logged once, though the ended habit's data can be updated again.
             cur.execute("""
-                UPDATE habit
-                SET streak = ?, last_check = ?, status = ?, end_date = ?, last_check_week = ?, last_check_day = ?
-                WHERE habit_id IN (
-                    SELECT habit_id FROM habit
-                    WHERE name = ?
-                );
-                """, (streak, last_check, status, end_date, last_check_week, last_check_day, name))
-        except sqlite3.IntegrityError:
-            print("\n You are trying to interact with habit, that doesn't exist!\n")
-        db.commit()
+            INSERT INTO
+            habit_event(habit_id, kind, day)
+            SELECT ?, ?, ?
+            WHERE NOT EXISTS (SELECT 1 FROM habit_event WHERE habit_id = ? AND kind IN ('break', 'complete'))
+            """, (habit_id, cls.ENDED_EVENTS[status], cls.ordinal(end_date), habit_id))
+        cls._notify_id(db, habit_id, name)
+        cls._commit(db)
 
     @classmethod
     def update_streak(cls, db, name, current_streak, longest_streak, break_count, last_break):
@@ -249,19 +1193,40 @@ class DB:
         :type last_break: str
         :return: None
         """
+        habit_id = cls.id_of(db, name)
+        if habit_id is not None:
+            cls.update_streak_by_id(db, habit_id, current_streak, longest_streak, break_count, last_break, name)
+
+    @classmethod
+    def update_streak_by_id(cls, db, habit_id, current_streak, longest_streak, break_count, last_break, name=None):
+        """
+        Updates the habit's data in the Streak table.
+
+        :param db: The database, to which you are connected.
+        :type db: class
+        :param habit_id: The id of a habit.
+        :type habit_id: int
+        :param current_streak: The current streak of a habit.
+        :type current_streak: int
+        :param longest_streak: The longest streak of a habit.
+        :type longest_streak: int
+        :param break_count: The count of breaks of a habit.
+        :type break_count: int
+        :param last_break: The date of last break of a habit.
+        :type last_break: str
+        :param name: The name of a habit passed to the listeners, if not passed, it's read only if there are listeners
+        (default None).
+        :type name: str
+        :return: None
+        """
         cur = db.cursor()
-        try:
-            cur.execute("""
-            UPDATE streak
-            SET current_streak = ?, longest_streak = ?, break_count = ?, last_break = ?
-            WHERE habit_id IN (
-                SELECT habit_id FROM habit
-                WHERE name = ?
-            );
-            """, (current_streak, longest_streak, break_count, last_break, name))
-        except sqlite3.IntegrityError:
-            print("\n You are trying to interact with habit, that doesn't exist!\n")
-        db.commit()
+        cur.execute("""
+        UPDATE streak
+        SET current_streak = ?, longest_streak = ?, break_count = ?, last_break = ?
+        WHERE habit_id = ?
+        """, (current_streak, longest_streak, break_count, cls.ordinal(last_break), habit_id))
+        cls._notify_id(db, habit_id, name)
+        cls._commit(db)
 
     @staticmethod
     def get_habit_data(db):
@@ -277,8 +1242,10 @@ class DB:
         cur.execute("""SELECT habit.name, habit.start_date, habit.valid_till, habit.periodicity, habit.status, 
         streak.current_streak, streak.longest_streak, streak.break_count, streak.last_break, habit.last_check_day,
         habit.last_check_week
-        FROM habit
-        LEFT JOIN streak on habit.habit_id = streak.habit_id""")
+        FROM habit_iso AS habit
+        LEFT JOIN streak_iso AS streak on habit.habit_id = streak.habit_id
+        WHERE habit.user_id = ?
+        ORDER BY habit.habit_id""", (DB.user_of(db),))
         return cur.fetchall()
 
     @classmethod
@@ -295,7 +1262,20 @@ class DB:
         :return: Returns the current streak of a habit.
         :rtype: int
         """
-        habit_id = cls.name_to_id(db, name, status)
+        return cls.get_cur_streak_by_id(db, cls.name_to_id(db, name, status))
+
+    @staticmethod
+    def get_cur_streak_by_id(db, habit_id):
+        """
+        Returns the current streak of a habit.
+
+        :param db: The database, to which you are connected.
+        :type db: class
+        :param habit_id: The id of a habit.
+        :type habit_id: int
+        :return: Returns the current streak of a habit.
+        :rtype: int
+        """
         cur = db.cursor()
         cur.execute("""SELECT current_streak FROM streak
         WHERE habit_id = ?""", (habit_id,))
@@ -313,20 +1293,21 @@ class DB:
         :type name: str
         :return: None
         """
-        cls.delete_tracker(db, name)
-        cls.delete_streak(db, name)
-        cur = db.cursor()
-        cur.execute("""
-        SELECT * FROM habit
-        WHERE name = ?
-        """, (name,))
-        if not cur.fetchall():
-            return print(f"\nThere is no such a habit called {name}\n")
-        cur.execute("""
-        DELETE FROM habit
-        WHERE name = ?
-        """, (name,))
-        db.commit()
+        with cls.transaction(db):
+            habit_id = cls.id_of(db, name)
+            if habit_id is None:
+                return print(f"\nThere is no such a habit called {name}\n")
+            cls.delete_rollup_by_id(db, habit_id)
+            cls.delete_snapshots_by_id(db, habit_id)
+            cls.delete_tracker_by_id(db, habit_id)
+            cls.delete_streak_by_id(db, habit_id)
+            cur = db.cursor()
+            cur.execute("""
+            DELETE FROM habit
+            WHERE habit_id = ?
+            """, (habit_id,))
+            cur.execute("INSERT INTO habit_event(habit_id, kind) VALUES (?, 'delete')", (habit_id,))
+            cls._notify(db, name)
         print(f"\nYou just deleted the {name} habit!\n")
 
     @classmethod
@@ -340,15 +1321,27 @@ class DB:
         :type name: str
         :return: None
         """
+        habit_id = cls.id_of(db, name)
+        if habit_id is not None:
+            cls.delete_streak_by_id(db, habit_id)
+
+    @classmethod
+    def delete_streak_by_id(cls, db, habit_id):
+        """
+        Deletes the certain habit data from the Streak table.
+
+        :param db: The database, to which you are connected.
+        :type db: class
+        :param habit_id: The id of a habit.
+        :type habit_id: int
+        :return: None
+        """
         cur = db.cursor()
         cur.execute("""
         DELETE FROM streak
-        WHERE habit_id IN (
-            SELECT habit_id FROM habit
-            WHERE name = ?
-        );
-        """, (name,))
-        db.commit()
+        WHERE habit_id = ?
+        """, (habit_id,))
+        cls._commit(db)
 
     @classmethod
     def delete_tracker(cls, db, name):
@@ -361,16 +1354,93 @@ class DB:
         :type name: str
         :return: None
         """
+        habit_id = cls.id_of(db, name)
+        if habit_id is not None:
+            cls.delete_tracker_by_id(db, habit_id)
+
+    @classmethod
+    def delete_tracker_by_id(cls, db, habit_id):
+        """
+        Deletes the certain habit data from the Tracker table.
+
+        :param db: The database, to which you are connected.
+        :type db: class
+        :param habit_id: The id of a habit.
+        :type habit_id: int
+        :return: None
+        """
         cur = db.cursor()
         cur.execute("""
         DELETE FROM tracker
-        WHERE habit_id IN (
-            SELECT habit_id FROM habit
-            WHERE name = ?
-        );
-        """, (name,))
-        db.commit()
-        cur.close()
+        WHERE habit_id = ?
+        """, (habit_id,))
+        cls._commit(db)
+
+    @classmethod
+    def delete_rollup(cls, db, name):
+        """
+        Deletes the certain habit data from the Rollup table.
+
+        :param db: The database, to which you are connected.
+        :type db: class
+        :param name: The name of a habit.
+        :type name: str
+        :return: None
+        """
+        habit_id = cls.id_of(db, name)
+        if habit_id is not None:
+            cls.delete_rollup_by_id(db, habit_id)
+
+    @classmethod
+    def delete_rollup_by_id(cls, db, habit_id):
+        """
+        Deletes the certain habit data from the Rollup table.
+
+        :param db: The database, to which you are connected.
+        :type db: class
+        :param habit_id: The id of a habit.
+        :type habit_id: int
+        :return: None
+        """
+        cur = db.cursor()
+        cur.execute("""
+        DELETE FROM rollup
+        WHERE habit_id = ?
+        """, (habit_id,))
+        cls._commit(db)
+
+    @classmethod
+    def delete_snapshots_by_id(cls, db, habit_id):
+        """
+        Deletes the certain habit data from the StreakSnapshot table.
+
+        :param db: The database, to which you are connected.
+        :type db: class
+        :param habit_id: The id of a habit.
+        :type habit_id: int
+        :return: None
+        """
+        cur = db.cursor()
+        cur.execute("""
+        DELETE FROM streak_snapshot
+        WHERE habit_id = ?
+        """, (habit_id,))
+        cls._commit(db)
+
+    @staticmethod
+    def id_of(db, name):
+        """
+        Returns the id of the connection's user's habit with the name, in spite of its status.
+
+        :param db: The database, to which you are connected.
+        :type db: class
+        :param name: The name of a habit.
+        :type name: str
+        :return: Returns the habit's id, or None if there is no such a habit.
+        :rtype: int
+        """
+        row = db.execute("SELECT habit_id FROM habit WHERE user_id = ? AND name = ?", (DB.user_of(db), name)).fetchone()
+        return row[0] if row else None
 
     @staticmethod
     def name_to_id(db, name, status="Still in progress"):
@@ -390,7 +1460,7 @@ class DB:
         cur.execute("""
         SELECT habit_id
         FROM habit 
-        WHERE name = ? AND status = ?""", (name, status))
+        WHERE name = ? AND status = ? AND user_id = ?""", (name, status, DB.user_of(db)))
         try:
             return cur.fetchone()[0]
         except TypeError:
@@ -0,0 +1,193 @@
+import argparse
+import datetime as date
+import random
+import sys
+import time
+
+from db import DB
+from period import Period
+from rebuild import Rebuild
+
+
+class Fixtures:
+    """The Fixtures class fills a database with synthetic habits and realistic check-offs, e.g. for the load tests.
+
+    The same seed always generates the same habits and check-offs. Every habit follows one of the PROFILES, which sets
+    how often a period is skipped and how often a check-off is unsuccessful, so some habits are completed, some are
+    broken and the others are still in progress, just like they would be after DbHabit.add_habit_checks().
+
+    Methods:
+        generate(db, habits, days, seed=0, prefix="fixture", start=START): Inserts the habits and their check-offs in
+        one transaction.
+        simulate(rng, habit_id, start, valid_till, periodicity, days, profile): Returns the check-offs of a habit and
+        its state after them.
+        build(name, habits, days, seed=0): Creates a new database file filled with the fixtures.
+    """
+    # The first possible start date of the generated habits.
+    START = date.date(2024, 1, 1)
+    # The (weight, chance to skip a period, chance of an unsuccessful check-off) of the habits' behaviours.
+    PROFILES = {
+        "steady": (6, 0.002, 0.003),
+        "shaky": (3, 0.02, 0.03),
+        "quitter": (1, 0.15, 0.1),
+    }
+    # The descriptions of the generated habits.
+    DESCRIPTIONS = ("Reading", "Running", "Meditation", "Language practice", "Cooking at home", "Journaling")
+
+    @classmethod
+    def generate(cls, db, habits, days, seed=0, prefix="fixture", start=START):
+        """
+        Inserts the habits "<prefix>_0" ... "<prefix>_<habits - 1>" and their check-offs for the days following their
+        start dates in one transaction, then computes the Streak, the Rollup and the StreakSnapshot tables from the
+        check-offs and logs the habits' events. The rows are written with executemany() from generators, so the memory
+        doesn't grow with the size of the database.
+        A database, which already has the habits with the prefix, is left as it is.
+
+        :param db: The database, to which you are connected.
+        :type db: class
+        :param habits: The count of habits.
+        :type habits: int
+        :param days: The count of days, during which the habits are checked-off.
+        :type days: int
+        :param seed: The seed of the random generator (default 0).
+        :type seed: int
+        :param prefix: The prefix of the habits' names (default "fixture").
+        :type prefix: str
+        :param start: The first possible start date of the habits (default START).
+        :type start: class
+        :return: Returns the count of inserted check-offs.
+        :rtype: int
+        """
+        cur = db.cursor()
+        cur.execute("SELECT 1 FROM habit WHERE user_id = ? AND name = ?", (DB.user_of(db), f"{prefix}_0"))
+        if cur.fetchone():
+            return 0
+        rng = random.Random(seed)
+        profiles = list(cls.PROFILES)
+        weights = [cls.PROFILES[profile][0] for profile in profiles]
+        # The ids of the deleted habits aren't given again, since their events are kept.
+        first_id = (cur.execute("SELECT seq FROM sqlite_sequence WHERE name = 'habit'").fetchone() or (0,))[0] + 1
+        # The habits' rows are collected while their check-offs are inserted, they are short compared to the Tracker.
+        states = []
+        count = 0
+
+        def tracker():
+            nonlocal count
+            for i in range(habits):
+                habit_id = first_id + i
+                periodicity = "Weekly" if rng.random() < 0.3 else "Daily"
+                habit_start = start.toordinal() + rng.randrange(30)
+                valid_till = habit_start + rng.randint(28, max(28, days + 60))
+                profile = rng.choices(profiles, weights)[0]
+                rows, state = cls.simulate(rng, habit_id, habit_start, valid_till, periodicity, days, profile)
+                count += len(rows)
+                states.append((habit_id, f"{prefix}_{i}", rng.choice(cls.DESCRIPTIONS), habit_start, valid_till,
+                               periodicity, *state, DB.user_of(db)))
+                yield from rows
+
+        with DB.transaction(db):
+            cur.executemany("INSERT INTO tracker(habit_id, checked_off, date) VALUES (?, ?, ?)", tracker())
+            cur.executemany("""
+            INSERT INTO
+            habit(habit_id, name, description, start_date, valid_till, periodicity, status, last_check, end_date,
+            last_check_day, user_id)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, states)
+            habit_ids = range(first_id, first_id + habits)
+            Rebuild.rebuild_streaks(db, habit_ids)
+            Rebuild.backfill_rollup(db, habit_ids)
+            Rebuild.backfill_snapshots(db, habit_ids)
+            DB.log_events(db, habit_ids)
+        return count
+
+    @classmethod
+    def simulate(cls, rng, habit_id, start, valid_till, periodicity, days, profile):
+        """
+        Returns the check-offs of a habit and its state after them, following the same rules as
+        DbHabit.add_habit_checks(): a check-off is stored even if it breaks the habit, but none is stored after the
+        habit is broken or completed.
+
+        :param rng: The random generator.
+        :type rng: class
+        :param habit_id: The id of the habit.
+        :type habit_id: int
+        :param start: The ordinal of the start date.
+        :type start: int
+        :param valid_till: The ordinal of the expiration date.
+        :type valid_till: int
+        :param periodicity: The periodicity (i.e. "Daily", "Weekly").
+        :type periodicity: str
+        :param days: The count of days, during which the habit is checked-off.
+        :type days: int
+        :param profile: The name of the habit's behaviour, see PROFILES.
+        :type profile: str
+        :return: Returns the (habit id, check-off, ordinal of the date) rows, and the status, the ordinals of the last
+        check, of the end date and of the last checked-off day.
+        :rtype: tuple
+        """
+        _, skip, fail = cls.PROFILES[profile]
+        length = Period.LENGTHS[periodicity]
+        rows = []
+        status = "Still in progress"
+        last_index = -1
+        break_count = 0
+        last_check = day = None
+        for index in range(-(-days // length)):
+            if rng.random() < skip:
+                continue
+            day = start + index * length + rng.randrange(length)
+            check = int(rng.random() >= fail)
+            rows.append((habit_id, check, day))
+            missed = index - last_index - 1
+            if missed >= Period.MAX_MISSED:
+                # The habit is broken at the start of the period following the third missed one.
+                last_check = start + (last_index + Period.MAX_MISSED + 1) * length
+                status = "Broken"
+                break
+            last_index = index
+            last_check = start + index * length
+            break_count += missed + (not check)
+            if break_count >= 3:
+                status = "Broken"
+                break
+            if day >= valid_till:
+                status = "Completed"
+                break
+        # The end date is the date of the last stored check-off, just like DbHabit.store_progress() stores it.
+        return rows, (status, last_check, day, day)
+
+    @classmethod
+    def build(cls, name, habits, days, seed=0):
+        """
+        Creates a new database file filled with the fixtures, the file isn't synced until the end, since it can be
+        generated again if the machine crashes.
+
+        :param name: Name of the database, which mustn't exist.
+        :type name: str
+        :param habits: The count of habits.
+        :type habits: int
+        :param days: The count of days, during which the habits are checked-off.
+        :type days: int
+        :param seed: The seed of the random generator (default 0).
+        :type seed: int
+        :return: Returns the count of inserted check-offs.
+        :rtype: int
+        """
+        db = DB.get_db(name, journal_mode="MEMORY", synchronous="OFF", cache_size=-262144)
+        try:
+            return cls.generate(db, habits, days, seed)
+        finally:
+            DB.db_close(db)
+
+
+# Executed when invoked directly, e.g. "python fixtures.py load.db --habits 100000 --days 365".
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fills a database with synthetic habits and check-offs.")
+    parser.add_argument("db", help="the database")
+    parser.add_argument("--habits", type=int, default=1000, help="the count of habits")
+    parser.add_argument("--days", type=int, default=365, help="the count of days of check-offs")
+    parser.add_argument("--seed", type=int, default=0, help="the seed of the random generator")
+    arguments = parser.parse_args()
+    started = time.perf_counter()
+    inserted = Fixtures.build(arguments.db, arguments.habits, arguments.days, arguments.seed)
+    print(f"Inserted {inserted} check-offs in {time.perf_counter() - started:.2f} seconds.", file=sys.stderr)
@@ -0,0 +1,259 @@
+import argparse
+import heapq
+import json
+import os
+import sqlite3
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from analyse import Analysis
+from db import DB
+
+
+class FleetReport:
+    """The FleetReport class analyses many database files at once, e.g. one file per user, using every core.
+
+    The files are split into batches, which are analysed by a pool of processes. Every process opens the files of its
+    batch read-only, runs the Analysis queries for every user of a file, and sends back only the partial aggregates of
+    the batch, which are merged as soon as they arrive. The files are never written, so a file, whose schema is older
+    than the views of the Analysis class, is reported as an error instead of being upgraded.
+
+    Attributes:
+        paths (list): The database files.
+        workers (int): The count of processes, the count of cores by default.
+        top (int): The count of the longest streaks in the report.
+        batch (int): The count of files analysed by a process at once.
+        memory_limit (int): The most bytes of address space a process may take, if None, the processes aren't limited.
+        max_tasks_per_child (int): The count of batches, after which a process is replaced by a new one, if None, the
+        processes live until the end.
+
+    Methods:
+        run(): Analyses the files and returns the merged report.
+        analyse_files(paths, top): Returns the partial aggregates of the files.
+        analyse_file(path, top): Returns the partial aggregates of a file.
+        merge(total, partial, top): Adds the partial aggregates to the total.
+        summary(total): Returns the report of the merged aggregates.
+    """
+    # The upper bounds of the buckets of the longest streaks' histogram, the last bucket has no bound.
+    BUCKETS = (0, 1, 3, 7, 14, 30, 60, 90, 180, 365)
+
+    def __init__(self, paths, workers=None, top=10, batch=16, memory_limit=None, max_tasks_per_child=None):
+        """
+        Initializes a FleetReport instance.
+
+        :param paths: The database files.
+        :type paths: list
+        :param workers: The count of processes, if not passed, the count of cores (default None).
+        :type workers: int
+        :param top: The count of the longest streaks in the report (default 10).
+        :type top: int
+        :param batch: The count of files analysed by a process at once (default 16).
+        :type batch: int
+        :param memory_limit: The most bytes of address space a process may take, only on the systems with the resource
+        module, if not passed, the processes aren't limited (default None).
+        :type memory_limit: int
+        :param max_tasks_per_child: The count of batches, after which a process is replaced by a new one, which gives
+        its memory back, if not passed, the processes live until the end (default None).
+        :type max_tasks_per_child: int
+        """
+        self.paths = list(paths)
+        self.workers = workers or os.cpu_count() or 1
+        self.top = top
+        self.batch = batch
+        self.memory_limit = memory_limit
+        self.max_tasks_per_child = max_tasks_per_child
+
+    def run(self):
+        """
+        Analyses the files in the pool of processes and returns the merged report.
+
+        :return: Returns the report, see summary().
+        :rtype: dict
+        """
+        total = self.merge(None, None, self.top)
+        batches = [self.paths[i:i + self.batch] for i in range(0, len(self.paths), self.batch)]
+        with ProcessPoolExecutor(self.workers, initializer=self._limit_memory, initargs=(self.memory_limit,),
+                                 max_tasks_per_child=self.max_tasks_per_child) as executor:
+            futures = [executor.submit(self.analyse_files, batch, self.top) for batch in batches]
+            for future in as_completed(futures):
+                self.merge(total, future.result(), self.top)
+        return self.summary(total)
+
+    @classmethod
+    def analyse_files(cls, paths, top):
+        """
+        Returns the partial aggregates of the files, the function run by the processes of the pool.
+
+        :param paths: The database files.
+        :type paths: list
+        :param top: The count of the longest streaks kept.
+        :type top: int
+        :return: Returns the merged aggregates of the files.
+        :rtype: dict
+        """
+        total = cls.merge(None, None, top)
+        for path in paths:
+            cls.merge(total, cls.analyse_file(path, top), top)
+        return total
+
+    @classmethod
+    def analyse_file(cls, path, top):
+        """
+        Returns the partial aggregates of a file, which is opened read-only. Every user of the file is analysed by
+        the Analysis class, as if the connection was bound to the user.
+
+        :param path: The database file.
+        :type path: str
+        :param top: The count of the longest streaks kept.
+        :type top: int
+        :return: Returns the aggregates, or the error if the file can't be analysed.
+        :rtype: dict
+        """
+        partial = cls.merge(None, None, top)
+        partial["files"] = 1
+        try:
+            db = DB.connect(path, read_only=True)
+        except sqlite3.Error as error:
+            partial["errors"].append((path, str(error)))
+            return partial
+        streaks = []
+        try:
+            if not db.execute("SELECT 1 FROM sqlite_master WHERE type = 'view' AND name = 'habit_iso'").fetchone():
+                partial["errors"].append((path, "The schema is too old, the file should be upgraded by DB.migrate()"))
+                return partial
+            for (user,) in db.execute("SELECT DISTINCT user_id FROM habit").fetchall():
+                DB.set_user(db, user)
+                partial["users"] += 1
+                for habit in Analysis.iter_all_habits(db):
+                    longest_streak = habit.longest_streak or 0
+                    partial["habits"] += 1
+                    partial["statuses"][habit.status] += 1
+                    partial["periodicities"][habit.periodicity] += 1
+                    partial["histogram"][cls._bucket(longest_streak)] += 1
+                    streaks.append((longest_streak, habit.name, user, path))
+                streaks = heapq.nlargest(top, streaks)
+            partial["completed"], partial["missed"] = db.execute(
+                "SELECT TOTAL(completed), TOTAL(missed) FROM rollup").fetchone()
+        except sqlite3.Error as error:
+            partial["errors"].append((path, str(error)))
+        finally:
+            DB.db_close(db)
+        partial["top"] = heapq.nlargest(top, streaks)
+        return partial
+
+    @staticmethod
+    def merge(total, partial, top):
+        """
+        Adds the partial aggregates to the total.
+
+        :param total: The total aggregates, if None, new empty aggregates are returned.
+        :type total: dict
+        :param partial: The partial aggregates, if None, nothing is added.
+        :type partial: dict
+        :param top: The count of the longest streaks kept.
+        :type top: int
+        :return: Returns the total.
+        :rtype: dict
+        """
+        if total is None:
+            total = {"files": 0, "users": 0, "habits": 0, "completed": 0, "missed": 0, "statuses": Counter(),
+                     "periodicities": Counter(), "histogram": Counter(), "top": [], "errors": []}
+        if partial is None:
+            return total
+        for key in ("files", "users", "habits", "completed", "missed"):
+            total[key] += partial[key]
+        for key in ("statuses", "periodicities", "histogram"):
+            total[key].update(partial[key])
+        total["top"] = heapq.nlargest(top, total["top"] + partial["top"])
+        total["errors"] += partial["errors"]
+        return total
+
+    @classmethod
+    def summary(cls, total):
+        """
+        Returns the report of the merged aggregates: the counts of files, users and habits, the currently tracked
+        habits, the habits by their status and periodicity, the rate of the completed periods and of the completed
+        habits, the histogram of the longest streaks and the top longest streaks.
+
+        :param total: The merged aggregates.
+        :type total: dict
+        :return: Returns the report.
+        :rtype: dict
+        """
+        statuses = total["statuses"]
+        periods = total["completed"] + total["missed"]
+        ended = statuses["Completed"] + statuses["Broken"]
+        labels = [f"{low + 1}-{high}" if high > low + 1 else str(high) for low, high in zip((-1,) + cls.BUCKETS,
+                                                                                            cls.BUCKETS)]
+        labels.append(f"{cls.BUCKETS[-1] + 1}+")
+        return {
+            "files": total["files"],
+            "users": total["users"],
+            "habits": total["habits"],
+            "tracked": statuses["Still in progress"],
+            "statuses": dict(statuses),
+            "periodicities": dict(total["periodicities"]),
+            "period_completion_rate": round(total["completed"] / periods, 4) if periods else None,
+            "habit_completion_rate": round(statuses["Completed"] / ended, 4) if ended else None,
+            "longest_streaks": {labels[bucket]: total["histogram"][bucket] for bucket in range(len(labels))},
+            "top": [{"longest_streak": streak, "name": name, "user": user, "path": path}
+                    for streak, name, user, path in total["top"]],
+            "errors": [{"path": path, "error": error} for path, error in total["errors"]],
+        }
+
+    @classmethod
+    def _bucket(cls, streak):
+        """
+        Returns the index of the histogram's bucket of the streak.
+
+        :param streak: The longest streak.
+        :type streak: int
+        :return: Returns the index.
+        :rtype: int
+        """
+        for index, bound in enumerate(cls.BUCKETS):
+            if streak <= bound:
+                return index
+        return len(cls.BUCKETS)
+
+    @staticmethod
+    def _limit_memory(memory_limit):
+        """
+        Limits the address space of the process, the initializer of the pool's processes. A process, which exceeds
+        the limit, gets a MemoryError instead of pushing the machine into swap.
+
+        :param memory_limit: The most bytes of address space, if None, the process isn't limited.
+        :type memory_limit: int
+        :return: None
+        """
+        if memory_limit is None:
+            return
+        try:
+            import resource
+        except ImportError:
+            # The resource module exists only on Unix.
+            return
+        _, hard = resource.getrlimit(resource.RLIMIT_AS)
+        if hard != resource.RLIM_INFINITY:
+            memory_limit = min(memory_limit, hard)
+        resource.setrlimit(resource.RLIMIT_AS, (memory_limit, hard))
+
+
+# Executed when invoked directly, e.g. "python fleet.py users/*.db --workers 8 --memory 512".
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Analyses many habit databases at once.")
+    parser.add_argument("paths", nargs="+", help="the database files")
+    parser.add_argument("--workers", type=int, help="the count of processes (default the count of cores)")
+    parser.add_argument("--top", type=int, default=10, help="the count of the longest streaks")
+    parser.add_argument("--batch", type=int, default=16, help="the count of files analysed by a process at once")
+    parser.add_argument("--memory", type=int, help="the most MiB of address space a process may take")
+    parser.add_argument("--max-tasks-per-child", type=int, help="the count of batches, after which a process is "
+                                                                "replaced")
+    arguments = parser.parse_args()
+    started = time.perf_counter()
+    report = FleetReport(arguments.paths, arguments.workers, arguments.top, arguments.batch,
+                         arguments.memory and arguments.memory * 1024 * 1024, arguments.max_tasks_per_child).run()
+    json.dump(report, sys.stdout, indent=2)
+    print(f"\nAnalysed {report['files']} files in {time.perf_counter() - started:.2f} seconds.", file=sys.stderr)
@@ -0,0 +1,416 @@
+import argparse
+import sys
+
+# Only argparse and sys are imported at the start, every command imports the modules it needs, so a scripted call
+# doesn't pay for the interactive interface of main.py.
+
+
+def iso_date(value):
+    """
+    Checks that the argument is a date, so a wrong date is reported by argparse instead of failing the command.
+
+    :param value: The date as YYYY-MM-DD, or an empty string.
+    :type value: str
+    :return: Returns the date as YYYY-MM-DD, or the empty string.
+    :rtype: str
+    """
+    import datetime as date
+
+    return str(date.date.fromisoformat(value)) if value else value
+
+
+def cursor(value):
+    """
+    Parses the key of the last habit of the previous leaderboard page, so a wrong key is reported by argparse.
+
+    :param value: The key as STREAK,ID.
+    :type value: str
+    :return: Returns the (streak, habit id) pair.
+    :rtype: tuple
+    """
+    try:
+        streak, habit_id = (int(part) for part in value.split(","))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected STREAK,ID, e.g. 42,1337, got {value!r}")
+    return streak, habit_id
+
+
+def parse_args(argv=None):
+    """
+    Parses the command line of the headless interface.
+
+    :param argv: The arguments, if not passed, the arguments of the process are parsed (default None).
+    :type argv: list
+    :return: Returns the parsed arguments.
+    :rtype: class
+    """
+    parser = argparse.ArgumentParser(prog="habit", description="The headless interface of the habit tracker.")
+    parser.add_argument("--db", default="main.db", help="the database (default main.db)")
+    parser.add_argument("--user", default="default", help="the user, whose habits are used (default default)")
+    parser.add_argument("--quiet", action="store_true", help="don't print the messages of the habit tracker")
+    parser.add_argument("--metrics", choices=["json", "prometheus"],
+                        help="print the statements' and the operations' metrics to the standard error at the end")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    create = commands.add_parser("create", help="create a habit")
+    create.add_argument("name")
+    create.add_argument("--till", required=True, type=iso_date, help="the expiration date as YYYY-MM-DD")
+    create.add_argument("--start", default="", type=iso_date,
+                        help="the start date as YYYY-MM-DD (default the present day)")
+    create.add_argument("--periodicity", default="Daily", choices=["Daily", "Weekly"])
+    create.add_argument("--description", default="")
+
+    checkoff = commands.add_parser("checkoff", help="check-off a habit, or many habits from the standard input",
+                                   description="Checks-off a habit. If the name is \"-\", the check-offs are read "
+                                               "from the standard input as \"name,YYYY-MM-DD[,0 or 1]\" lines and "
+                                               "stored in one transaction.")
+    checkoff.add_argument("name")
+    checkoff.add_argument("--date", default="", type=iso_date,
+                          help="the check-off date as YYYY-MM-DD (default the present day)")
+    checkoff.add_argument("--missed", action="store_true", help="the habit wasn't completed in the period")
+
+    delete = commands.add_parser("delete", help="delete a habit")
+    delete.add_argument("name")
+
+    report = commands.add_parser("report", help="print an analysis of the habits")
+    report.add_argument("report", choices=["all", "tracked", "periodicity", "longest-streak", "actions",
+                                           "struggled-most", "struggle-ranking", "streak-as-of", "events",
+                                           "leaderboard"])
+    report.add_argument("--json", action="store_true", help="print the rows as JSON")
+    report.add_argument("--name", help="the habit of the \"actions\", the \"longest-streak\", the \"streak-as-of\" "
+                                       "and the \"events\" reports")
+    report.add_argument("--date", action="append", type=iso_date,
+                        help="the day of the \"streak-as-of\" report, can be repeated (default the present day)")
+    report.add_argument("--periodicity", choices=["Daily", "Weekly"],
+                        help="the periodicity of the \"periodicity\" report (default Daily) and of the \"leaderboard\" "
+                             "report (default both)")
+    report.add_argument("--start", type=iso_date,
+                        help="the first day of the \"struggled-most\" and the \"struggle-ranking\" reports "
+                             "(default last month)")
+    report.add_argument("--end", type=iso_date,
+                        help="the last day of the \"struggled-most\" and the \"struggle-ranking\" reports "
+                             "(default last month)")
+    report.add_argument("--limit", type=int, help="the count of the habits of the \"struggled-most\", the "
+                                                  "\"struggle-ranking\" and the \"leaderboard\" (default 20) reports")
+    report.add_argument("--by", default="longest_streak", choices=["longest_streak", "current_streak"],
+                        help="the streak, by which the \"leaderboard\" is ordered (default longest_streak)")
+    report.add_argument("--status", choices=["Still in progress", "Completed", "Broken"],
+                        help="the status of the habits of the \"leaderboard\" (default all)")
+    report.add_argument("--after", type=cursor,
+                        help="the \"STREAK,ID\" of the last habit of the previous \"leaderboard\" page")
+
+    export = commands.add_parser("export", help="write the habits, the streaks and the check-offs into a file")
+    export.add_argument("file", nargs="?", default="-", help="the file, \"-\" is the standard output (default -)")
+    export.add_argument("--format", choices=["jsonl", "csv"], help="the format (default by the file's extension)")
+
+    load = commands.add_parser("import", help="import the habits, the streaks and the check-offs from a file",
+                               description="Imports the habits, the streaks and the check-offs written by \"export\". "
+                                           "With --checkpoint, an interrupted import of the same file continues "
+                                           "after the last committed line.")
+    load.add_argument("file", help="the file, \"-\" is the standard input")
+    load.add_argument("--format", choices=["jsonl", "csv"], help="the format (default by the file's extension)")
+    load.add_argument("--checkpoint", type=int, help="commit every CHECKPOINT lines (default all lines at once)")
+
+    recover = commands.add_parser("recover", help="rebuild the habits and the streaks from the event log")
+    recover.add_argument("--check", action="store_true", help="only print the habits, which differ from the event log")
+    return parser.parse_args(argv)
+
+
+def create(db, args):
+    """
+    Creates a habit.
+
+    :param db: The database, to which you are connected.
+    :type db: class
+    :param args: The parsed arguments.
+    :type args: class
+    :return: Returns the exit code.
+    :rtype: int
+    """
+    import datetime as date
+    from habit_track import DbHabit
+
+    start = date.date.fromisoformat(args.start) if args.start else date.date.today()
+    if date.date.fromisoformat(args.till) < start:
+        print("The expiration date can't be before the start date!", file=sys.stderr)
+        return 2
+    habit = DbHabit(args.name, args.description, args.start, args.till, args.periodicity)
+    return 1 if habit.store(db) else 0
+
+
+def checkoff(db, args):
+    """
+    Checks-off a habit, or the habits read from the standard input if the name is "-".
+
+    :param db: The database, to which you are connected.
+    :type db: class
+    :param args: The parsed arguments.
+    :type args: class
+    :return: Returns the exit code.
+    :rtype: int
+    """
+    from db import DB
+    from habit_track import DbHabit
+
+    if args.name == "-":
+        return checkoff_many(db, sys.stdin)
+    habit_id = DB.name_to_id(db, args.name)
+    if habit_id == "Error":
+        return 1
+    habit = DbHabit.load(db, habit_id)
+    return 1 if habit.add_habit_check(db, not args.missed, args.date) == ConnectionError else 0
+
+
+def checkoff_many(db, lines):
+    """
+    Checks-off the habits from the "name,YYYY-MM-DD[,0 or 1]" lines in one transaction, the check-offs of every habit
+    are stored at once. If some lines are wrong, they are reported with their numbers and nothing is stored.
+
+    :param db: The database, to which you are connected.
+    :type db: class
+    :param lines: The lines.
+    :type lines: iterable
+    :return: Returns the exit code, 1 if some habits aren't in progress or some check-offs were rejected (e.g. a period
+    checked-off twice, or a date earlier than the last check-off), 2 if some lines are wrong.
+    :rtype: int
+    """
+    import csv
+    import datetime as date
+    from db import DB
+    from habit_track import DbHabit
+
+    checks = {}
+    wrong = False
+    reader = csv.reader(lines)
+    for row in reader:
+        if not row or not row[0].strip():
+            continue
+        if len(row) < 2:
+            print(f"line {reader.line_num}: expected \"name,YYYY-MM-DD[,0 or 1]\"", file=sys.stderr)
+            wrong = True
+            continue
+        name, check_date, *check = (value.strip() for value in row)
+        try:
+            check_date = str(date.date.fromisoformat(check_date))
+        except ValueError as error:
+            print(f"line {reader.line_num}: {error}", file=sys.stderr)
+            wrong = True
+            continue
+        checks.setdefault(name, []).append((not check or check[0].lower() not in ("0", "false", "no"), check_date))
+    if wrong:
+        print("No check-offs were stored.", file=sys.stderr)
+        return 2
+    code = 0
+    with DB.transaction(db):
+        for name, habit_checks in checks.items():
+            habit_id = DB.name_to_id(db, name)
+            if habit_id == "Error":
+                code = 1
+                continue
+            if DbHabit.load(db, habit_id).add_habit_checks(db, habit_checks) < len(habit_checks):
+                code = 1
+    return code
+
+
+def delete(db, args):
+    """
+    Deletes a habit.
+
+    :param db: The database, to which you are connected.
+    :type db: class
+    :param args: The parsed arguments.
+    :type args: class
+    :return: Returns the exit code.
+    :rtype: int
+    """
+    from db import DB
+
+    changes = db.total_changes
+    DB.delete_habit(db, args.name)
+    return 0 if db.total_changes > changes else 1
+
+
+def report(db, args, file=None):
+    """
+    Prints an analysis of the habits as a table, or as JSON.
+
+    :param db: The database, to which you are connected.
+    :type db: class
+    :param args: The parsed arguments.
+    :type args: class
+    :param file: The file, to which the report is written, if not passed, it's printed (default None).
+    :type file: class
+    :return: Returns the exit code.
+    :rtype: int
+    """
+    import datetime as date
+    from analyse import Analysis
+
+    file = file or sys.stdout
+    if args.report == "all":
+        rows, header = Analysis.iter_all_habits(db), Analysis.HABIT_HEADER
+    elif args.report == "tracked":
+        rows, header = Analysis.iter_currently_tracked_habits(db), Analysis.HABIT_HEADER
+    elif args.report == "periodicity":
+        rows = Analysis.iter_same_periodicity_habits(db, args.periodicity or "Daily")
+        header = Analysis.PERIODICITY_HEADER
+    elif args.report == "longest-streak":
+        rows, header = Analysis.iter_habits_longest_streak(db), Analysis.STREAK_HEADER
+        if args.name:
+            rows = (row for row in rows if row.name == args.name)
+    elif args.report == "actions":
+        if not args.name:
+            print("The \"actions\" report needs the --name of a habit!", file=sys.stderr)
+            return 2
+        rows, header = Analysis.iter_all_actions(db, args.name), Analysis.ACTION_HEADER
+    elif args.report == "leaderboard":
+        rows = Analysis.iter_leaderboard(db, args.by, args.status, args.periodicity, args.after,
+                                         20 if args.limit is None else args.limit)
+        header = Analysis.LEADERBOARD_HEADER
+    elif args.report == "events":
+        if not args.name:
+            print("The \"events\" report needs the --name of a habit!", file=sys.stderr)
+            return 2
+        rows, header = Analysis.iter_events(db, args.name), Analysis.EVENT_HEADER
+    elif args.report == "streak-as-of":
+        if not args.name:
+            print("The \"streak-as-of\" report needs the --name of a habit!", file=sys.stderr)
+            return 2
+        days = args.date or [str(date.date.today())]
+        rows, header = Analysis.iter_streak_as_of(db, args.name, days), Analysis.AS_OF_HEADER
+    else:
+        last_day = date.date.today().replace(day=1) - date.timedelta(days=1)
+        start, end = args.start or str(last_day.replace(day=1)), args.end or str(last_day)
+        if args.report == "struggled-most":
+            rows, header = Analysis.iter_struggled_most(db, start, end, args.limit), Analysis.STRUGGLE_HEADER
+        else:
+            rows, header = Analysis.iter_struggle_ranking(db, start, end, args.limit), Analysis.RANKING_HEADER
+    if args.json:
+        import json
+        json.dump([row._asdict() for row in rows], file)
+        file.write("\n")
+    else:
+        Analysis.render(rows, header, file)
+    return 0
+
+
+def export(db, args):
+    """
+    Writes the habits, the streaks and the check-offs into a file.
+
+    :param db: The database, to which you are connected.
+    :type db: class
+    :param args: The parsed arguments.
+    :type args: class
+    :return: Returns the exit code.
+    :rtype: int
+    """
+    import contextlib
+    from transfer import Transfer
+
+    format = args.format or ("csv" if args.file.endswith(".csv") else "jsonl")
+    with contextlib.nullcontext(sys.stdout) if args.file == "-" else open(args.file, "w", newline="") as file:
+        count = Transfer.dump(db, file, format)
+    print(f"Exported {count} rows.", file=sys.stderr)
+    return 0
+
+
+def load(db, args):
+    """
+    Imports the habits, the streaks and the check-offs from a file.
+
+    :param db: The database, to which you are connected.
+    :type db: class
+    :param args: The parsed arguments.
+    :type args: class
+    :return: Returns the exit code.
+    :rtype: int
+    """
+    import contextlib
+    import os
+    from transfer import Transfer
+
+    if args.checkpoint and args.file == "-":
+        print("The standard input can't be continued from a checkpoint!", file=sys.stderr)
+        return 2
+    format = args.format or ("csv" if args.file.endswith(".csv") else "jsonl")
+    try:
+        with contextlib.nullcontext(sys.stdin) if args.file == "-" else open(args.file, newline="") as file:
+            count = Transfer.load(db, file, format, os.path.abspath(args.file), args.checkpoint)
+    except ValueError as error:
+        print(error, file=sys.stderr)
+        return 1
+    print(f"Imported {count} rows.", file=sys.stderr)
+    return 0
+
+
+def recover(db, args, file=None):
+    """
+    Rebuilds the habits and the streaks from the event log, or only prints the ids of the habits, which differ from it.
+
+    :param db: The database, to which you are connected.
+    :type db: class
+    :param args: The parsed arguments.
+    :type args: class
+    :param file: The file, to which the ids are written, if not passed, they are printed (default None).
+    :type file: class
+    :return: Returns the exit code, 1 if some habits differ from the event log.
+    :rtype: int
+    """
+    from rebuild import Rebuild
+
+    file = file or sys.stdout
+    if args.check:
+        differing = Rebuild.verify(db)
+        for habit_id in differing:
+            print(habit_id, file=file)
+        return 1 if differing else 0
+    print(f"Recovered {Rebuild.recover(db)} habits.", file=sys.stderr)
+    return 0
+
+
+def main(argv=None):
+    """
+    Runs a command of the headless interface, e.g. "python habit.py checkoff Reading --date 2025-01-20".
+
+    :param argv: The arguments, if not passed, the arguments of the process are used (default None).
+    :type argv: list
+    :return: Returns the exit code.
+    :rtype: int
+    """
+    import contextlib
+    import os
+    from db import DB
+
+    args = parse_args(argv)
+    out = sys.stdout
+    if args.metrics:
+        from metrics import Metrics
+        Metrics.enable()
+    db = DB.get_db(args.db, user=args.user)
+    try:
+        # The messages of the habit tracker would break the JSON reports, while the commands' own results are always
+        # written to the real standard output.
+        quiet = args.quiet or getattr(args, "json", False)
+        with open(os.devnull, "w") if quiet else contextlib.nullcontext(sys.stdout) as messages, \
+                contextlib.redirect_stdout(messages):
+            if args.command == "report":
+                return report(db, args, out)
+            if args.command == "recover":
+                return recover(db, args, out)
+            if args.command == "export" and args.file == "-":
+                with contextlib.redirect_stdout(out):
+                    return export(db, args)
+            return {"create": create, "checkoff": checkoff, "delete": delete, "export": export,
+                    "import": load}[args.command](db, args)
+    finally:
+        DB.db_close(db)
+        if args.metrics:
+            Metrics.disable()
+            print(Metrics.to_json(indent=2) if args.metrics == "json" else Metrics.to_prometheus(), end="",
+                  file=sys.stderr)
+
+
+# Executed when invoked directly, e.g. "python habit.py report longest-streak --json".
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,178 @@
+import datetime as date
+from array import array
+
+from db import DB
+from habit_track import DbHabit
+
+
+class HabitTable:
+    """The HabitTable class keeps the data of many habits in columns, one typed array per attribute, so the bulk work
+    over all habits needs neither a DbHabit instance per habit nor the ISO date strings.
+
+    The dates are kept as ordinals (0 if the date is empty), the periodicities and the statuses as small codes, see
+    PERIODICITIES and STATUSES. The i-th item of every column belongs to the i-th habit.
+
+    Attributes:
+        habit_ids (array): The ids of the habits.
+        names (list): The names of the habits.
+        periodicity (array): The codes of the periodicities.
+        status (array): The codes of the statuses.
+        start (array): The ordinals of the start dates.
+        valid_till (array): The ordinals of the expiration dates.
+        last_check (array): The ordinals of the first days of the last checked-off periods.
+        last_check_day (array): The ordinals of the last checked-off days.
+        last_break (array): The ordinals of the last break dates.
+        streak (array): Whether the habit has the streak data.
+        current_streak (array): The current streaks.
+        longest_streak (array): The longest streaks.
+        break_count (array): The break counts.
+
+    Methods:
+        load(db, status=None, size=10000): Creates a HabitTable from the habits in the database.
+        select(status=None, periodicity=None): Returns the indexes of the habits with the status and the periodicity.
+        missed_periods(day): Returns the count of the missed periods of every habit on the day.
+        habit(index): Creates a DbHabit instance from the habit's data in the table.
+        nbytes(): Returns the count of bytes taken by the arrays.
+    """
+    # The codes of the periodicities, the i-th periodicity's code is i.
+    PERIODICITIES = ("Daily", "Weekly")
+    # The codes of the statuses, the i-th status' code is i.
+    STATUSES = ("Still in progress", "Completed", "Broken")
+    # The lengths of the periods in days by the codes of the periodicities.
+    LENGTHS = (1, 7)
+    # The typecodes of the arrays by the names of the columns.
+    COLUMNS = {"habit_ids": "q", "periodicity": "b", "status": "b", "start": "l", "valid_till": "l",
+               "last_check": "l", "last_check_day": "l", "last_break": "l", "streak": "b", "current_streak": "l",
+               "longest_streak": "l", "break_count": "l"}
+
+    def __init__(self):
+        """
+        Initializes an empty HabitTable instance.
+        """
+        self.names = []
+        for column, typecode in self.COLUMNS.items():
+            setattr(self, column, array(typecode))
+
+    def __len__(self):
+        return len(self.habit_ids)
+
+    @classmethod
+    def load(cls, db, status=None, size=10000):
+        """
+        Creates a HabitTable from the habits of the connection's user, the stored ordinals are taken as they are, so no
+        date objects are created.
+
+        :param db: The database, to which you are connected.
+        :type db: class
+        :param status: The status of the loaded habits, if not passed, all habits are loaded (default None).
+        :type status: str
+        :param size: The count of rows fetched at once (default 10000).
+        :type size: int
+        :return: Returns the table.
+        :rtype: HabitTable
+        """
+        table = cls()
+        query = """SELECT habit.habit_id, habit.name, habit.periodicity, habit.status, COALESCE(habit.start_date, 0),
+        COALESCE(habit.valid_till, 0), COALESCE(habit.last_check, 0), COALESCE(habit.last_check_day, 0),
+        COALESCE(streak.last_break, 0), COALESCE(habit.streak, 0), COALESCE(streak.current_streak, 0),
+        COALESCE(streak.longest_streak, 0), COALESCE(streak.break_count, 0)
+        FROM habit
+        LEFT JOIN streak on habit.habit_id = streak.habit_id
+        WHERE habit.user_id = ?"""
+        parameters = [DB.user_of(db)]
+        if status is not None:
+            query += " AND habit.status = ?"
+            parameters.append(status)
+        cur = db.cursor()
+        cur.execute(query + " ORDER BY habit.habit_id", parameters)
+        periodicities = {name: code for code, name in enumerate(cls.PERIODICITIES)}
+        statuses = {name: code for code, name in enumerate(cls.STATUSES)}
+        while True:
+            rows = cur.fetchmany(size)
+            if not rows:
+                break
+            for row in rows:
+                table.habit_ids.append(row[0])
+                table.names.append(row[1])
+                table.periodicity.append(periodicities[row[2]])
+                table.status.append(statuses[row[3]])
+                table.start.append(row[4])
+                table.valid_till.append(row[5])
+                table.last_check.append(row[6])
+                table.last_check_day.append(row[7])
+                table.last_break.append(row[8])
+                table.streak.append(row[9])
+                table.current_streak.append(row[10])
+                table.longest_streak.append(row[11])
+                table.break_count.append(row[12])
+        return table
+
+    def select(self, status=None, periodicity=None):
+        """
+        Returns the indexes of the habits with the status and the periodicity.
+
+        :param status: The status, if not passed, the habits of every status are returned (default None).
+        :type status: str
+        :param periodicity: The periodicity, if not passed, the habits of every periodicity are returned (default None).
+        :type periodicity: str
+        :return: Returns the indexes.
+        :rtype: list
+        """
+        status = -1 if status is None else self.STATUSES.index(status)
+        periodicity = -1 if periodicity is None else self.PERIODICITIES.index(periodicity)
+        return [i for i in range(len(self)) if (status < 0 or self.status[i] == status)
+                and (periodicity < 0 or self.periodicity[i] == periodicity)]
+
+    def missed_periods(self, day):
+        """
+        Returns the count of the periods of every habit, which have passed without a check-off before the day's
+        period, i.e. the count DbHabit.missed_dates() would find if the habit was checked-off on the day.
+
+        :param day: The date.
+        :type day: class
+        :return: Returns the counts, 0 for the habits, which aren't in progress.
+        :rtype: array
+        """
+        day = day.toordinal()
+        missed = array("l", bytes(len(self) * array("l").itemsize))
+        for i in range(len(self)):
+            if self.status[i]:
+                continue
+            length = self.LENGTHS[self.periodicity[i]]
+            start = self.start[i]
+            last_index = (self.last_check[i] - start) // length if self.last_check[i] else -1
+            missed[i] = max((day - start) // length - last_index - 1, 0)
+        return missed
+
+    def habit(self, index):
+        """
+        Creates a DbHabit instance from the habit's data in the table, e.g. to check it off, just like DbHabit.load()
+        does. The description and the end date aren't kept in the table, so they are empty.
+
+        :param index: The index of the habit in the table.
+        :type index: int
+        :return: Returns the habit.
+        :rtype: DbHabit
+        """
+        def iso(ordinal):
+            return str(date.date.fromordinal(ordinal)) if ordinal else ""
+
+        last_check = self.last_check[index]
+        # The last checked-off week of a "Weekly" habit is derived from the last check, as by the habit_iso view.
+        last_check_week = f"{iso(last_check)} : {iso(last_check + 6)}" if last_check and self.periodicity[index] else ""
+        habit = DbHabit(self.names[index], "", iso(self.start[index]), iso(self.valid_till[index]),
+                        self.PERIODICITIES[self.periodicity[index]], self.current_streak[index],
+                        self.longest_streak[index], self.break_count[index], iso(self.last_break[index]),
+                        bool(self.streak[index]), iso(last_check), last_check_week, iso(self.last_check_day[index]))
+        habit.habit_id = self.habit_ids[index]
+        habit.status = self.STATUSES[self.status[index]]
+        return habit
+
+    def nbytes(self):
+        """
+        Returns the count of bytes taken by the arrays, the names aren't counted.
+
+        :return: Returns the count of bytes.
+        :rtype: int
+        """
+        return sum(getattr(self, column).itemsize * len(getattr(self, column)) for column in self.COLUMNS)
@@ -1,4 +1,5 @@
 from db import DB
+from period import Period
 import datetime as date
 
 
@@ -19,7 +20,13 @@ class Habit:
     Methods:
         streak_increase_ln_check(): Increases the current streak, and also increases the longest streak if needed.
         break_count_check(): Checks whether the break count is equal 3, if so changes "self.status" to "Broken".
+        register_check(check: bool, check_date: str): Increases the streak if the habit was checked-off, otherwise
+        increases the break count.
     """
+    # The attributes are kept in slots instead of a dictionary, so a habit takes a fraction of the memory.
+    __slots__ = ("name", "description", "start_date", "valid_till", "periodicity", "status", "end_date",
+                 "current_streak", "longest_streak", "break_count", "last_break")
+
     def __init__(self, name: str, description: str, start_date: str, valid_till: str, periodicity: str,
                  current_streak=0, longest_streak=0, break_count=0, last_break=""):
         """
@@ -78,6 +85,27 @@ class Habit:
                 "You have to start again!\nYou are free to create a habit, that has the same name!\n")
             self.status = "Broken"
 
+    def register_check(self, check: bool, check_date: str):
+        """
+        Increases the streak if the habit was checked-off, otherwise increases the break count.
+
+        :param check: The check-off (i.e. True or False).
+        :type check: bool
+        :param check_date: The check-off date.
+        :type check_date: str
+        :return: None
+        """
+        if check == 0:  # Checks whether the user has checked-off the habit or no.
+            self.break_count += 1  # Increases the break count.
+            self.break_count_check()  # Checks whether the break count has exceeded or is equal 3.
+            self.last_break = check_date  # Changes the last break date.
+            self.current_streak = 0  # Current streak becomes 0.
+            if self.status == "Broken":
+                # If the status of the habit is changed, changes the end date.
+                self.end_date = check_date
+        if check == 1:  # In case the user has checked-off the habit, increases the streak.
+            self.streak_increase_ln_check()
+
 
 class DbHabit(Habit):
     """The DbHabit class that extends the Habit class.
@@ -86,21 +114,34 @@ class DbHabit(Habit):
         Habit
 
     Additional Attributes:
+        habit_id (int): The id of the habit in the database, which is set by store() and load(), or looked up by the
+        name when the habit is written for the first time (default None).
         streak (bool): The boolean value, that is needed to decide whether to insert streak data into Track table, or
         to update them in database (default False).
         last_check (str): The date of last check of a habit, if the periodicity is "Weekly" "last_check" actually shows
         the first day of a week and not the actual date of last check (default "").
 
     Additional Methods:
+        load(db, habit_id): Creates a DbHabit instance from the habit's data in the database.
         store(db): Inserts Habit data into the Habit table in the database.
         add_habit_check(db, check: bool, check_date: str): Inserts the check-off data, checks the missed check-off
         dates by calling the missed_dates(), checks whether the user has broken the habit by increasing the
         break_count, checks weather the user completed a habit by calling the check_progress().
+        add_habit_checks(db, checks: list): Inserts many check-offs at once, replaying them in memory and writing the
+        Tracker rows, the rollup, the streak and the habit data once.
+        store_progress(db, check_date: str): Inserts or updates the streak data and updates the habit data.
         check_progress(db, check_date: str): Checks weather the user has completed a habit by confirming that the
         check_date is greater than or equal to the valid_date.
-        missed_dates(db, check_date, check_date_dt, start_date_dt): Checks the missed check-off dates.
+        missed_dates(db, check_date, check_date_dt, start_date_dt): Checks the missed check-off dates without storing
+        them, and returns the first days of the missed periods.
+        index(): Returns the index of the last checked period of the habit.
+        snapshot(last_index, check_date: str): Returns the snapshot of the habit's state after the check-off, if one is
+        taken.
+        id(db): Returns the id of the habit.
         drop(db): Deletes certain habit data from the database.
     """
+    __slots__ = ("habit_id", "streak", "last_check", "last_check_week", "last_check_day")
+
     def __init__(self, name: str, description: str, start_date: str, valid_till: str, periodicity: str,
                  current_streak=0, longest_streak=0, break_count=0, last_break="", streak=False, last_check="",
                  last_check_week="", last_check_day=""):
@@ -138,14 +179,43 @@ class DbHabit(Habit):
         """
         super().__init__(name, description, start_date, valid_till, periodicity, current_streak, longest_streak,
                          break_count, last_break)
+        self.habit_id = None
         self.streak = streak
         self.last_check = last_check
         self.last_check_week = last_check_week
         self.last_check_day = last_check_day
-        # Int variable needed for the further calculations of missed days (default 0).
-        self.weeks = 0
-        # Int variable needed for the further calculations of missed days (default 0).
-        self.days = 0
+
+    @classmethod
+    def load(cls, db, habit_id):
+        """
+        Creates a DbHabit instance from the habit's data in the Habit and Streak tables.
+
+        :param db: The database, to which you are connected.
+        :type db: class
+        :param habit_id: The id of a habit.
+        :type habit_id: int
+        :return: Returns the habit, or None if there is no habit with such an id.
+        :rtype: DbHabit
+        """
+        cur = db.cursor()
+        cur.execute("""SELECT habit.name, habit.description, habit.start_date, habit.valid_till, habit.periodicity,
+        streak.current_streak, streak.longest_streak, streak.break_count, streak.last_break, habit.streak,
+        habit.last_check, habit.last_check_week, habit.last_check_day, habit.status, habit.end_date
+        FROM habit_iso AS habit LEFT JOIN streak_iso AS streak on habit.habit_id = streak.habit_id
+        WHERE habit.habit_id = ?""", (habit_id,))
+        select = cur.fetchone()
+        if not select:
+            return None
+        *data, status, end_date = select
+        names = ("name", "description", "start_date", "valid_till", "periodicity", "current_streak", "longest_streak",
+                 "break_count", "last_break", "streak", "last_check", "last_check_week", "last_check_day")
+        # The empty columns, e.g. of a habit, which hasn't been checked-off yet, keep the default values.
+        habit = cls(**{name: value for name, value in zip(names, data) if value is not None})
+        habit.habit_id = habit_id
+        habit.status = status
+        if status != "Still in progress":
+            habit.end_date = end_date
+        return habit
 
     def store(self, db):
         """
@@ -153,15 +223,19 @@ class DbHabit(Habit):
 
         :param db: The database, to which you are connected.
         :type db: class
-        :return: None
+        :return: Returns True if a habit with such a name already exists, otherwise None.
+        :rtype: bool
         """
-        habit = DB.add_habit(db, self.name, self.description, self.start_date, self.valid_till, self.periodicity)
-        if not habit:
+        self.habit_id = DB.insert_habit(db, self.name, self.description, self.start_date, self.valid_till,
+                                        self.periodicity)
+        if self.habit_id is not None:
             print(f"\nCongratulations!!!\nYou have just created a habit, which is valid till {self.valid_till}!\n"
                   "In order to complete a habit, you should check it off\n"
                   "Every day if the periodicity is \"Daily\", or every week if it is \"Weekly\"!\n"
                   "If you break your habit 3 times, the habit status will become \"Broken\"\n"
                   "And you will be forced to create a new habit!\n")
+            return None
+        return True
 
     def add_habit_check(self, db, check: bool, check_date: str):
         """
@@ -178,49 +252,113 @@ class DbHabit(Habit):
         :return: None
         """
         if self.status == "Still in progress":  # Checks whether the status is "Still in progress".
-            if not check_date:  # Checks whether the user has passed the check date.
-                check_date = str(date.date.today())  # If the user didn't, creates check_date gets the present day.
-            else:
-                check_date = str(check_date)  # Converts the check date into string.
-            check_date_dt = date.date.fromisoformat(check_date)  # Creates a check date of a "date" class type.
-            start_date_dt = date.date.fromisoformat(self.start_date)  # Creates a start date of a "date" class type.
-            x = self.missed_dates(db, check_date, check_date_dt, start_date_dt)  # Checks the missed check-offs.
-            if x == ConnectionError:
-                # Checks whether the user entered wrong check-off date.
-                return ConnectionError
-            DB.habit_check(db, self.name, check, check_date, self.status)
-            # Inserts data into the Tracker table in the "main.db".
-            if self.status == "Broken":
-                print(f"\nUnfortunately you have broken the {self.name} habit"
-                      f"\nSince you have missed many check-off dates!\n")
-            if self.status != "Broken":
-                if check == 0:  # Checks whether the user has checked-off the habit or no.
-                    self.break_count += 1  # Increases the break count.
-                    self.break_count_check()  # Checks whether the break count has exceeded or is equal 3.
-                    self.last_break = check_date  # Changes the last break date.
-                    self.current_streak = 0  # Current streak becomes 0.
-                    if self.status == "Broken":
-                        # If the status of the habit is changed, changes the status in the main.db.
-                        self.end_date = check_date
-                if check == 1:  # In case the user has checked-off the habit, increases the streak.
-                    self.streak_increase_ln_check()
+            with DB.transaction(db):  # Stores all the changes of the check-off at once.
+                if not check_date:  # Checks whether the user has passed the check date.
+                    check_date = str(date.date.today())  # If the user didn't, creates check_date gets the present day.
+                else:
+                    check_date = str(check_date)  # Converts the check date into string.
+                check_date_dt = date.date.fromisoformat(check_date)  # Creates a check date of a "date" class type.
+                start_date_dt = date.date.fromisoformat(self.start_date)  # Creates a start date of a "date" class type.
+                last_index = self.index()  # The last checked period, which decides whether a snapshot is taken.
+                x = self.missed_dates(db, check_date, check_date_dt, start_date_dt)  # Checks the missed check-offs.
+                if x == ConnectionError:
+                    # Checks whether the user entered wrong check-off date.
+                    return ConnectionError
+                DB.habit_check_by_id(db, self.id(db), check, check_date)
+                # Inserts data into the Tracker table in the "main.db".
+                rollup = [(missed_date, 0, 1) for missed_date in x]  # The missed periods are counted in the rollup.
+                if self.status == "Broken":
+                    print(f"\nUnfortunately you have broken the {self.name} habit"
+                          f"\nSince you have missed many check-off dates!\n")
                 if self.status != "Broken":
-                    _ = self.check_progress(db, check_date)
-                    if _:
-                        return print("\nCongratulations!!!\nYou have completed your habit!\n")
+                    self.register_check(check, check_date)  # Updates the streak or the break count.
+                    rollup.append((self.last_check, int(check == 1), int(check == 0)))
+                DB.add_rollup_by_id(db, self.id(db), rollup)
+                _ = self.status != "Broken" and self.check_progress(db, check_date)
+                DB.add_snapshots_by_id(db, self.id(db), self.snapshot(last_index, check_date))
+                if _:
+                    return print("\nCongratulations!!!\nYou have completed your habit!\n")
+                self.store_progress(db, check_date)
+        else:  # In case the habit's status isn't "Still in progress", prints next message.
+            print(f"\nYou can't check this habit since it is {self.status}!\nPlease select another habit or add it!\n")
+
+    def add_habit_checks(self, db, checks: list):
+        """
+        Inserts many check-offs at once. The check-offs are sorted by date and replayed in memory following the same
+        rules as add_habit_check(), then the Tracker rows are inserted at once, and the streak and the habit data are
+        written only for the final state.
+
+        :param db: The database, to which you are connected.
+        :type db: class
+        :param checks: The check-offs as (check, check_date) pairs, if the check_date is empty, the check-off date
+        will be the present day.
+        :type checks: list
+        :return: Returns the count of stored check-offs.
+        :rtype: int
+        """
+        today = str(date.date.today())
+        checks = sorted(((check, str(check_date) if check_date else today) for check, check_date in checks),
+                        key=lambda x: x[1])
+        start_date_dt = date.date.fromisoformat(self.start_date)
+        valid_till_dt = date.date.fromisoformat(self.valid_till)
+        rows = []
+        rollup = []
+        snapshots = []
+        for check, check_date in checks:
+            if self.status != "Still in progress":
+                print(f"\nYou can't check this habit since it is {self.status}!\n"
+                      f"The check-offs starting from {check_date} were skipped!\n")
+                break
+            check_date_dt = date.date.fromisoformat(check_date)
+            last_index = self.index()
+            missed = self.missed_dates(db, check_date, check_date_dt, start_date_dt)
+            if missed == ConnectionError:
+                # Skips the wrong check-off date, just like add_habit_check() does.
+                continue
+            rows.append((check, check_date))
+            rollup.extend((missed_date, 0, 1) for missed_date in missed)
+            if self.status != "Broken":
+                self.register_check(check, check_date)
+                rollup.append((self.last_check, int(check == 1), int(check == 0)))
+            if self.status != "Broken" and check_date_dt >= valid_till_dt:
+                self.status = "Completed"
+                self.end_date = check_date
+            snapshots += self.snapshot(last_index, check_date)
+        if not rows:
+            return 0
+        with DB.transaction(db):
+            DB.habit_checks_by_id(db, self.id(db), rows)
+            DB.add_rollup_by_id(db, self.id(db), rollup)
+            DB.add_snapshots_by_id(db, self.id(db), snapshots)
+            self.store_progress(db, rows[-1][1])
+        if self.status == "Broken":
+            print(f"\nUnfortunately you have broken the {self.name} habit!\n")
+        if self.status == "Completed":
+            print("\nCongratulations!!!\nYou have completed your habit!\n")
+        return len(rows)
+
+    def store_progress(self, db, check_date: str):
+        """
+        Inserts or updates the streak data and updates the habit data.
+
+        :param db: The database, to which you are connected.
+        :type db: class
+        :param check_date: The check-off date.
+        :type check_date: str
+        :return: None
+        """
+        with DB.transaction(db):
             if self.streak:
                 # Checks whether the habit has already been checked-off at least once, in order either to call the
                 # INSERT INTO Streak table SQL clause, or to call UPDATE Streak table's values SQL clause.
-                DB.update_streak(db, self.name, self.current_streak, self.longest_streak, self.break_count,
-                                 self.last_break)
+                DB.update_streak_by_id(db, self.id(db), self.current_streak, self.longest_streak, self.break_count,
+                                       self.last_break, self.name)
             else:
                 self.streak = True
-                DB.add_streak(db, self.name, self.current_streak, self.longest_streak, self.break_count,
-                              self.last_break)
-            DB.update_habit(db, self.name, self.streak, self.last_check, self.status, check_date, self.last_check_week,
-                            self.last_check_day)
-        else:  # In case the habit's status isn't "Still in progress", prints next message.
-            print(f"\nYou can't check this habit since it is {self.status}!\nPlease select another habit or add it!\n")
+                DB.add_streak_by_id(db, self.id(db), self.current_streak, self.longest_streak, self.break_count,
+                                    self.last_break, self.name)
+            DB.update_habit_by_id(db, self.id(db), self.streak, self.last_check, self.status, check_date,
+                                  self.last_check_day, self.name)
 
     def check_progress(self, db, check_date: str):
         """
@@ -233,23 +371,24 @@ class DbHabit(Habit):
         :type check_date: str
         :return: None
         """
-        check_date_dt = date.date.fromisoformat(check_date)
-        valid_till_dt = date.date.fromisoformat(self.valid_till)
-        if check_date_dt >= valid_till_dt:  # Checks whether the check date has exceeded the expiration date.
+        days_left = DB.ordinal(self.valid_till) - DB.ordinal(check_date)
+        if days_left <= 0:  # Checks whether the check date has exceeded the expiration date.
             self.status = "Completed"
             self.end_date = check_date
-            DB.update_streak(db, self.name, self.current_streak, self.longest_streak, self.break_count, self.last_break)
-            DB.update_habit(db, self.name, self.streak, self.last_check, self.status, check_date, self.last_check_week,
-                            self.last_check_day)
-            # Updates the main.db.
+            with DB.transaction(db):  # Updates the main.db.
+                DB.update_streak_by_id(db, self.id(db), self.current_streak, self.longest_streak, self.break_count,
+                                       self.last_break, self.name)
+                DB.update_habit_by_id(db, self.id(db), self.streak, self.last_check, self.status, check_date,
+                                      self.last_check_day, self.name)
             return True
         else:
             # In case the check date hasn't yet exceeded the expiration date, prints motivational message.
-            print(f"Still {valid_till_dt - check_date_dt} left!\nKeep it up!\n")
+            print(f"Still {date.timedelta(days=days_left)} left!\nKeep it up!\n")
 
     def missed_dates(self, db, check_date, check_date_dt, start_date_dt):
         """
-        Checks the missed check-off dates.
+        Checks the missed check-off dates. Only the habit's state is changed, storing it into the database is left to
+        the caller, so that many check-offs can be replayed in memory.
 
         :param db: The database, to which you are connected.
         :type db: class
@@ -259,139 +398,93 @@ class DbHabit(Habit):
         :type check_date_dt: class
         :param start_date_dt: The date of start.
         :type start_date_dt: class
-        :return: None
+        :return: Returns the first days of the missed periods.
+        :rtype: list
+        """
+        """The periods are numbered from the start date, the period with index k starts k days (k weeks if the
+        periodicity is "Weekly") after the start date. The habit hasn't been checked-off yet, if the "last_check" is
+        empty, in which case the last checked period is treated as the one before the start date, i.e. -1. If the check
+        date belongs to the period right after the last checked one, nothing is missed, otherwise every period in
+        between is a break. The habit is broken at once if 3 periods in a row are missed."""
+        period = Period(start_date_dt, self.periodicity)
+        last_index = period.index(date.date.fromisoformat(self.last_check)) if self.last_check else -1
+        gap = period.gap(last_index, check_date_dt)
+        if not self.last_check and gap < 1:
+            print("\nCheck-off date can't be earlier than the start date!\n")
+            return ConnectionError
+        if gap < 1:
+            print("\nWrong check-off date!\n"
+                  "Either the date you entered is earlier than your last check-off day,\n"
+                  "Or you have already checked-off the habit during the period!\n")
+            return ConnectionError
+        missed = gap - 1
+        if missed >= Period.MAX_MISSED:
+            # The habit is broken at the start of the period following the third missed one.
+            broken_date = str(period.start_of(last_index + Period.MAX_MISSED + 1))
+            self.last_break = broken_date
+            self.status = "Broken"
+            self.break_count = 3
+            self.current_streak = 0
+            self.end_date = broken_date
+            self.last_check_day = check_date
+            self.last_check = broken_date
+            return [str(period.start_of(last_index + i)) for i in range(1, Period.MAX_MISSED + 1)]
+        index = last_index + gap
+        if missed:
+            self.last_break = str(period.start_of(index))
+            self.break_count += missed
+            self.current_streak = 0
+            self.break_count_check()
+        self.last_check = str(period.start_of(index))
+        if period.weekly:
+            # For habits with "Weekly" periodicity type, the program inserts the last checked week.
+            self.last_check_week = period.week_bounds(index)
+        self.last_check_day = check_date
+        return [str(period.start_of(last_index + i)) for i in range(1, gap)]
+
+    def index(self):
+        """
+        Returns the index of the last checked period of the habit, see missed_dates().
+
+        :return: Returns the index, or -1 if the habit hasn't been checked-off yet.
+        :rtype: int
         """
-        """Variables "weeks" and "days" are needed, in order to calculate whether the check date comes after the start 
-        date, or after the last check date, and how many days or weeks has passed after the start date, or after the
-        last check date."""
-        if self.periodicity == "Daily":
-            self.weeks = 0
-            self.days = 1
-        elif self.periodicity == "Weekly":
-            self.weeks = 1
-            self.days = 0
-        """If the periodicity is "Daily", the weeks becomes 0, and the days becomes 1, otherwise the weeks becomes 1,
-        and the days becomes 0. It is all done because when calling date.timedelta, the program multiplies the weeks and
-        the days variables with integer value. For example, in order to check, whether the user has missed more than 3
-        days or weeks of checking-off the habit from the beginning, called next if statement:
-        if check_date_dt >= start_date_dt + date.timedelta(weeks=self.weeks * 3, days=self.days * 3).
-        Now it's clear, that if the periodicity is "Daily", the weeks becomes 0 since 3 * 0 = 0."""
         if not self.last_check:
-            if check_date_dt >= start_date_dt + date.timedelta(weeks=self.weeks * 3, days=self.days * 3):
-                self.last_break = str(start_date_dt + date.timedelta(weeks=self.weeks * 3, days=self.days * 3))
-                self.status = "Broken"
-                self.break_count = 3
-                self.current_streak = 0
-                self.end_date = str(start_date_dt + date.timedelta(weeks=self.weeks * 3, days=self.days * 3))
-                self.last_check_day = check_date
-                DB.update_streak(db, self.name, self.current_streak, self.longest_streak, self.break_count,
-                                 self.last_break)
-                DB.update_habit(db, self.name, self.streak, self.last_check, self.status, check_date,
-                                self.last_check_week, self.last_check_day)
-                self.last_check = str(start_date_dt + date.timedelta(weeks=self.weeks * 3, days=self.days * 3))
-            elif check_date_dt >= start_date_dt + date.timedelta(weeks=self.weeks * 2, days=self.days * 2):
-                self.last_break = str(start_date_dt + date.timedelta(weeks=self.weeks * 2, days=self.days * 2))
-                self.break_count = 2
-                self.current_streak = 0
-                DB.update_streak(db, self.name, self.current_streak, self.longest_streak, self.break_count,
-                                 self.last_break)
-                self.last_check = str(start_date_dt + date.timedelta(weeks=self.weeks * 2, days=self.days * 2))
-                if self.weeks == 1:
-                    # For habits with "Weekly" periodicity type, the program inserts the last checked week.
-                    self.last_check_week = (f"{start_date_dt + date.timedelta(weeks=self.weeks * 2)} : "
-                                            f"{start_date_dt + date.timedelta(days=20)}")
-                    self.last_check_day = check_date
-                if self.days == 1:
-                    # For habits with "Daily" periodicity type, the program inserts the last checked day's date.
-                    self.last_check_day = check_date
-            elif check_date_dt >= start_date_dt + date.timedelta(weeks=self.weeks, days=self.days):
-                self.last_break = str(start_date_dt + date.timedelta(weeks=self.weeks, days=self.days))
-                self.break_count = 1
-                self.current_streak = 0
-                DB.update_streak(db, self.name, self.current_streak, self.longest_streak, self.break_count,
-                                 self.last_break)
-                self.last_check = str(start_date_dt + date.timedelta(weeks=self.weeks, days=self.days))
-                if self.weeks == 1:
-                    # For habits with "Weekly" periodicity type, the program inserts the last checked week.
-                    self.last_check_week = (f"{start_date_dt + date.timedelta(weeks=self.weeks)} : "
-                                            f"{start_date_dt + date.timedelta(days=13)}")
-                    self.last_check_day = check_date
-                if self.days == 1:
-                    # For habits with "Daily" periodicity type, the program inserts the last checked day's date.
-                    self.last_check_day = check_date
-            elif check_date_dt >= start_date_dt:
-                self.last_check = self.start_date
-                if self.weeks == 1:
-                    # For habits with "Weekly" periodicity type, the program inserts the last checked week.
-                    self.last_check_week = f"{start_date_dt} : {start_date_dt + date.timedelta(days=6)}"
-                    self.last_check_day = check_date
-                if self.days == 1:
-                    # For habits with "Daily" periodicity type, the program inserts the last checked day's date.
-                    self.last_check_day = check_date
-            else:
-                print("\nCheck-off date can't be earlier than the start date!\n")
-                return ConnectionError
-        else:
-            last_check_dt = date.date.fromisoformat(self.last_check)
-            if check_date_dt >= last_check_dt + date.timedelta(weeks=self.weeks * 4, days=self.days * 4):
-                self.last_break = str(last_check_dt + date.timedelta(weeks=self.weeks * 4, days=self.days * 4))
-                self.status = "Broken"
-                self.break_count = 3
-                self.current_streak = 0
-                self.end_date = str(last_check_dt + date.timedelta(weeks=self.weeks * 4, days=self.days * 4))
-                self.last_check_day = check_date
-                DB.update_streak(db, self.name, self.current_streak, self.longest_streak, self.break_count,
-                                 self.last_break)
-                DB.update_habit(db, self.name, self.streak, self.last_check, self.status, check_date,
-                                self.last_check_week, self.last_check_day)
-                self.last_check = str(last_check_dt + date.timedelta(weeks=self.weeks * 4, days=self.days * 4))
-            elif check_date_dt >= last_check_dt + date.timedelta(weeks=self.weeks * 3, days=self.days * 3):
-                self.last_break = str(last_check_dt + date.timedelta(weeks=self.weeks * 3, days=self.days * 3))
-                self.break_count += 2
-                self.current_streak = 0
-                self.break_count_check()
-                DB.update_streak(db, self.name, self.current_streak, self.longest_streak, self.break_count,
-                                 self.last_break)
-                self.last_check = str(last_check_dt + date.timedelta(weeks=self.weeks * 3, days=self.days * 3))
-                if self.weeks == 1:
-                    # For habits with "Weekly" periodicity type, the program inserts the last checked week.
-                    self.last_check_week = (f"{last_check_dt + date.timedelta(weeks=self.weeks * 3)} : "
-                                            f"{last_check_dt + date.timedelta(days=27)}")
-                    self.last_check_day = check_date
-                if self.days == 1:
-                    # For habits with "Daily" periodicity type, the program inserts the last checked day's date.
-                    self.last_check_day = check_date
-            elif check_date_dt >= last_check_dt + date.timedelta(weeks=self.weeks * 2, days=self.days * 2):
-                self.last_break = str(last_check_dt + date.timedelta(weeks=self.weeks * 2, days=self.days * 2))
-                self.break_count += 1
-                self.current_streak = 0
-                self.break_count_check()
-                DB.update_streak(db, self.name, self.current_streak, self.longest_streak, self.break_count,
-                                 self.last_break)
-                self.last_check = str(last_check_dt + date.timedelta(weeks=self.weeks * 2, days=self.days * 2))
-                if self.weeks == 1:
-                    # For habits with "Weekly" periodicity type, the program inserts the last checked week.
-                    self.last_check_week = (f"{last_check_dt + date.timedelta(weeks=self.weeks * 2)} : "
-                                            f"{last_check_dt + date.timedelta(days=20)}")
-                    self.last_check_day = check_date
-                if self.days == 1:
-                    # For habits with "Daily" periodicity type, the program inserts the last checked day's date.
-                    self.last_check_day = check_date
-            elif check_date_dt >= last_check_dt + date.timedelta(weeks=self.weeks, days=self.days):
-                self.last_check = str(last_check_dt + date.timedelta(weeks=self.weeks, days=self.days))
-                if self.weeks == 1:
-                    # For habits with "Weekly" periodicity type, the program inserts the last checked week.
-                    self.last_check_week = (f"{last_check_dt + date.timedelta(weeks=self.weeks)} : "
-                                            f"{last_check_dt + date.timedelta(days=13)}")
-                    self.last_check_day = check_date
-                if self.days == 1:
-                    # For habits with "Daily" periodicity type, the program inserts the last checked day's date.
-                    self.last_check_day = check_date
-            else:
-                print("\nWrong check-off date!\n"
-                      "Either the date you entered is earlier than your last check-off day,\n"
-                      "Or you have already checked-off the habit during the period!\n")
-                return ConnectionError
+            return -1
+        return Period(date.date.fromisoformat(self.start_date), self.periodicity).index(
+            date.date.fromisoformat(self.last_check))
+
+    def snapshot(self, last_index, check_date: str):
+        """
+        Returns the snapshot of the habit's state after the check-off, if the check-off is the first one of a block of
+        DB.SNAPSHOT_PERIODS periods, see Rebuild.states().
+
+        :param last_index: The index of the period checked-off before the check-off.
+        :type last_index: int
+        :param check_date: The check-off date.
+        :type check_date: str
+        :return: Returns the list of the snapshot's row, or an empty list if no snapshot is taken.
+        :rtype: list
+        """
+        index = self.index()
+        if not DB.snapshot_due(last_index, index):
+            return []
+        return [(check_date, index, self.current_streak, self.longest_streak, self.break_count, self.last_break,
+                 self.status)]
+
+    def id(self, db):
+        """
+        Returns the id of the habit, looking it up by the name only if it isn't known yet, e.g. if the habit was created
+        without store() or load().
+
+        :param db: The database, to which you are connected.
+        :type db: class
+        :return: Returns the habit's id, or None if there is no such a habit.
+        :rtype: int
+        """
+        if self.habit_id is None:
+            self.habit_id = DB.id_of(db, self.name)
+        return self.habit_id
 
     def drop(self, db):
         """
@@ -402,3 +495,4 @@ class DbHabit(Habit):
         :return: None
         """
         DB.delete_habit(db, self.name)
+        self.habit_id = None
@@ -0,0 +1,365 @@
+import functools
+import inspect
+import json
+import re
+import sqlite3
+import threading
+import time
+
+from analyse import Analysis
+from db import DB
+from habit_track import DbHabit
+
+
+class Metrics:
+    """The Metrics class measures the SQL statements and the operations of the DB, DbHabit and Analysis classes, e.g. to
+    find the queries, which became slow.
+
+    Nothing is measured until enable() is called: it replaces the public methods of the instrumented classes with
+    timing wrappers and traces the statements of the connections with set_trace_callback(). disable() puts the original
+    methods back, so the disabled metrics cost nothing.
+
+    Every statement and every operation is counted, with the rows it changed and a histogram of its latency. The
+    statements are grouped by their text, in which the literal values are replaced by "?". A statement is timed from
+    its start to the start of the next statement, or to the end of the operation running it, so its time includes the
+    fetching of its rows. The statements run outside of any operation are only counted.
+
+    Methods:
+        enable(*dbs): Starts measuring the operations and the statements of the connections.
+        disable(*dbs): Stops measuring and puts the original methods back.
+        trace(db): Starts measuring the statements of the connection.
+        reset(): Forgets the measurements.
+        snapshot(): Returns the measurements as a dictionary.
+        top(count=10, by="seconds"): Returns the statements, which took the most time or ran the most times.
+        to_json(indent=None): Returns the measurements as JSON.
+        to_prometheus(): Returns the measurements in the text format of Prometheus.
+    """
+    # The upper bounds of the latency histograms' buckets in seconds.
+    BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+    # The instrumented classes.
+    CLASSES = (DB, DbHabit, Analysis)
+    # The methods, which aren't measured, since they don't touch the database or only help the other methods.
+    SKIPPED = {"transaction", "retry", "ordinal", "user_of", "set_user", "add_listener", "remove_listener",
+               "start_checkpoints", "render", "snapshot_due", "index", "snapshot"}
+    # The prefix of the Prometheus metrics.
+    PREFIX = "habit_tracker"
+    # The literal values in the traced statements.
+    _LITERALS = re.compile(r"'(?:[^']|'')*'|(?<![\w.])-?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?\b|(?<=[(,=])\s*NULL\b")
+    # The original methods by the instrumented classes and the names of the methods, while the metrics are enabled.
+    _originals = {}
+    # The measurements of the statements and of the operations by their keys.
+    _statements = {}
+    _operations = {}
+    # The currently timed statement, the count of rows changed by the finished statements and the depth of the running
+    # operations of every thread.
+    _local = threading.local()
+    _lock = threading.Lock()
+
+    @classmethod
+    def enable(cls, *dbs):
+        """
+        Starts measuring the operations of the DB, DbHabit and Analysis classes and the statements of the connections.
+        The connections opened by DB.get_db() while the metrics are enabled are traced as well.
+
+        :param dbs: The databases, to which you are connected.
+        :type dbs: tuple
+        :return: None
+        """
+        with cls._lock:
+            if not cls._originals:
+                for owner in cls.CLASSES:
+                    cls._originals[owner] = {}
+                    for name, attribute in list(vars(owner).items()):
+                        if name.startswith("_") or name in cls.SKIPPED:
+                            continue
+                        if isinstance(attribute, (classmethod, staticmethod)):
+                            wrapped = type(attribute)(cls._wrap(owner, attribute.__func__))
+                        elif inspect.isfunction(attribute):
+                            wrapped = cls._wrap(owner, attribute)
+                        else:
+                            continue
+                        cls._originals[owner][name] = attribute
+                        setattr(owner, name, wrapped)
+        for db in dbs:
+            cls.trace(db)
+
+    @classmethod
+    def disable(cls, *dbs):
+        """
+        Stops measuring and puts the original methods back. The measurements are kept until reset() is called.
+
+        :param dbs: The databases, whose statements aren't traced anymore.
+        :type dbs: tuple
+        :return: None
+        """
+        with cls._lock:
+            for owner, methods in cls._originals.items():
+                for name, attribute in methods.items():
+                    setattr(owner, name, attribute)
+            cls._originals.clear()
+        for db in dbs:
+            db.set_trace_callback(None)
+
+    @classmethod
+    def trace(cls, db):
+        """
+        Starts measuring the statements of the connection. The statements are ignored while the metrics are disabled.
+
+        :param db: The database, to which you are connected.
+        :type db: class
+        :return: None
+        """
+        db.set_trace_callback(functools.partial(cls._trace, db))
+
+    @classmethod
+    def reset(cls):
+        """
+        Forgets the measurements.
+
+        :return: None
+        """
+        with cls._lock:
+            cls._statements.clear()
+            cls._operations.clear()
+
+    @classmethod
+    def snapshot(cls):
+        """
+        Returns the measurements as a dictionary with the "statements" and the "operations", each by its key with the
+        "count", the "rows" it changed, the "seconds" it took, the count of "timed" runs and the cumulative "buckets"
+        of the latency histogram.
+
+        :return: Returns the measurements.
+        :rtype: dict
+        """
+        with cls._lock:
+            return {kind: {key: cls._export(measurement) for key, measurement in measurements.items()}
+                    for kind, measurements in (("statements", cls._statements), ("operations", cls._operations))}
+
+    @classmethod
+    def top(cls, count=10, by="seconds"):
+        """
+        Returns the statements, which took the most time or ran the most times.
+
+        :param count: The count of statements (default 10).
+        :type count: int
+        :param by: The measurement, by which the statements are ranked, i.e. "seconds", "count" or "rows"
+        (default "seconds").
+        :type by: str
+        :return: Returns the (statement, measurements) pairs.
+        :rtype: list
+        """
+        statements = cls.snapshot()["statements"]
+        return sorted(statements.items(), key=lambda item: item[1][by], reverse=True)[:count]
+
+    @classmethod
+    def to_json(cls, indent=None):
+        """
+        Returns the measurements as JSON, see snapshot().
+
+        :param indent: The indentation of the JSON (default None).
+        :type indent: int
+        :return: Returns the JSON.
+        :rtype: str
+        """
+        return json.dumps(cls.snapshot(), indent=indent)
+
+    @classmethod
+    def to_prometheus(cls):
+        """
+        Returns the measurements in the text format of Prometheus, as the "<PREFIX>_statement_*" and the
+        "<PREFIX>_operation_*" metrics labelled by the statement or the operation.
+
+        :return: Returns the metrics.
+        :rtype: str
+        """
+        lines = []
+        for kind, measurements in cls.snapshot().items():
+            kind = kind[:-1]
+            name = f"{cls.PREFIX}_{kind}"
+            lines += [f"# HELP {name}_calls_total The count of runs of the {kind}.",
+                      f"# TYPE {name}_calls_total counter"]
+            lines += [f"{name}_calls_total{{{kind}={cls._label(key)}}} {measurement['count']}"
+                      for key, measurement in measurements.items()]
+            lines += [f"# HELP {name}_rows_total The count of rows changed by the {kind}.",
+                      f"# TYPE {name}_rows_total counter"]
+            lines += [f"{name}_rows_total{{{kind}={cls._label(key)}}} {measurement['rows']}"
+                      for key, measurement in measurements.items()]
+            lines += [f"# HELP {name}_seconds The latency of the {kind}.", f"# TYPE {name}_seconds histogram"]
+            for key, measurement in measurements.items():
+                label = f"{kind}={cls._label(key)}"
+                lines += [f"{name}_seconds_bucket{{{label},le=\"{bound}\"}} {observed}"
+                          for bound, observed in measurement["buckets"].items()]
+                lines += [f"{name}_seconds_sum{{{label}}} {measurement['seconds']!r}",
+                          f"{name}_seconds_count{{{label}}} {measurement['timed']}"]
+        return "\n".join(lines) + "\n"
+
+    @classmethod
+    def _wrap(cls, owner, function):
+        """
+        Returns a wrapper of the function, which measures its calls. The generator functions are measured until the
+        generator is exhausted or closed.
+
+        :param owner: The class of the function.
+        :type owner: class
+        :param function: The function.
+        :type function: function
+        :return: Returns the wrapper.
+        :rtype: function
+        """
+        key = f"{owner.__name__}.{function.__name__}"
+        if inspect.isgeneratorfunction(function):
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                started = cls._begin()
+                try:
+                    yield from function(*args, **kwargs)
+                finally:
+                    cls._end(key, *started)
+        else:
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                started = cls._begin()
+                try:
+                    result = function(*args, **kwargs)
+                finally:
+                    cls._end(key, *started)
+                # The connections opened by DB.get_db() are traced too.
+                if isinstance(result, sqlite3.Connection):
+                    cls.trace(result)
+                return result
+        return wrapper
+
+    @classmethod
+    def _begin(cls):
+        """
+        Starts an operation on the current thread.
+
+        :return: Returns the start time and the count of rows changed on the thread so far.
+        :rtype: tuple
+        """
+        local = cls._local
+        local.depth = getattr(local, "depth", 0) + 1
+        return time.perf_counter(), getattr(local, "rows", 0)
+
+    @classmethod
+    def _end(cls, key, started, rows):
+        """
+        Ends an operation on the current thread and records it.
+
+        :param key: The class and the name of the operation.
+        :type key: str
+        :param started: The start time.
+        :type started: float
+        :param rows: The count of rows changed on the thread before the operation.
+        :type rows: int
+        :return: None
+        """
+        cls._close()
+        local = cls._local
+        local.depth -= 1
+        cls._record(cls._operations, key, time.perf_counter() - started, getattr(local, "rows", 0) - rows)
+
+    @classmethod
+    def _trace(cls, db, statement):
+        """
+        Records the statement, which is about to run, the trace callback of the connections.
+
+        :param db: The database, to which you are connected.
+        :type db: class
+        :param statement: The statement with its parameters' values.
+        :type statement: str
+        :return: None
+        """
+        if not cls._originals:
+            return
+        started = time.perf_counter()
+        cls._close(started)
+        key = " ".join(cls._LITERALS.sub("?", statement).split())
+        if getattr(cls._local, "depth", 0):
+            cls._local.statement = (key, started, db, db.total_changes)
+        else:
+            cls._record(cls._statements, key)
+
+    @classmethod
+    def _close(cls, ended=None):
+        """
+        Records the statement timed on the current thread, if there is any.
+
+        :param ended: The end time, if not passed, the present time (default None).
+        :type ended: float
+        :return: None
+        """
+        local = cls._local
+        statement = getattr(local, "statement", None)
+        if statement is None:
+            return
+        local.statement = None
+        key, started, db, changes = statement
+        try:
+            rows = db.total_changes - changes
+        except sqlite3.ProgrammingError:
+            # The connection has already been closed.
+            rows = 0
+        local.rows = getattr(local, "rows", 0) + rows
+        cls._record(cls._statements, key, (ended or time.perf_counter()) - started, rows)
+
+    @classmethod
+    def _record(cls, measurements, key, seconds=None, rows=0):
+        """
+        Adds a run of the statement or the operation to the measurements.
+
+        :param measurements: The measurements of the statements or of the operations.
+        :type measurements: dict
+        :param key: The statement or the operation.
+        :type key: str
+        :param seconds: The latency, if not passed, the run is only counted (default None).
+        :type seconds: float
+        :param rows: The count of changed rows (default 0).
+        :type rows: int
+        :return: None
+        """
+        with cls._lock:
+            measurement = measurements.get(key)
+            if measurement is None:
+                measurement = measurements[key] = {"count": 0, "rows": 0, "seconds": 0.0, "timed": 0,
+                                                   "buckets": [0] * len(cls.BUCKETS)}
+            measurement["count"] += 1
+            measurement["rows"] += rows
+            if seconds is not None:
+                measurement["seconds"] += seconds
+                measurement["timed"] += 1
+                for i, bound in enumerate(cls.BUCKETS):
+                    if seconds <= bound:
+                        measurement["buckets"][i] += 1
+                        break
+
+    @classmethod
+    def _export(cls, measurement):
+        """
+        Returns a copy of the measurement with the cumulative buckets keyed by their upper bounds.
+
+        :param measurement: The measurement.
+        :type measurement: dict
+        :return: Returns the copy.
+        :rtype: dict
+        """
+        buckets = {}
+        observed = 0
+        for bound, count in zip(cls.BUCKETS, measurement["buckets"]):
+            observed += count
+            buckets[str(bound)] = observed
+        buckets["+Inf"] = measurement["timed"]
+        return dict(measurement, buckets=buckets)
+
+    @staticmethod
+    def _label(value):
+        """
+        Returns the value as a quoted Prometheus label value.
+
+        :param value: The value.
+        :type value: str
+        :return: Returns the quoted value.
+        :rtype: str
+        """
+        return '"' + value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
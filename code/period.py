@@ -0,0 +1,97 @@
+import datetime as date
+
+
+class Period:
+    """The Period class converts the dates into the indexes of a habit's periods and back.
+
+    The period with index 0 starts on the start date of a habit, the period with index k starts k * length days later,
+    so every calculation is a single integer division, no matter how many periods have passed.
+
+    Attributes:
+        start (int): The ordinal of the start date of a habit.
+        length (int): The length of a period in days (i.e. 1 for "Daily", 7 for "Weekly").
+        weekly (bool): Whether the periodicity is "Weekly".
+
+    Methods:
+        index(day): Returns the index of the period, to which the day belongs.
+        ordinal_index(ordinal): Returns the index of the period, to which the day with the ordinal belongs.
+        start_of(index): Returns the first day of the period.
+        week_bounds(index): Returns the first and the last days of the period as "YYYY-MM-DD : YYYY-MM-DD".
+        gap(last_index, day): Returns how many periods have passed from the last checked period to the day's period.
+    """
+    # The lengths of the periods in days.
+    LENGTHS = {"Daily": 1, "Weekly": 7}
+    # The count of missed periods, after which a habit is broken at once.
+    MAX_MISSED = 3
+
+    def __init__(self, start_date, periodicity: str):
+        """
+        Initializes a Period instance.
+
+        :param start_date: The start date of a habit.
+        :type start_date: class
+        :param periodicity: The periodicity of a habit (i.e. "Daily", "Weekly").
+        :type periodicity: str
+        """
+        self.start = start_date.toordinal()
+        self.length = self.LENGTHS[periodicity]
+        self.weekly = periodicity == "Weekly"
+
+    def index(self, day):
+        """
+        Returns the index of the period, to which the day belongs, days before the start date get negative indexes.
+
+        :param day: The date.
+        :type day: class
+        :return: Returns the index of the period.
+        :rtype: int
+        """
+        return (day.toordinal() - self.start) // self.length
+
+    def ordinal_index(self, ordinal: int):
+        """
+        Returns the index of the period, to which the day with the ordinal belongs.
+
+        :param ordinal: The ordinal of the date.
+        :type ordinal: int
+        :return: Returns the index of the period.
+        :rtype: int
+        """
+        return (ordinal - self.start) // self.length
+
+    def start_of(self, index: int):
+        """
+        Returns the first day of the period.
+
+        :param index: The index of the period.
+        :type index: int
+        :return: Returns the first day of the period.
+        :rtype: class
+        """
+        return date.date.fromordinal(self.start + index * self.length)
+
+    def week_bounds(self, index: int):
+        """
+        Returns the first and the last days of the period as "YYYY-MM-DD : YYYY-MM-DD".
+
+        :param index: The index of the period.
+        :type index: int
+        :return: Returns the first and the last days of the period.
+        :rtype: str
+        """
+        first = self.start + index * self.length
+        return f"{date.date.fromordinal(first)} : {date.date.fromordinal(first + self.length - 1)}"
+
+    def gap(self, last_index: int, day):
+        """
+        Returns how many periods have passed from the last checked period to the day's period, i.e. 1 if the day
+        belongs to the next period, 2 if one period was missed in between, and so on.
+
+        :param last_index: The index of the last checked period, or -1 if the habit hasn't been checked-off yet.
+        :type last_index: int
+        :param day: The date.
+        :type day: class
+        :return: Returns the count of periods.
+        :rtype: int
+        """
+        return self.index(day) - last_index
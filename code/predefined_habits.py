@@ -1,3 +1,5 @@
+import sys
+
 from habit_track import DbHabit
 from db import DB
 
@@ -16,7 +18,38 @@ class PredefinedHabits:
         habit for a period of 4 weeks.
         writing_oop_code(db): Creates a habit called "Writing OOP code" and inserts data of checking-off the habit for
         a period of 4 weeks.
+        seed(db): Creates the predefined habits, which don't exist yet, in one transaction.
     """
+    # The names of the predefined habits and the methods creating them.
+    HABITS = {
+        "Documenting code": "documenting_code",
+        "Naming variables properly": "naming_variables_properly",
+        "Not drinking coffee": "not_drinking_coffee",
+        "Not skipping leg day": "not_skipping_leg_day",
+        "Writing OOP code": "writing_oop_code",
+    }
+
+    @classmethod
+    def seed(cls, db):
+        """
+        Creates the predefined habits, which don't exist yet, in one transaction, so seeding a database twice doesn't
+        change it.
+
+        :param db: The database, to which you are connected.
+        :type db: class
+        :return: Returns the count of created habits.
+        :rtype: int
+        """
+        cur = db.cursor()
+        cur.execute(f"SELECT name FROM habit WHERE user_id = ? AND name IN ({', '.join('?' * len(cls.HABITS))})",
+                    (DB.user_of(db), *cls.HABITS))
+        existing = {row[0] for row in cur.fetchall()}
+        with DB.transaction(db):
+            for name, method in cls.HABITS.items():
+                if name not in existing:
+                    getattr(cls, method)(db)
+        return len(cls.HABITS) - len(existing)
+
     @staticmethod
     def documenting_code(db):
         """
@@ -144,9 +177,8 @@ class PredefinedHabits:
         habit.add_habit_check(db, True, "2025-02-05")
 
 
-my_db = DB.get_db()
-PredefinedHabits.documenting_code(my_db)
-PredefinedHabits.naming_variables_properly(my_db)
-PredefinedHabits.not_drinking_coffee(my_db)
-PredefinedHabits.not_skipping_leg_day(my_db)
-PredefinedHabits.writing_oop_code(my_db)
+# Executed when invoked directly, e.g. "python predefined_habits.py main.db", importing the module changes nothing.
+if __name__ == "__main__":
+    my_db = DB.get_db(*sys.argv[1:2])
+    print(f"Created {PredefinedHabits.seed(my_db)} predefined habits.")
+    DB.db_close(my_db)
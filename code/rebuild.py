@@ -0,0 +1,423 @@
+import sys
+import json
+import datetime as date
+from itertools import groupby
+
+from db import DB
+from period import Period
+
+
+class Rebuild:
+    """The Rebuild class recomputes the derived data of the habits from the Tracker table.
+
+    Methods:
+        rebuild_streaks(db, habit_ids=None, chunk_size=10000): Recomputes the Streak table from the Tracker table.
+        backfill_rollup(db, habit_ids=None, chunk_size=10000): Recomputes the Rollup table from the Tracker table.
+        backfill_snapshots(db, habit_ids=None, chunk_size=10000): Recomputes the StreakSnapshot table from the Tracker
+        table.
+        replay(period, valid_till, checks, rollup=None): Returns the streak data of a habit after the check-offs.
+        states(period, valid_till, checks, state=None, rollup=None): Yields the state of a habit after every check-off.
+        recover(db, habit_ids=None): Rebuilds the Habit and the Streak tables from the event log.
+        verify(db, habit_ids=None): Returns the ids of the habits, whose rows differ from the event log.
+        recovered(db, habit_ids=None): Yields the rows of the Habit and the Streak tables recovered from the event log.
+        tracker_rows(db, habit_ids=None, chunk_size=10000): Yields the check-offs ordered by habit and date.
+    """
+    # The Julian day of the day before 0001-01-01, see DB.JULIAN_OFFSET.
+    JULIAN_OFFSET = DB.JULIAN_OFFSET
+    # The state of a habit, which hasn't been checked-off yet, see states().
+    START = (-1, 0, 0, 0, 0, "Still in progress")
+
+    @classmethod
+    def rebuild_streaks(cls, db, habit_ids=None, chunk_size=10000):
+        """
+        Recomputes the current streak, the longest streak, the break count and the last break date of the habits from
+        the Tracker table, and writes them into the Streak table in one transaction. The Tracker table is read in
+        chunks, so the memory doesn't grow with the count of check-offs.
+
+        :param db: The database, to which you are connected.
+        :type db: class
+        :param habit_ids: The ids of the habits to rebuild, if not passed, all habits are rebuilt (default None).
+        :type habit_ids: list
+        :param chunk_size: The count of rows fetched at once (default 10000).
+        :type chunk_size: int
+        :return: Returns the count of rebuilt habits.
+        :rtype: int
+        """
+        cur = db.cursor()
+        query = "SELECT habit_id, start_date, valid_till, periodicity FROM habit"
+        if habit_ids is not None:
+            habit_ids = list(habit_ids)
+            query += f" WHERE habit_id IN ({', '.join('?' * len(habit_ids))})"
+        cur.execute(query, habit_ids or ())
+        habits = {habit_id: (start_date, valid_till, periodicity)
+                  for habit_id, start_date, valid_till, periodicity in cur.fetchall()}
+        streaks = []
+        for habit_id, checks in groupby(cls.tracker_rows(db, habit_ids, chunk_size), key=lambda x: x[0]):
+            if habit_id not in habits:
+                continue
+            start_date, valid_till, periodicity = habits[habit_id]
+            period = Period(date.date.fromordinal(start_date), periodicity)
+            current_streak, longest_streak, break_count, last_break = cls.replay(
+                period, valid_till, ((x[1], x[2]) for x in checks))
+            # The habit, which isn't broken, has no last break date.
+            streaks.append((habit_id, current_streak, longest_streak, break_count, last_break or None))
+        with DB.transaction(db):
+            cur.executemany("""
+            INSERT OR REPLACE INTO
+            streak(habit_id, current_streak, longest_streak, break_count, last_break, user_id)
+            VALUES (?1, ?2, ?3, ?4, ?5, (SELECT user_id FROM habit WHERE habit_id = ?1))
+            """, streaks)
+            cur.executemany("UPDATE habit SET streak = 1 WHERE habit_id = ?", ((x[0],) for x in streaks))
+        return len(streaks)
+
+    @classmethod
+    def backfill_rollup(cls, db, habit_ids=None, chunk_size=10000):
+        """
+        Recomputes the completed and missed check-offs per period of the habits from the Tracker table, and replaces
+        their rows in the Rollup table in one transaction.
+
+        :param db: The database, to which you are connected.
+        :type db: class
+        :param habit_ids: The ids of the habits to backfill, if not passed, all habits are backfilled (default None).
+        :type habit_ids: list
+        :param chunk_size: The count of rows fetched at once (default 10000).
+        :type chunk_size: int
+        :return: Returns the count of inserted rollup rows.
+        :rtype: int
+        """
+        cur = db.cursor()
+        query = "SELECT habit_id, start_date, valid_till, periodicity FROM habit"
+        if habit_ids is not None:
+            habit_ids = list(habit_ids)
+            query += f" WHERE habit_id IN ({', '.join('?' * len(habit_ids))})"
+        cur.execute(query, habit_ids or ())
+        habits = {habit_id: (start_date, valid_till, periodicity)
+                  for habit_id, start_date, valid_till, periodicity in cur.fetchall()}
+        count = 0
+        with DB.transaction(db):
+            if habit_ids is None:
+                cur.execute("DELETE FROM rollup")
+            else:
+                cur.executemany("DELETE FROM rollup WHERE habit_id = ?", ((habit_id,) for habit_id in habit_ids))
+            for habit_id, checks in groupby(cls.tracker_rows(db, habit_ids, chunk_size), key=lambda x: x[0]):
+                if habit_id not in habits:
+                    continue
+                start_date, valid_till, periodicity = habits[habit_id]
+                rollup = []
+                cls.replay(Period(date.date.fromordinal(start_date), periodicity), valid_till,
+                           ((x[1], x[2]) for x in checks), rollup)
+                cur.executemany("""
+                INSERT INTO
+                rollup(habit_id, period_start, completed, missed)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(habit_id, period_start) DO UPDATE
+                SET completed = completed + excluded.completed, missed = missed + excluded.missed
+                """, ((habit_id, period_start, completed, missed) for period_start, completed, missed in rollup))
+                count += len(rollup)
+        return count
+
+    @classmethod
+    def backfill_snapshots(cls, db, habit_ids=None, chunk_size=10000):
+        """
+        Recomputes the snapshots of the habits' states from the Tracker table, and replaces their rows in the
+        StreakSnapshot table in one transaction. A snapshot is taken after the first check-off of every block of
+        DB.SNAPSHOT_PERIODS periods, just like DbHabit takes it while the habit is checked-off.
+
+        :param db: The database, to which you are connected.
+        :type db: class
+        :param habit_ids: The ids of the habits to backfill, if not passed, all habits are backfilled (default None).
+        :type habit_ids: list
+        :param chunk_size: The count of rows fetched at once (default 10000).
+        :type chunk_size: int
+        :return: Returns the count of inserted snapshots.
+        :rtype: int
+        """
+        cur = db.cursor()
+        query = "SELECT habit_id, start_date, valid_till, periodicity FROM habit"
+        if habit_ids is not None:
+            habit_ids = list(habit_ids)
+            query += f" WHERE habit_id IN ({', '.join('?' * len(habit_ids))})"
+        cur.execute(query, habit_ids or ())
+        habits = {habit_id: (start_date, valid_till, periodicity)
+                  for habit_id, start_date, valid_till, periodicity in cur.fetchall()}
+        count = 0
+        with DB.transaction(db):
+            if habit_ids is None:
+                cur.execute("DELETE FROM streak_snapshot")
+            else:
+                cur.executemany("DELETE FROM streak_snapshot WHERE habit_id = ?",
+                                ((habit_id,) for habit_id in habit_ids))
+            for habit_id, checks in groupby(cls.tracker_rows(db, habit_ids, chunk_size), key=lambda x: x[0]):
+                if habit_id not in habits:
+                    continue
+                start_date, valid_till, periodicity = habits[habit_id]
+                snapshots = []
+                last_index = -1
+                for ordinal, state in cls.states(Period(date.date.fromordinal(start_date), periodicity), valid_till,
+                                                 ((x[1], x[2]) for x in checks)):
+                    if DB.snapshot_due(last_index, state[0]):
+                        snapshots.append((ordinal, *state))
+                    last_index = state[0]
+                DB.add_snapshots_by_id(db, habit_id, snapshots)
+                count += len(snapshots)
+        return count
+
+    @staticmethod
+    def replay(period, valid_till, checks, rollup=None):
+        """
+        Returns the streak data of a habit after the check-offs, following the same rules as
+        DbHabit.add_habit_check(), but working only with the ordinals of the dates.
+
+        :param period: The periods of the habit.
+        :type period: Period
+        :param valid_till: The ordinal of the expiration date of the habit.
+        :type valid_till: int
+        :param checks: The (ordinal of the check-off date, check-off) pairs ordered by date.
+        :type checks: iterable
+        :param rollup: The list, to which the (ordinal of the first day of the period, completed count, missed count)
+        rows are appended, if passed (default None).
+        :type rollup: list
+        :return: Returns the current streak, the longest streak, the break count and the ordinal of the last break
+        date (0 if the habit wasn't broken).
+        :rtype: tuple
+        """
+        state = Rebuild.START
+        for _, state in Rebuild.states(period, valid_till, checks, rollup=rollup):
+            pass
+        return state[1:5]
+
+    @staticmethod
+    def states(period, valid_till, checks, state=None, rollup=None):
+        """
+        Yields the state of a habit after every check-off, following the same rules as DbHabit.add_habit_check(). The
+        replay can start from a stored state, e.g. a snapshot, instead of the habit's start. The state is the tuple
+        of the index of the last checked period, the current streak, the longest streak, the break count, the ordinal
+        of the last break date (0 if the habit wasn't broken) and the status.
+
+        :param period: The periods of the habit.
+        :type period: Period
+        :param valid_till: The ordinal of the expiration date of the habit.
+        :type valid_till: int
+        :param checks: The (ordinal of the check-off date, check-off) pairs ordered by date.
+        :type checks: iterable
+        :param state: The state, from which the replay starts, if not passed, the state of a new habit (default None).
+        :type state: tuple
+        :param rollup: The list, to which the (ordinal of the first day of the period, completed count, missed count)
+        rows are appended, if passed (default None).
+        :type rollup: list
+        :return: Yields the (ordinal of the check-off date, state) pairs, until the habit is broken or completed.
+        :rtype: generator
+        """
+        last_index, current_streak, longest_streak, break_count, last_break, status = state or Rebuild.START
+        if status != "Still in progress":
+            return
+        for ordinal, check in checks:
+            index = period.ordinal_index(ordinal)
+            missed = index - last_index - 1
+            if missed < 0:
+                # The check-off can't be stored by DbHabit, it's skipped.
+                continue
+            if rollup is not None:
+                rollup.extend((period.start + (last_index + i) * period.length, 0, 1)
+                              for i in range(1, min(missed, Period.MAX_MISSED) + 1))
+            if missed >= Period.MAX_MISSED:
+                last_index += Period.MAX_MISSED + 1
+                last_break = period.start + last_index * period.length
+                break_count, current_streak = 3, 0
+                status = "Broken"
+            else:
+                last_index = index
+                if missed:
+                    last_break = period.start + index * period.length
+                    break_count += missed
+                    current_streak = 0
+                    if break_count >= 3:
+                        status = "Broken"
+            if status == "Still in progress":
+                if rollup is not None:
+                    rollup.append((period.start + index * period.length, int(check == 1), int(check == 0)))
+                if check:
+                    current_streak += 1
+                    longest_streak = max(longest_streak, current_streak)
+                else:
+                    break_count += 1
+                    last_break = ordinal
+                    current_streak = 0
+                    if break_count >= 3:
+                        status = "Broken"
+                if status == "Still in progress" and ordinal >= valid_till:
+                    status = "Completed"
+            yield ordinal, (last_index, current_streak, longest_streak, break_count, last_break, status)
+            if status != "Still in progress":
+                break
+
+    @classmethod
+    def recover(cls, db, habit_ids=None):
+        """
+        Rebuilds the rows of the Habit and the Streak tables from the event log in one transaction, e.g. after a bad
+        write, see recovered(). The rows of the deleted habits are deleted.
+
+        :param db: The database, to which you are connected.
+        :type db: class
+        :param habit_ids: The ids of the habits to recover, if not passed, all logged habits are recovered (default
+        None).
+        :type habit_ids: list
+        :return: Returns the count of recovered habits.
+        :rtype: int
+        """
+        cur = db.cursor()
+        count = 0
+        with DB.transaction(db):
+            for habit_id, habit, streak in cls.recovered(db, habit_ids):
+                count += 1
+                if habit is None:
+                    cur.execute("DELETE FROM streak WHERE habit_id = ?", (habit_id,))
+                    cur.execute("DELETE FROM habit WHERE habit_id = ?", (habit_id,))
+                    continue
+                cur.execute("""
+                INSERT INTO
+                habit(habit_id, name, description, start_date, valid_till, periodicity, status, streak, last_check,
+                end_date, last_check_day, user_id)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(habit_id) DO UPDATE
+                SET name = excluded.name, description = excluded.description, start_date = excluded.start_date,
+                valid_till = excluded.valid_till, periodicity = excluded.periodicity, status = excluded.status,
+                streak = excluded.streak, last_check = excluded.last_check, end_date = excluded.end_date,
+                last_check_day = excluded.last_check_day, user_id = excluded.user_id
+                """, habit)
+                if streak is None:
+                    cur.execute("DELETE FROM streak WHERE habit_id = ?", (habit_id,))
+                else:
+                    cur.execute("""
+                    INSERT OR REPLACE INTO
+                    streak(habit_id, current_streak, longest_streak, break_count, last_break, user_id)
+                    VALUES (?1, ?2, ?3, ?4, ?5, (SELECT user_id FROM habit WHERE habit_id = ?1))
+                    """, streak)
+        return count
+
+    @classmethod
+    def verify(cls, db, habit_ids=None):
+        """
+        Returns the ids of the habits, whose rows in the Habit and the Streak tables differ from the ones recovered
+        from the event log, i.e. the habits, which recover() would change.
+
+        :param db: The database, to which you are connected.
+        :type db: class
+        :param habit_ids: The ids of the habits to verify, if not passed, all logged habits are verified (default
+        None).
+        :type habit_ids: list
+        :return: Returns the ids of the differing habits.
+        :rtype: list
+        """
+        cur = db.cursor()
+        differing = []
+        for habit_id, habit, streak in cls.recovered(db, habit_ids):
+            cur.execute("""SELECT habit_id, name, description, start_date, valid_till, periodicity, status, streak,
+            last_check, end_date, last_check_day, user_id FROM habit WHERE habit_id = ?""", (habit_id,))
+            stored_habit = cur.fetchone()
+            cur.execute("""SELECT habit_id, current_streak, longest_streak, break_count, last_break FROM streak
+            WHERE habit_id = ?""", (habit_id,))
+            if (stored_habit, cur.fetchone()) != (habit, streak):
+                differing.append(habit_id)
+        return differing
+
+    @classmethod
+    def recovered(cls, db, habit_ids=None):
+        """
+        Yields the rows of the Habit and the Streak tables recovered from the event log. A habit is defined by its
+        logged creation, and its state is replayed from its latest snapshot (see DB.SNAPSHOT_PERIODS) with the
+        check-offs logged after it, so a habit costs three index lookups and the replay of at most DB.SNAPSHOT_PERIODS
+        check-offs, however long its history is. The latest logged break or completion ends the habit, also if its
+        check-offs don't, e.g. if the check-off, which broke it, wasn't stored. The data, which aren't logged, are
+        derived like DbHabit stores them, e.g. the end date of a habit is the date of its last check-off.
+
+        :param db: The database, to which you are connected.
+        :type db: class
+        :param habit_ids: The ids of the habits, if not passed, all logged habits are yielded (default None).
+        :type habit_ids: list
+        :return: Yields the (habit id, habit row, streak row) tuples, the rows are None if the habit was deleted, and
+        the streak row is None if the habit hasn't been checked-off.
+        :rtype: generator
+        """
+        cur = db.cursor()
+        query = """SELECT habit_id, event_id, day, data, EXISTS (SELECT 1 FROM habit_event AS deleted
+        WHERE deleted.habit_id = event.habit_id AND deleted.kind = 'delete' AND deleted.event_id > event.event_id)
+        FROM habit_event AS event WHERE kind = 'create'"""
+        if habit_ids is not None:
+            habit_ids = list(habit_ids)
+            query += f" AND habit_id IN ({', '.join('?' * len(habit_ids))})"
+        cur.execute(query + " ORDER BY habit_id, event_id", habit_ids or ())
+        # The latest creation of a habit is its definition.
+        created = {habit_id: (event_id, start_date, data, deleted)
+                   for habit_id, event_id, start_date, data, deleted in cur.fetchall()}
+        for habit_id, (event_id, start_date, data, deleted) in created.items():
+            if deleted:
+                yield habit_id, None, None
+                continue
+            definition = json.loads(data)
+            period = Period(date.date.fromordinal(start_date), definition["periodicity"])
+            cur.execute("""SELECT day, last_index, current_streak, longest_streak, break_count, last_break, status
+            FROM streak_snapshot
+            WHERE habit_id = ?
+            ORDER BY day DESC LIMIT 1""", (habit_id,))
+            snapshot = cur.fetchone()
+            last_day, state = (snapshot[0], snapshot[1:]) if snapshot else (None, cls.START)
+            cur.execute("""SELECT day, checked_off FROM habit_event
+            WHERE habit_id = ? AND kind = 'check' AND day > ?
+            ORDER BY day, event_id""", (habit_id, last_day or 0))
+            for last_day, state in cls.states(period, definition["valid_till"], cur.fetchall(), state):
+                pass
+            last_index, current_streak, longest_streak, break_count, last_break, status = state
+            cur.execute("""SELECT kind, day FROM habit_event
+            WHERE habit_id = ? AND kind IN ('break', 'complete') AND event_id > ?
+            ORDER BY event_id DESC LIMIT 1""", (habit_id, event_id))
+            ending = cur.fetchone()
+            if ending and status == "Still in progress":
+                kind, last_day = ending
+                if kind == "break":
+                    # The habit is broken like by 3 missed periods, at the start of the period of the logged break.
+                    last_index, last_break = period.ordinal_index(last_day), last_day
+                    break_count, current_streak, status = 3, 0, "Broken"
+                else:
+                    status = "Completed"
+            checked = last_index >= 0
+            habit = (habit_id, definition["name"], definition["description"], start_date, definition["valid_till"],
+                     definition["periodicity"], status, 1 if checked else None,
+                     period.start + last_index * period.length if checked else None, last_day, last_day,
+                     definition["user_id"])
+            streak = (habit_id, current_streak, longest_streak, break_count, last_break or None) if checked else None
+            yield habit_id, habit, streak
+
+    @classmethod
+    def tracker_rows(cls, db, habit_ids=None, chunk_size=10000):
+        """
+        Yields the check-offs ordered by habit and date, fetching them in chunks.
+
+        :param db: The database, to which you are connected.
+        :type db: class
+        :param habit_ids: The ids of the habits, if not passed, the check-offs of all habits are yielded (default None).
+        :type habit_ids: list
+        :param chunk_size: The count of rows fetched at once (default 10000).
+        :type chunk_size: int
+        :return: Yields the (habit id, ordinal of the check-off date, check-off) rows.
+        :rtype: generator
+        """
+        cur = db.cursor()
+        query = "SELECT habit_id, date, checked_off FROM tracker"
+        if habit_ids is not None:
+            query += f" WHERE habit_id IN ({', '.join('?' * len(habit_ids))})"
+        cur.execute(query + " ORDER BY habit_id, date, tracker_id", habit_ids or ())
+        while True:
+            rows = cur.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield from rows
+
+
+# Executed when invoked directly, e.g. "python rebuild.py main.db".
+if __name__ == "__main__":
+    my_db = DB.get_db(*sys.argv[1:2])
+    print(f"Rebuilt the streaks of {Rebuild.rebuild_streaks(my_db)} habits.")
+    print(f"Backfilled {Rebuild.backfill_rollup(my_db)} rollup rows.")
+    print(f"Backfilled {Rebuild.backfill_snapshots(my_db)} snapshots.")
+    DB.db_close(my_db)
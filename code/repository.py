@@ -0,0 +1,201 @@
+from collections import OrderedDict
+
+from db import DB
+from habit_track import DbHabit
+
+
+class HabitRepository:
+    """The HabitRepository class keeps the recently used habits in memory, so they are not read from the database again.
+
+    The habits are cached by their id, the least recently used habit is dropped when the cache is full. A habit is
+    dropped from the cache as well, when its data is updated or deleted by anything else than the repository itself.
+    The names are looked up among the habits of the connection's current user, see DB.set_user().
+
+    Attributes:
+        db (class): The database, to which you are connected.
+        size (int): The maximal count of cached habits (default 128).
+        hits (int): The count of habits found in the cache.
+        misses (int): The count of habits read from the database.
+        invalidations (int): The count of habits dropped from the cache, because they were changed.
+
+    Methods:
+        get(habit_id): Returns the habit with the id.
+        get_by_name(name, status="Still in progress"): Returns the habit with the name and the status.
+        check_off(habit, check: bool, check_date: str): Checks-off the cached habit.
+        check_off_many(habit, checks: list): Checks-off the cached habit many times at once.
+        invalidate(db, name): Drops the habit with the name from the cache.
+        stats(): Returns the hits, the misses, the invalidations and the count of cached habits.
+        close(): Stops listening to the changes in the database.
+    """
+    def __init__(self, db, size=128):
+        """
+        Initializes a HabitRepository instance.
+
+        :param db: The database, to which you are connected.
+        :type db: class
+        :param size: The maximal count of cached habits (default 128).
+        :type size: int
+        """
+        self.db = db
+        self.size = size
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        # The cached habits, from the least to the most recently used one.
+        self._habits = OrderedDict()
+        # The ids of the cached habits by their users and names.
+        self._ids = {}
+        # The (user, name) keys of the cached habits by their ids.
+        self._keys = {}
+        # The name of the habit, which is being changed by the repository itself.
+        self._writing = None
+        DB.add_listener(self.invalidate)
+
+    def get(self, habit_id):
+        """
+        Returns the habit with the id, reading it from the database only if it isn't cached.
+
+        :param habit_id: The id of a habit.
+        :type habit_id: int
+        :return: Returns the habit, or None if there is no habit with such an id.
+        :rtype: DbHabit
+        """
+        habit = self._habits.get(habit_id)
+        if habit is not None:
+            self.hits += 1
+            self._habits.move_to_end(habit_id)
+            return habit
+        self.misses += 1
+        habit = DbHabit.load(self.db, habit_id)
+        if habit is not None:
+            # The habit is keyed by its owner, who isn't necessarily the connection's current user.
+            key = (self.db.execute("SELECT user_id FROM habit WHERE habit_id = ?", (habit_id,)).fetchone()[0],
+                   habit.name)
+            self._habits[habit_id] = habit
+            self._ids[key] = habit_id
+            self._keys[habit_id] = key
+            if len(self._habits) > self.size:
+                dropped_id, _ = self._habits.popitem(last=False)
+                self._forget(dropped_id)
+        return habit
+
+    def get_by_name(self, name, status="Still in progress"):
+        """
+        Returns the current user's habit with the name and the status, reading it from the database only if it isn't
+        cached.
+
+        :param name: The name of a habit.
+        :type name: str
+        :param status: The status of a habit.
+        :type status: str
+        :return: Returns the habit, or None if there is no habit with such a name and status.
+        :rtype: DbHabit
+        """
+        habit_id = self._ids.get((DB.user_of(self.db), name))
+        if habit_id is not None and self._habits[habit_id].status == status:
+            return self.get(habit_id)
+        habit_id = DB.name_to_id(self.db, name, status)
+        if habit_id == "Error":
+            return None
+        return self.get(habit_id)
+
+    def check_off(self, habit, check: bool, check_date: str):
+        """
+        Checks-off the cached habit, which stays cached, since its state is already up to date.
+
+        :param habit: The habit returned by the repository.
+        :type habit: DbHabit
+        :param check: The check-off (i.e. True or False).
+        :type check: bool
+        :param check_date: The check-off date.
+        :type check_date: str
+        :return: Returns whatever DbHabit.add_habit_check() returns.
+        """
+        return self._write(habit, habit.add_habit_check, check, check_date)
+
+    def check_off_many(self, habit, checks: list):
+        """
+        Checks-off the cached habit many times at once, it stays cached just like with check_off().
+
+        :param habit: The habit returned by the repository.
+        :type habit: DbHabit
+        :param checks: The check-offs as (check, check_date) pairs.
+        :type checks: list
+        :return: Returns whatever DbHabit.add_habit_checks() returns.
+        """
+        return self._write(habit, habit.add_habit_checks, checks)
+
+    def _write(self, habit, method, *args):
+        """
+        Calls the method of the cached habit, which changes the habit's data, and drops the habit from the cache if the
+        method fails.
+
+        :param habit: The habit returned by the repository.
+        :type habit: DbHabit
+        :param method: The method of the habit, which is called with the database and the arguments.
+        :type method: function
+        :param args: The arguments of the method.
+        :type args: tuple
+        :return: Returns whatever the method returns.
+        """
+        self._writing = habit.name
+        try:
+            return method(self.db, *args)
+        except BaseException:
+            # The transaction was rolled back, so the habit in memory doesn't match the database anymore.
+            self._writing = None
+            self.invalidate(self.db, habit.name)
+            raise
+        finally:
+            self._writing = None
+
+    def invalidate(self, db, name):
+        """
+        Drops the connection's user's habit with the name from the cache, unless it is being changed by the repository
+        itself.
+
+        :param db: The database, to which you are connected.
+        :type db: class
+        :param name: The name of a habit.
+        :type name: str
+        :return: None
+        """
+        habit_id = self._ids.get((DB.user_of(db), name))
+        if db is not self.db or name == self._writing or habit_id is None:
+            return
+        del self._habits[habit_id]
+        self._forget(habit_id)
+        self.invalidations += 1
+
+    def _forget(self, habit_id):
+        """
+        Drops the key of the habit, which was dropped from the cache.
+
+        :param habit_id: The id of a habit.
+        :type habit_id: int
+        :return: None
+        """
+        key = self._keys.pop(habit_id)
+        if self._ids.get(key) == habit_id:
+            del self._ids[key]
+
+    def stats(self):
+        """
+        Returns the hits, the misses, the invalidations and the count of cached habits.
+
+        :return: Returns the statistics of the cache.
+        :rtype: dict
+        """
+        return {"hits": self.hits, "misses": self.misses, "invalidations": self.invalidations,
+                "size": len(self._habits)}
+
+    def close(self):
+        """
+        Stops listening to the changes in the database, the cached habits are dropped.
+
+        :return: None
+        """
+        DB.remove_listener(self.invalidate)
+        self._habits.clear()
+        self._ids.clear()
+        self._keys.clear()
@@ -0,0 +1,358 @@
+import argparse
+import contextlib
+import datetime as date
+import json
+import os
+import re
+import sqlite3
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from analyse import Analysis
+from db import DB
+from metrics import Metrics
+from repository import HabitRepository
+
+
+class HabitServer(HTTPServer):
+    """The HabitServer class serves the habit tracker as a local JSON API, keeping one warm connection open.
+
+    The connection, its prepared statements and the cached habits are reused by every request, so a request costs only
+    its own queries. The requests are handled one by one on the server's thread, which owns the connection.
+
+    Endpoints:
+        POST /habits: Creates a habit from {"name", "description", "start_date", "valid_till", "periodicity"}.
+        DELETE /habits/<name>: Deletes a habit.
+        POST /habits/<name>/checks: Checks-off a habit from {"check", "date"}, or from {"checks": [[check, date]]}.
+        GET /habits: Returns all habits, or only the tracked ones with "?status=tracked", or only the habits with
+        "?periodicity=Daily" or "?periodicity=Weekly".
+        GET /habits/<name>/actions: Returns all actions' history of a habit.
+        GET /streaks: Returns the longest run streak of all habits, or of one habit with "?name=<name>".
+        GET /leaderboard: Returns a page of the habits with the longest streaks, with "?by=current_streak", "?status=",
+        "?periodicity=", "?limit=" (default 20) and "?after=<streak>,<habit_id>" of the previous page's last habit.
+        GET /struggled-most: Returns the habits ranked by their miss rate, with "?start=", "?end=" and "?limit=".
+        POST /batch: Handles the list of {"method", "path", "body"} requests in one transaction.
+        GET /metrics: Returns the measurements of the statements and the operations, see Metrics.snapshot().
+
+    Attributes:
+        db (class): The database, to which the server is connected.
+        repository (HabitRepository): The recently checked-off habits.
+
+    Methods:
+        dispatch(method, path, body=None): Handles a request and returns its status and JSON response.
+        batch(query, body): Handles the list of requests in one transaction.
+        close(): Closes the server and the connection.
+    """
+    # The routes as (method, path pattern, name of the handling method).
+    ROUTES = [
+        ("POST", re.compile(r"/habits"), "_create"),
+        ("DELETE", re.compile(r"/habits/([^/]+)"), "_delete"),
+        ("POST", re.compile(r"/habits/([^/]+)/checks"), "_check_off"),
+        ("GET", re.compile(r"/habits"), "_habits"),
+        ("GET", re.compile(r"/habits/([^/]+)/actions"), "_actions"),
+        ("GET", re.compile(r"/streaks"), "_streaks"),
+        ("GET", re.compile(r"/leaderboard"), "_leaderboard"),
+        ("GET", re.compile(r"/struggled-most"), "_struggled_most"),
+        ("POST", re.compile(r"/batch"), "batch"),
+        ("GET", re.compile(r"/metrics"), "_metrics"),
+    ]
+
+    def __init__(self, address, name="main.db", profile="concurrent"):
+        """
+        Initializes a HabitServer instance.
+
+        :param address: The (host, port) pair, on which the server listens.
+        :type address: tuple
+        :param name: Name of a database (default "main.db").
+        :type name: str
+        :param profile: The connection profile, see DB.PROFILES (default "concurrent").
+        :type profile: str
+        """
+        super().__init__(address, HabitRequestHandler)
+        # The server handles the requests one at a time, but not necessarily on the thread, which created it.
+        self.db = DB.get_db(name, profile, check_same_thread=False)
+        self.repository = HabitRepository(self.db)
+        # The printed messages of DB and DbHabit are meant for the interactive user, not for the clients.
+        self._devnull = open(os.devnull, "w")
+        # The names of the habits checked-off by the running batch, which are dropped from the cache on its rollback.
+        self._touched = None
+
+    def dispatch(self, method, path, body=None):
+        """
+        Handles a request and returns its status and JSON response.
+
+        :param method: The HTTP method (i.e. "GET", "POST", "DELETE").
+        :type method: str
+        :param path: The path with the query string.
+        :type path: str
+        :param body: The decoded JSON body (default None).
+        :type body: dict
+        :return: Returns the HTTP status and the response.
+        :rtype: tuple
+        """
+        url = urlsplit(path)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        allowed = False
+        for route_method, pattern, handler in self.ROUTES:
+            match = pattern.fullmatch(url.path)
+            if not match:
+                continue
+            if route_method != method:
+                allowed = True
+                continue
+            try:
+                with contextlib.redirect_stdout(self._devnull):
+                    return getattr(self, handler)(*map(unquote, match.groups()), query=query, body=body or {})
+            except (KeyError, TypeError, ValueError) as error:
+                return 400, {"error": f"Bad request: {error!r}"}
+            except sqlite3.Error as error:
+                return 503, {"error": f"The database failed: {error}"}
+        if allowed:
+            return 405, {"error": f"{method} isn't allowed on {url.path}"}
+        return 404, {"error": f"There is no {url.path} endpoint"}
+
+    def batch(self, query, body):
+        """
+        Handles the list of {"method", "path", "body"} requests in one transaction, so they are committed at once.
+
+        :param query: The query string parameters.
+        :type query: dict
+        :param body: The requests, either as a list or as {"requests": list}.
+        :type body: list
+        :return: Returns the HTTP status and the list of {"status", "body"} responses.
+        :rtype: tuple
+        """
+        requests = body["requests"] if isinstance(body, dict) else body
+        if not isinstance(requests, list):
+            raise TypeError("The batch should be a list of requests")
+        # Every request is checked before the transaction is opened, so a malformed one doesn't roll back the others.
+        for number, request in enumerate(requests):
+            if not isinstance(request, dict) or not isinstance(request.get("path"), str) or \
+                    not isinstance(request.get("method", "GET"), str) or \
+                    not isinstance(request.get("body"), (dict, type(None))):
+                raise ValueError(f"The request {number} should be {{\"method\": str, \"path\": str, \"body\": dict}}")
+        responses = []
+        self._touched = set()
+        try:
+            with DB.transaction(self.db):
+                for request in requests:
+                    if request["path"].startswith("/batch"):
+                        status, response = 400, {"error": "A batch can't be nested"}
+                    else:
+                        status, response = self.dispatch(request.get("method", "GET").upper(), request["path"],
+                                                         request.get("body"))
+                    responses.append({"status": status, "body": response})
+        except BaseException:
+            # The check-offs were rolled back, so the cached habits don't match the database anymore.
+            for name in self._touched:
+                self.repository.invalidate(self.db, name)
+            raise
+        finally:
+            self._touched = None
+        return 200, responses
+
+    def _create(self, query, body):
+        """
+        Creates a habit, which starts on the present day if the start date isn't passed.
+
+        :return: Returns 201, or 409 if a habit with such a name already exists.
+        :rtype: tuple
+        """
+        start_date = body.get("start_date") or str(date.date.today())
+        if date.date.fromisoformat(body["valid_till"]) < date.date.fromisoformat(start_date):
+            raise ValueError("The expiration date can't be before the start date")
+        if body["periodicity"] not in ("Daily", "Weekly"):
+            raise ValueError(f"There is no {body['periodicity']} periodicity")
+        if DB.add_habit(self.db, body["name"], body.get("description", ""), start_date, body["valid_till"],
+                        body["periodicity"]):
+            return 409, {"error": f"The habit {body['name']} already exists"}
+        return 201, {"name": body["name"]}
+
+    def _delete(self, name, query, body):
+        """
+        Deletes a habit.
+
+        :return: Returns 200, or 404 if there is no such a habit.
+        :rtype: tuple
+        """
+        changes = self.db.total_changes
+        DB.delete_habit(self.db, name)
+        if self.db.total_changes == changes:
+            return 404, {"error": f"There is no habit {name}"}
+        return 200, {"name": name}
+
+    def _check_off(self, name, query, body):
+        """
+        Checks-off a habit in progress once, or many times at once if "checks" is passed.
+
+        :return: Returns 200 and the streak data of the habit, 404 if there is no such a habit in progress, or 409 if
+        the check-off date is earlier than the last check-off or its period is already checked-off.
+        :rtype: tuple
+        """
+        habit = self.repository.get_by_name(name)
+        if habit is None:
+            return 404, {"error": f"There is no habit {name} in progress"}
+        if "checks" in body:
+            checks = [(bool(check), str(date.date.fromisoformat(check_date))) for check, check_date in body["checks"]]
+            if not checks:
+                raise ValueError("There are no check-offs")
+            if self._touched is not None:
+                self._touched.add(habit.name)
+            if not self.repository.check_off_many(habit, checks):
+                return 409, {"error": f"None of the check-offs of {name} were accepted"}
+        else:
+            check_date = str(date.date.fromisoformat(body["date"])) if body.get("date") else str(date.date.today())
+            check = bool(body["check"])
+            if self._touched is not None:
+                self._touched.add(habit.name)
+            if self.repository.check_off(habit, check, check_date) == ConnectionError:
+                return 409, {"error": f"The check-off of {name} on {check_date} is earlier than the last check-off, "
+                                      f"or its period is already checked-off"}
+        return 200, {"name": habit.name, "status": habit.status, "current_streak": habit.current_streak,
+                     "longest_streak": habit.longest_streak, "break_count": habit.break_count}
+
+    def _habits(self, query, body):
+        """
+        Returns all habits, the tracked ones, or the ones with the periodicity.
+
+        :return: Returns 200 and the habits.
+        :rtype: tuple
+        """
+        if "periodicity" in query:
+            return 200, self._rows(Analysis.iter_same_periodicity_habits(self.db, query["periodicity"]))
+        if query.get("status") == "tracked":
+            return 200, self._rows(Analysis.iter_currently_tracked_habits(self.db))
+        return 200, self._rows(Analysis.iter_all_habits(self.db))
+
+    def _actions(self, name, query, body):
+        """
+        Returns all actions' history of a habit.
+
+        :return: Returns 200 and the check-offs.
+        :rtype: tuple
+        """
+        return 200, self._rows(Analysis.iter_all_actions(self.db, name))
+
+    def _streaks(self, query, body):
+        """
+        Returns the longest run streak of all habits, or of the habit with the name.
+
+        :return: Returns 200 and the longest streaks.
+        :rtype: tuple
+        """
+        rows = self._rows(Analysis.iter_habits_longest_streak(self.db))
+        if "name" in query:
+            rows = [row for row in rows if row["name"] == query["name"]]
+        return 200, rows
+
+    def _leaderboard(self, query, body):
+        """
+        Returns a page of the habits with the longest streaks.
+
+        :return: Returns 200 and the habits.
+        :rtype: tuple
+        """
+        after = tuple(int(value) for value in query["after"].split(",")) if "after" in query else None
+        return 200, self._rows(Analysis.iter_leaderboard(self.db, query.get("by", "longest_streak"),
+                                                         query.get("status"), query.get("periodicity"), after,
+                                                         int(query.get("limit", 20))))
+
+    def _struggled_most(self, query, body):
+        """
+        Returns the habits ranked by their miss rate, by default in the last month.
+
+        :return: Returns 200 and the habits.
+        :rtype: tuple
+        """
+        end = date.date.fromisoformat(query["end"]) if "end" in query else date.date.today()
+        start = date.date.fromisoformat(query["start"]) if "start" in query else end - date.timedelta(days=30)
+        limit = int(query["limit"]) if "limit" in query else None
+        return 200, self._rows(Analysis.iter_struggled_most(self.db, start, end, limit))
+
+    def _metrics(self, query, body):
+        """
+        Returns the measurements of the statements and the operations, which are empty unless the metrics are enabled.
+
+        :return: Returns 200 and the measurements.
+        :rtype: tuple
+        """
+        return 200, Metrics.snapshot()
+
+    @staticmethod
+    def _rows(rows):
+        """
+        Converts the named tuples into dictionaries.
+
+        :param rows: The named tuples.
+        :type rows: iterable
+        :return: Returns the dictionaries.
+        :rtype: list
+        """
+        return [row._asdict() for row in rows]
+
+    def close(self):
+        """
+        Closes the server and the connection.
+
+        :return: None
+        """
+        self.server_close()
+        self.repository.close()
+        DB.db_close(self.db)
+        self._devnull.close()
+
+
+class HabitRequestHandler(BaseHTTPRequestHandler):
+    """The HabitRequestHandler class decodes the HTTP requests and encodes the responses of the HabitServer."""
+    # The connections are kept alive, so a client doesn't reconnect for every request.
+    protocol_version = "HTTP/1.1"
+
+    def _handle(self):
+        """
+        Passes the request to the server and writes its JSON response.
+
+        :return: None
+        """
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            body = json.loads(self.rfile.read(length)) if length else None
+        except ValueError:
+            status, response = 400, {"error": "The body isn't valid JSON"}
+        else:
+            status, response = self.server.dispatch(self.command, self.path, body)
+        data = json.dumps(response).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = _handle
+
+    def log_message(self, format, *args):
+        """
+        Doesn't log the requests, since logging every request would cost more than handling it.
+
+        :return: None
+        """
+
+
+# Executed when invoked directly, e.g. "python server.py --port 8765 --db main.db".
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serves the habit tracker as a local JSON API.")
+    parser.add_argument("--db", default="main.db", help="the database")
+    parser.add_argument("--host", default="127.0.0.1", help="the address, on which the server listens")
+    parser.add_argument("--port", type=int, default=8765, help="the port, on which the server listens")
+    parser.add_argument("--profile", default="concurrent", choices=sorted(DB.PROFILES), help="the connection profile")
+    parser.add_argument("--metrics", action="store_true", help="measure the statements and the operations")
+    arguments = parser.parse_args()
+    if arguments.metrics:
+        Metrics.enable()
+    server = HabitServer((arguments.host, arguments.port), arguments.db, arguments.profile)
+    print(f"Serving {arguments.db} on http://{arguments.host}:{server.server_port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
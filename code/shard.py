@@ -0,0 +1,124 @@
+import contextlib
+import zlib
+
+from db import DB
+
+
+class ShardRouter:
+    """The ShardRouter class spreads the users over several database files, so the users of different files never
+    wait for each other's locks, and the data isn't limited by the size of one file.
+
+    A user always belongs to the same shard, which is chosen by a stable hash of the user's name. The connections
+    returned by the router are bound to the user (see DB.set_user()), so the DB, DbHabit and Analysis classes called
+    with them read and write only the user's habits in the user's shard.
+
+    Attributes:
+        pattern (str): The name of the shard files, where "{}" is replaced by the number of the shard.
+        shards (int): The count of shards.
+        profile (str): The connection profile, see DB.PROFILES.
+
+    Methods:
+        shard_of(user): Returns the number of the user's shard.
+        path(user): Returns the file of the user's shard.
+        paths(): Returns the files of all shards.
+        get_db(user, **pragmas): Creates a connection with the user's shard, bound to the user.
+        connect(user, **pragmas): Creates a connection with the user's shard and closes it at the end of the block.
+        each_shard(**pragmas): Yields a connection with every shard, e.g. for the maintenance of all users.
+    """
+    def __init__(self, pattern="main_{}.db", shards=4, profile="concurrent"):
+        """
+        Initializes a ShardRouter instance.
+
+        :param pattern: The name of the shard files, where "{}" is replaced by the number of the shard
+        (default "main_{}.db").
+        :type pattern: str
+        :param shards: The count of shards, which can't be changed without moving the users (default 4).
+        :type shards: int
+        :param profile: The connection profile, see DB.PROFILES (default "concurrent").
+        :type profile: str
+        """
+        if "{}" not in pattern:
+            raise ValueError("The pattern of the shard files should contain \"{}\"!")
+        self.pattern = pattern
+        self.shards = shards
+        self.profile = profile
+
+    def shard_of(self, user):
+        """
+        Returns the number of the user's shard. The built-in hash() isn't used, since it changes between the runs.
+
+        :param user: The user.
+        :type user: str
+        :return: Returns the number of the shard.
+        :rtype: int
+        """
+        return zlib.crc32(str(user).encode()) % self.shards
+
+    def path(self, user):
+        """
+        Returns the file of the user's shard.
+
+        :param user: The user.
+        :type user: str
+        :return: Returns the name of the file.
+        :rtype: str
+        """
+        return self.pattern.format(self.shard_of(user))
+
+    def paths(self):
+        """
+        Returns the files of all shards.
+
+        :return: Returns the names of the files.
+        :rtype: list
+        """
+        return [self.pattern.format(shard) for shard in range(self.shards)]
+
+    def get_db(self, user, **pragmas):
+        """
+        Creates a connection with the user's shard, bound to the user.
+
+        :param user: The user.
+        :type user: str
+        :param pragmas: The pragmas overriding the profile.
+        :type pragmas: dict
+        :return: Returns the database.
+        :rtype: class
+        """
+        return DB.get_db(self.path(user), self.profile, user=user, **pragmas)
+
+    @contextlib.contextmanager
+    def connect(self, user, **pragmas):
+        """
+        Creates a connection with the user's shard, bound to the user, and closes it at the end of the block.
+
+        :param user: The user.
+        :type user: str
+        :param pragmas: The pragmas overriding the profile.
+        :type pragmas: dict
+        :return: Returns the database.
+        :rtype: class
+        """
+        db = self.get_db(user, **pragmas)
+        try:
+            yield db
+        finally:
+            DB.db_close(db)
+
+    def each_shard(self, **pragmas):
+        """
+        Yields a connection with every shard, which is closed before the next one is opened. The connections aren't
+        bound to any user, so they should be used only by the methods working with the habit ids, e.g. the methods of
+        the Rebuild class.
+
+        :param pragmas: The pragmas overriding the profile.
+        :type pragmas: dict
+        :return: Yields the databases.
+        :rtype: generator
+        """
+        for path in self.paths():
+            db = DB.get_db(path, self.profile, **pragmas)
+            try:
+                yield db
+            finally:
+                DB.db_close(db)
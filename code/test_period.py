@@ -0,0 +1,182 @@
+import datetime as date
+import random
+
+from habit_track import DbHabit
+from period import Period
+
+
+class LegacyHabit(DbHabit):
+    """The LegacyHabit class keeps the previous implementation of missed_dates(), as the reference for the tests.
+
+    Methods:
+        missed_dates(db, check_date, check_date_dt, start_date_dt): The if-ladder, which checked the missed check-off
+        dates before the Period class was introduced.
+    """
+    def missed_dates(self, db, check_date, check_date_dt, start_date_dt):
+        """
+        The if-ladder, which checked the missed check-off dates before the Period class was introduced.
+        """
+        if self.periodicity == "Daily":
+            self.weeks = 0
+            self.days = 1
+        elif self.periodicity == "Weekly":
+            self.weeks = 1
+            self.days = 0
+        if not self.last_check:
+            if check_date_dt >= start_date_dt + date.timedelta(weeks=self.weeks * 3, days=self.days * 3):
+                self.last_break = str(start_date_dt + date.timedelta(weeks=self.weeks * 3, days=self.days * 3))
+                self.status = "Broken"
+                self.break_count = 3
+                self.current_streak = 0
+                self.end_date = str(start_date_dt + date.timedelta(weeks=self.weeks * 3, days=self.days * 3))
+                self.last_check_day = check_date
+                self.last_check = str(start_date_dt + date.timedelta(weeks=self.weeks * 3, days=self.days * 3))
+            elif check_date_dt >= start_date_dt + date.timedelta(weeks=self.weeks * 2, days=self.days * 2):
+                self.last_break = str(start_date_dt + date.timedelta(weeks=self.weeks * 2, days=self.days * 2))
+                self.break_count = 2
+                self.current_streak = 0
+                self.last_check = str(start_date_dt + date.timedelta(weeks=self.weeks * 2, days=self.days * 2))
+                if self.weeks == 1:
+                    # For habits with "Weekly" periodicity type, the program inserts the last checked week.
+                    self.last_check_week = (f"{start_date_dt + date.timedelta(weeks=self.weeks * 2)} : "
+                                            f"{start_date_dt + date.timedelta(days=20)}")
+                    self.last_check_day = check_date
+                if self.days == 1:
+                    # For habits with "Daily" periodicity type, the program inserts the last checked day's date.
+                    self.last_check_day = check_date
+            elif check_date_dt >= start_date_dt + date.timedelta(weeks=self.weeks, days=self.days):
+                self.last_break = str(start_date_dt + date.timedelta(weeks=self.weeks, days=self.days))
+                self.break_count = 1
+                self.current_streak = 0
+                self.last_check = str(start_date_dt + date.timedelta(weeks=self.weeks, days=self.days))
+                if self.weeks == 1:
+                    # For habits with "Weekly" periodicity type, the program inserts the last checked week.
+                    self.last_check_week = (f"{start_date_dt + date.timedelta(weeks=self.weeks)} : "
+                                            f"{start_date_dt + date.timedelta(days=13)}")
+                    self.last_check_day = check_date
+                if self.days == 1:
+                    # For habits with "Daily" periodicity type, the program inserts the last checked day's date.
+                    self.last_check_day = check_date
+            elif check_date_dt >= start_date_dt:
+                self.last_check = self.start_date
+                if self.weeks == 1:
+                    # For habits with "Weekly" periodicity type, the program inserts the last checked week.
+                    self.last_check_week = f"{start_date_dt} : {start_date_dt + date.timedelta(days=6)}"
+                    self.last_check_day = check_date
+                if self.days == 1:
+                    # For habits with "Daily" periodicity type, the program inserts the last checked day's date.
+                    self.last_check_day = check_date
+            else:
+                print("\nCheck-off date can't be earlier than the start date!\n")
+                return ConnectionError
+        else:
+            last_check_dt = date.date.fromisoformat(self.last_check)
+            if check_date_dt >= last_check_dt + date.timedelta(weeks=self.weeks * 4, days=self.days * 4):
+                self.last_break = str(last_check_dt + date.timedelta(weeks=self.weeks * 4, days=self.days * 4))
+                self.status = "Broken"
+                self.break_count = 3
+                self.current_streak = 0
+                self.end_date = str(last_check_dt + date.timedelta(weeks=self.weeks * 4, days=self.days * 4))
+                self.last_check_day = check_date
+                self.last_check = str(last_check_dt + date.timedelta(weeks=self.weeks * 4, days=self.days * 4))
+            elif check_date_dt >= last_check_dt + date.timedelta(weeks=self.weeks * 3, days=self.days * 3):
+                self.last_break = str(last_check_dt + date.timedelta(weeks=self.weeks * 3, days=self.days * 3))
+                self.break_count += 2
+                self.current_streak = 0
+                self.break_count_check()
+                self.last_check = str(last_check_dt + date.timedelta(weeks=self.weeks * 3, days=self.days * 3))
+                if self.weeks == 1:
+                    # For habits with "Weekly" periodicity type, the program inserts the last checked week.
+                    self.last_check_week = (f"{last_check_dt + date.timedelta(weeks=self.weeks * 3)} : "
+                                            f"{last_check_dt + date.timedelta(days=27)}")
+                    self.last_check_day = check_date
+                if self.days == 1:
+                    # For habits with "Daily" periodicity type, the program inserts the last checked day's date.
+                    self.last_check_day = check_date
+            elif check_date_dt >= last_check_dt + date.timedelta(weeks=self.weeks * 2, days=self.days * 2):
+                self.last_break = str(last_check_dt + date.timedelta(weeks=self.weeks * 2, days=self.days * 2))
+                self.break_count += 1
+                self.current_streak = 0
+                self.break_count_check()
+                self.last_check = str(last_check_dt + date.timedelta(weeks=self.weeks * 2, days=self.days * 2))
+                if self.weeks == 1:
+                    # For habits with "Weekly" periodicity type, the program inserts the last checked week.
+                    self.last_check_week = (f"{last_check_dt + date.timedelta(weeks=self.weeks * 2)} : "
+                                            f"{last_check_dt + date.timedelta(days=20)}")
+                    self.last_check_day = check_date
+                if self.days == 1:
+                    # For habits with "Daily" periodicity type, the program inserts the last checked day's date.
+                    self.last_check_day = check_date
+            elif check_date_dt >= last_check_dt + date.timedelta(weeks=self.weeks, days=self.days):
+                self.last_check = str(last_check_dt + date.timedelta(weeks=self.weeks, days=self.days))
+                if self.weeks == 1:
+                    # For habits with "Weekly" periodicity type, the program inserts the last checked week.
+                    self.last_check_week = (f"{last_check_dt + date.timedelta(weeks=self.weeks)} : "
+                                            f"{last_check_dt + date.timedelta(days=13)}")
+                    self.last_check_day = check_date
+                if self.days == 1:
+                    # For habits with "Daily" periodicity type, the program inserts the last checked day's date.
+                    self.last_check_day = check_date
+            else:
+                print("\nWrong check-off date!\n"
+                      "Either the date you entered is earlier than your last check-off day,\n"
+                      "Or you have already checked-off the habit during the period!\n")
+                return ConnectionError
+
+
+class TestPeriod:
+    """The TestPeriod class is used to test the Period class.
+
+    The Methods:
+        test_period(): Checks the conversions between the dates and the indexes of the periods.
+        test_matches_legacy(): Checks on random check-off sequences that DbHabit.missed_dates() changes the habit
+        exactly like the previous if-ladder did.
+    """
+    # The attributes, which are changed by missed_dates().
+    STATE = ("status", "end_date", "current_streak", "longest_streak", "break_count", "last_break", "last_check",
+             "last_check_week", "last_check_day")
+
+    def test_period(self):
+        """
+        Checks the conversions between the dates and the indexes of the periods.
+
+        :return: None
+        """
+        weekly = Period(date.date(2025, 1, 20), "Weekly")
+        assert weekly.index(date.date(2025, 1, 20)) == 0
+        assert weekly.index(date.date(2025, 1, 26)) == 0
+        assert weekly.index(date.date(2025, 1, 27)) == 1
+        assert weekly.index(date.date(2025, 1, 19)) == -1
+        assert weekly.start_of(2) == date.date(2025, 2, 3)
+        assert weekly.week_bounds(2) == "2025-02-03 : 2025-02-09"
+        assert weekly.gap(0, date.date(2025, 2, 4)) == 2
+        daily = Period(date.date(2025, 1, 20), "Daily")
+        assert daily.index(date.date(2026, 1, 20)) == 365
+        assert daily.ordinal_index(date.date(2025, 1, 22).toordinal()) == 2
+
+    def test_matches_legacy(self):
+        """
+        Checks on random check-off sequences that DbHabit.missed_dates() changes the habit exactly like the previous
+        if-ladder did.
+
+        :return: None
+        """
+        rng = random.Random(2025)
+        for _ in range(500):
+            periodicity = rng.choice(["Daily", "Weekly"])
+            start_date_dt = date.date(2025, 1, 1) + date.timedelta(days=rng.randrange(365))
+            args = ("test_habit", "test_description", str(start_date_dt), "2030-01-01", periodicity)
+            habit, legacy = DbHabit(*args), LegacyHabit(*args)
+            check_date_dt = start_date_dt + date.timedelta(days=rng.randrange(-3, 10))
+            while habit.status == "Still in progress":
+                check_date = str(check_date_dt)
+                result = habit.missed_dates(None, check_date, check_date_dt, start_date_dt)
+                legacy_result = legacy.missed_dates(None, check_date, check_date_dt, start_date_dt)
+                assert (result == ConnectionError) == (legacy_result == ConnectionError)
+                assert [getattr(habit, x) for x in self.STATE] == [getattr(legacy, x) for x in self.STATE]
+                if result != ConnectionError and habit.status != "Broken":
+                    check = rng.random() < 0.9
+                    habit.register_check(check, check_date)
+                    legacy.register_check(check, check_date)
+                step = rng.choice([1, 1, 1, 2, 3]) * Period.LENGTHS[periodicity] + rng.randrange(-2, 20)
+                check_date_dt += date.timedelta(days=step)
@@ -1,7 +1,29 @@
 from habit_track import DbHabit
 from db import DB
-from analyse import Analysis
+from analyse import Analysis, HabitRow
+from rebuild import Rebuild
+from repository import HabitRepository
+from benchmark import Benchmark
+from async_store import AsyncHabitStore
+from server import HabitServer
+from shard import ShardRouter
+from habit_table import HabitTable
+import habit as headless
+from fixtures import Fixtures
+from predefined_habits import PredefinedHabits
+from metrics import Metrics
+from transfer import Transfer
+from fleet import FleetReport
+import datetime
+import asyncio
+import contextlib
+import io
+import json
 import os
+import pytest
+import shutil
+import sqlite3
+import time
 
 # remove_db is needed to remove the previously created test.db, in case the teardown_method wasn't called itself.
 remove_db = False
@@ -17,6 +39,38 @@ else:
             setup_method(): Creates the "test.db", inserts data about habit to the "test.db" directly without calling
             the DbHabit class.
             test_habit(): Creates a habit through DbHabit class, inserts and analysis data.
+            test_habit_checks(): Checks that inserting many check-offs at once gives the same result as inserting them
+            one by one.
+            test_transaction(): Checks that the changes made in a transaction are committed or rolled back together.
+            test_migrate(): Checks that the database is upgraded to the latest schema version.
+            test_concurrent_profile(): Checks that a reader isn't blocked by a writer with the "concurrent" profile.
+            test_checkpoints(): Checks that the WAL journal is checkpointed by the background thread.
+            test_rebuild_streaks(): Checks that the Streak table is recomputed from the Tracker table.
+            test_iter_analysis(): Checks that the rows are yielded as named tuples and rendered one by one.
+            test_struggled_most(): Checks that the rollup is kept up to date by the check-offs and by the backfill, and
+            that the habits are ranked by their miss rate.
+            test_repository(): Checks that the habits are cached and dropped from the cache when they are changed.
+            test_benchmark(): Checks that the benchmark measures every operation and finds the regressions.
+            test_async_store(): Checks that the habits are written and read through the asyncio facade concurrently.
+            test_server(): Checks that the server creates, checks-off, analyses and deletes the habits, also in batches.
+            test_users(): Checks that the habits of the users are kept apart, also after upgrading an older database.
+            test_shard_router(): Checks that every user is routed to the same shard and reads only their own habits.
+            test_habit_table(): Checks that the habits are kept in slots and that the columns match the habits.
+            test_ordinal_dates(): Checks that the days are stored as ordinals, also after upgrading an older database.
+            test_headless(): Checks that the headless interface creates, checks-off, reports and deletes the habits.
+            test_fixtures(): Checks that the fixtures are deterministic and match the habits checked-off by DbHabit.
+            test_metrics(): Checks that the statements and the operations are measured only while the metrics are
+            enabled.
+            test_transfer(): Checks that the exported habits are imported unchanged, validated and continued from the
+            last checkpoint.
+            test_habit_ids(): Checks that a stored habit keeps its id and is written without looking up its name.
+            test_fleet_report(): Checks that the reports of many files are merged from the processes' partial
+            aggregates.
+            test_streak_as_of(): Checks that the past streak data are replayed from the snapshots taken by the
+            check-offs and by the backfill.
+            test_event_log(): Checks that every change of the habits is logged and that the habits are recovered from
+            the log.
+            test_leaderboard(): Checks that the leaderboard's pages are found by their keys along the streaks' index.
             teardown_method(): Closes and removes the "test.db".
         """
         def setup_method(self):
@@ -77,6 +131,866 @@ else:
             print(count)
             assert len(count) == 1
 
+        def test_habit_checks(self):
+            """
+            Checks that inserting many check-offs at once gives the same result as inserting them one by one.
+
+            :return: None
+            """
+            checks = [(True, "2025-01-21"), (True, "2025-01-22"), (True, "2025-01-23"), (False, "2025-01-24"),
+                      (True, "2025-01-25"), (True, "2025-01-27"), (True, "2025-01-28"), (True, "2025-01-29")]
+            habit = DbHabit("test_habit_1", "test_description_1", "2025-01-21", "2025-01-29", "Daily")
+            habit.store(db=self.db)
+            for check, check_date in checks:
+                habit.add_habit_check(db=self.db, check=check, check_date=check_date)
+            bulk_habit = DbHabit("test_habit_2", "test_description_2", "2025-01-21", "2025-01-29", "Daily")
+            bulk_habit.store(db=self.db)
+            # The order of the check-offs doesn't matter, since they are sorted by date.
+            stored = bulk_habit.add_habit_checks(db=self.db, checks=list(reversed(checks)))
+            assert stored == len(checks)
+            assert bulk_habit.status == habit.status == "Completed"
+
+            data = DB.get_habit_data(self.db)
+            assert data[1][1:] == data[2][1:]  # Everything except the name is the same.
+            cur = self.db.cursor()
+            cur.execute("""SELECT habit.name, tracker.checked_off, tracker.date FROM tracker
+            JOIN habit on tracker.habit_id = habit.habit_id ORDER BY tracker.date""")
+            tracker = cur.fetchall()
+            assert ([row[1:] for row in tracker if row[0] == "test_habit_1"] ==
+                    [row[1:] for row in tracker if row[0] == "test_habit_2"])
+
+        def test_transaction(self):
+            """
+            Checks that the changes made in a transaction are committed or rolled back together.
+
+            :return: None
+            """
+            try:
+                with DB.transaction(self.db):
+                    DB.add_habit(self.db, "test_habit_1", "test_description_1", "2025-01-20", "2025-01-30", "Daily")
+                    DB.habit_check(self.db, "test_habit_1", True, "2025-01-20")
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+            assert len(DB.get_habit_data(self.db)) == 1  # The "test_habit_1" was rolled back.
+
+            with DB.transaction(self.db):
+                DB.add_habit(self.db, "test_habit_1", "test_description_1", "2025-01-20", "2025-01-30", "Daily")
+                try:
+                    with DB.transaction(self.db):  # The nested transaction is a savepoint.
+                        DB.add_habit(self.db, "test_habit_2", "test_description_2", "2025-01-20", "2025-01-30",
+                                     "Daily")
+                        raise RuntimeError
+                except RuntimeError:
+                    pass
+                assert self.db.in_transaction  # Nothing is committed until the outer transaction ends.
+            assert not self.db.in_transaction
+            names = [row[0] for row in DB.get_habit_data(self.db)]
+            assert names == ["test_habit", "test_habit_1"]
+
+        def test_migrate(self):
+            """
+            Checks that the database is upgraded to the latest schema version.
+
+            :return: None
+            """
+            version = self.db.execute("PRAGMA user_version").fetchone()[0]
+            assert version == len(DB.MIGRATIONS)
+            # A database created before the migrations existed is upgraded in place.
+            self.db.execute("DROP INDEX tracker_habit_date")
+            self.db.execute("PRAGMA user_version = 0")
+            assert DB.migrate(self.db) == len(DB.MIGRATIONS)
+            plan = self.db.execute("""EXPLAIN QUERY PLAN SELECT checked_off, date FROM tracker
+            WHERE habit_id = ? ORDER BY date""", (1,)).fetchall()
+            assert "tracker_habit_date" in str(plan)
+
+        def test_concurrent_profile(self):
+            """
+            Checks that a reader isn't blocked by a writer with the "concurrent" profile.
+
+            :return: None
+            """
+            writer = DB.get_db(name="test_wal.db", profile="concurrent")
+            reader = DB.get_db(name="test_wal.db", profile="concurrent", busy_timeout=0)
+            try:
+                assert writer.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+                DB.add_habit(writer, "test_habit", "test_description", "2025-01-20", "2025-01-30", "Daily")
+                with DB.transaction(writer):
+                    DB.add_habit(writer, "test_habit_1", "test_description_1", "2025-01-20", "2025-01-30", "Daily")
+                    # The reader sees the last committed data, while the writer holds the write lock.
+                    assert len(DB.get_habit_data(reader)) == 1
+                assert len(DB.get_habit_data(reader)) == 2
+                busy, log, checkpointed = DB.checkpoint(writer)
+                assert busy == 0 and log == checkpointed
+            finally:
+                DB.db_close(reader)
+                DB.db_close(writer)
+                os.remove("test_wal.db")
+
+        def test_checkpoints(self):
+            """
+            Checks that the WAL journal is checkpointed by the background thread.
+
+            :return: None
+            """
+            # The automatic checkpoints are turned off, so only the background thread empties the journal.
+            db = DB.get_db(name="test_checkpoints.db", profile="concurrent", wal_autocheckpoint=0)
+            stop = None
+            try:
+                for i in range(20):
+                    DB.add_habit(db, f"test_habit_{i}", "test_description", "2025-01-20", "2025-01-30", "Daily")
+                assert os.path.getsize("test_checkpoints.db-wal") > 0
+                stop = DB.start_checkpoints("test_checkpoints.db", interval=0.01, mode="TRUNCATE")
+                for _ in range(500):
+                    if os.path.getsize("test_checkpoints.db-wal") == 0:
+                        break
+                    time.sleep(0.01)
+                assert os.path.getsize("test_checkpoints.db-wal") == 0
+            finally:
+                if stop is not None:
+                    stop.set()
+                DB.db_close(db)
+                for suffix in ("", "-wal", "-shm"):
+                    if os.path.exists("test_checkpoints.db" + suffix):
+                        os.remove("test_checkpoints.db" + suffix)
+
+        def test_rebuild_streaks(self):
+            """
+            Checks that the Streak table is recomputed from the Tracker table.
+
+            :return: None
+            """
+            daily = DbHabit("test_habit_1", "test_description_1", "2025-01-20", "2025-02-02", "Daily")
+            daily.store(db=self.db)
+            daily.add_habit_checks(self.db, [(True, "2025-01-21"), (True, "2025-01-22"), (False, "2025-01-23"),
+                                             (True, "2025-01-24"), (True, "2025-01-25"), (True, "2025-01-26")])
+            weekly = DbHabit("test_habit_2", "test_description_2", "2025-01-06", "2025-03-02", "Weekly")
+            weekly.store(db=self.db)
+            weekly.add_habit_checks(self.db, [(True, "2025-01-07"), (True, "2025-01-13"), (True, "2025-02-01"),
+                                              (True, "2025-02-03")])
+            broken = DbHabit("test_habit_3", "test_description_3", "2025-01-20", "2025-02-02", "Daily")
+            broken.store(db=self.db)
+            broken.add_habit_check(self.db, True, "2025-01-25")
+            expected = self.db.execute("SELECT * FROM streak ORDER BY habit_id").fetchall()
+            self.db.execute("UPDATE streak SET current_streak = 0, longest_streak = 0, break_count = 0")
+            self.db.commit()
+
+            habit_ids = [row[0] for row in expected]
+            assert Rebuild.rebuild_streaks(self.db, habit_ids) == 3
+            assert self.db.execute("SELECT * FROM streak ORDER BY habit_id").fetchall() == expected
+
+        def test_iter_analysis(self):
+            """
+            Checks that the rows are yielded as named tuples and rendered one by one.
+
+            :return: None
+            """
+            for i in range(5):
+                DB.add_habit(self.db, f"test_habit_{i}", "test_description", "2025-01-20", "2025-01-30", "Weekly")
+            habits = Analysis.iter_all_habits(self.db, size=2)
+            first = next(habits)
+            assert isinstance(first, HabitRow) and first.name == "test_habit" and first.periodicity == "Daily"
+            assert len(list(habits)) == 5
+            weekly = list(Analysis.iter_same_periodicity_habits(self.db, "Weekly"))
+            assert [row.name for row in weekly] == [f"test_habit_{i}" for i in range(5)]
+            actions = list(Analysis.iter_all_actions(self.db, "test_habit"))
+            assert actions[0].checked_off == 1 and actions[0].date == "2025-01-20"
+            output = io.StringIO()
+            assert Analysis.render(Analysis.iter_habits_longest_streak(self.db), Analysis.STREAK_HEADER, output) == 6
+            assert output.getvalue().splitlines()[1] == "('test_habit', 'Still in progress', None)"
+
+        def test_struggled_most(self):
+            """
+            Checks that the rollup is kept up to date by the check-offs and by the backfill, and that the habits are
+            ranked by their miss rate.
+
+            :return: None
+            """
+            daily = DbHabit("test_habit_1", "test_description_1", "2025-01-20", "2025-03-02", "Daily")
+            daily.store(db=self.db)
+            daily.add_habit_check(self.db, True, "2025-01-20")
+            daily.add_habit_check(self.db, False, "2025-01-21")
+            daily.add_habit_check(self.db, True, "2025-01-23")  # The "2025-01-22" is missed.
+            weekly = DbHabit("test_habit_2", "test_description_2", "2025-01-06", "2025-03-02", "Weekly")
+            weekly.store(db=self.db)
+            weekly.add_habit_checks(self.db, [(True, "2025-01-07"), (True, "2025-01-13"), (True, "2025-01-29")])
+            ranking = Analysis.struggled_most(self.db, "2025-01-01", "2025-01-31")
+            assert [tuple(row) for row in ranking] == [("test_habit_1", 2, 2, 0.5), ("test_habit_2", 3, 1, 0.25)]
+            assert Analysis.struggled_most(self.db, "2025-01-22", "2025-01-31", limit=1)[0].missed == 1
+            # The ranking counts the periods missed until the end of the range too, and the weekly check-off of
+            # "2025-01-29" is left out, since its week ends after the range.
+            ranking = Analysis.struggle_ranking(self.db, "2025-01-01", "2025-01-31")
+            assert [tuple(row) for row in ranking] == [("test_habit", 1, 10, 0.9091, 1, 10),
+                                                       ("test_habit_1", 2, 10, 0.8333, 3, 8),
+                                                       ("test_habit_2", 2, 1, 0.3333, 1, 1)]
+            assert [tuple(row) for row in Analysis.struggle_ranking(self.db, "2025-01-20", "2025-01-23", 2)] == \
+                [("test_habit", 1, 3, 0.75, 1, 3), ("test_habit_1", 2, 2, 0.5, 2, 1)]
+
+            rollup = self.db.execute("SELECT * FROM rollup ORDER BY habit_id, period_start").fetchall()
+            self.db.execute("DELETE FROM rollup")
+            self.db.commit()
+            assert Rebuild.backfill_rollup(self.db) == len(rollup) + 1  # The check-off of "test_habit" is added too.
+            assert self.db.execute("SELECT * FROM rollup WHERE habit_id > 1 ORDER BY habit_id, "
+                                   "period_start").fetchall() == rollup
+
+        def test_repository(self):
+            """
+            Checks that the habits are cached and dropped from the cache when they are changed.
+
+            :return: None
+            """
+            repository = HabitRepository(self.db, size=2)
+            try:
+                habit = repository.get_by_name("test_habit")
+                assert habit.start_date == "2025-01-20" and habit.current_streak == 0
+                repository.check_off(habit, True, "2025-01-21")
+                assert repository.get_by_name("test_habit") is habit  # The check-off kept the habit cached.
+                assert repository.stats() == {"hits": 1, "misses": 1, "invalidations": 0, "size": 1}
+
+                # A change made by another instance drops the habit from the cache.
+                other = DbHabit.load(self.db, DB.name_to_id(self.db, "test_habit"))
+                assert other.current_streak == 1 and other.last_check == "2025-01-21"
+                other.add_habit_check(self.db, True, "2025-01-22")
+                assert repository.stats()["invalidations"] == 1
+                assert repository.get_by_name("test_habit").current_streak == 2
+
+                for i in range(3):
+                    DB.add_habit(self.db, f"test_habit_{i}", "test_description", "2025-01-20", "2025-01-30", "Daily")
+                    repository.get_by_name(f"test_habit_{i}")
+                assert repository.stats()["size"] == 2  # The least recently used habits were dropped.
+                DB.delete_habit(self.db, "test_habit_2")
+                assert repository.get_by_name("test_habit_2") is None
+                # The habits are cached by their users, so another user's habit with the same name isn't returned.
+                DB.set_user(self.db, "bob")
+                assert repository.get_by_name("test_habit_1") is None
+                DB.add_habit(self.db, "test_habit_1", "Bob's habit", "2025-01-20", "2025-01-30", "Daily")
+                assert repository.get_by_name("test_habit_1").description == "Bob's habit"
+                DB.set_user(self.db, DB.DEFAULT_USER)
+                assert repository.get_by_name("test_habit_1").description == "test_description"
+            finally:
+                repository.close()
+
+        def test_benchmark(self):
+            """
+            Checks that the benchmark measures every operation and finds the regressions.
+
+            :return: None
+            """
+            try:
+                results = Benchmark("test_benchmark.db", habits=20, days=5, repeat=5).run()
+            finally:
+                os.remove("test_benchmark.db")
+            assert results["add_habit_check"]["count"] == 5 and results["delete_habit"]["count"] == 5
+            assert {"iter_leaderboard", "iter_struggle_ranking", "iter_streak_as_of", "iter_events"} <= set(results)
+            assert Benchmark.compare(results, results) == []
+            slower = {"name_to_id": dict(results["name_to_id"], p50_ms=results["name_to_id"]["p50_ms"] * 2)}
+            assert [row[:2] for row in Benchmark.compare(slower, results)] == [("name_to_id", "p50_ms")]
+
+        def test_async_store(self):
+            """
+            Checks that the habits are written and read through the asyncio facade concurrently.
+
+            :return: None
+            """
+            async def scenario():
+                async with AsyncHabitStore("test_async.db", readers=2, chunk_size=2) as store:
+                    created = await asyncio.gather(*(store.create(f"async_{i}", "Async habit", "2025-01-20",
+                                                                  "2025-03-20", "Daily") for i in range(5)))
+                    assert created == [True] * 5
+                    assert not await store.create("async_0", "Async habit", "2025-01-20", "2025-03-20", "Daily")
+                    habits = await asyncio.gather(*(store.check_off(f"async_{i}", True, "2025-01-20")
+                                                    for i in range(5)))
+                    assert [habit.current_streak for habit in habits] == [1] * 5
+                    assert await store.check_off("async_1", True, "2025-01-20") is ConnectionError
+                    assert await store.check_off_many("async_0", [(True, "2025-01-21"), (False, "2025-01-22")]) == 2
+                    assert await store.check_off("missing", True, "2025-01-20") is None
+                    names = [row.name async for row in store.all_habits()]
+                    assert names == [f"async_{i}" for i in range(5)]
+                    async for _ in store.currently_tracked_habits():
+                        # The reader is released, though the iteration is stopped early.
+                        break
+                    actions = [row async for row in store.all_actions("async_0")]
+                    assert [row.checked_off for row in actions] == [1, 1, 0]
+                    await store.delete("async_4")
+                    assert len([row async for row in store.all_habits()]) == 4
+                # The readers are bound to the store's user, who sees only their own habits.
+                async with AsyncHabitStore("test_async.db", readers=1, user="alice") as store:
+                    assert await store.create("async_0", "Alice's habit", "2025-01-20", "2025-03-20", "Daily")
+                    assert [(row.name, row.current_streak) async for row in store.all_habits()] == [("async_0", None)]
+
+            try:
+                asyncio.run(scenario())
+            finally:
+                for suffix in ("", "-wal", "-shm"):
+                    if os.path.exists("test_async.db" + suffix):
+                        os.remove("test_async.db" + suffix)
+
+        def test_server(self):
+            """
+            Checks that the server creates, checks-off, analyses and deletes the habits, also in batches.
+
+            :return: None
+            """
+            server = HabitServer(("127.0.0.1", 0), self.db_title, "default")
+            try:
+                habit = {"name": "server", "start_date": "2025-01-20", "valid_till": "2025-03-20",
+                         "periodicity": "Daily"}
+                assert server.dispatch("POST", "/habits", habit) == (201, {"name": "server"})
+                assert server.dispatch("POST", "/habits", habit)[0] == 409
+                assert server.dispatch("POST", "/habits", {"name": "no dates"})[0] == 400
+                status, response = server.dispatch("POST", "/habits/server/checks",
+                                                   {"check": True, "date": "2025-01-20"})
+                assert status == 200 and response["current_streak"] == 1
+                status, responses = server.dispatch("POST", "/batch", [
+                    {"method": "POST", "path": "/habits/server/checks", "body": {"checks": [[True, "2025-01-21"]]}},
+                    {"method": "POST", "path": "/habits/missing/checks", "body": {"check": True}},
+                    {"path": "/habits/server/actions"},
+                    {"path": "/streaks?name=server"},
+                ])
+                assert status == 200 and [x["status"] for x in responses] == [200, 404, 200, 200]
+                assert [x["date"] for x in responses[2]["body"]] == ["2025-01-20", "2025-01-21"]
+                assert responses[3]["body"] == [{"name": "server", "status": "Still in progress", "longest_streak": 2}]
+                tracked = server.dispatch("GET", "/habits?status=tracked")[1]
+                assert [x["name"] for x in tracked] == ["test_habit", "server"]
+                ranked = server.dispatch("GET", "/struggled-most?start=2025-01-01&end=2025-12-31&limit=1")[1]
+                assert ranked == [{"name": "server", "completed": 2, "missed": 0, "miss_rate": 0.0}]
+                # The rejected check-offs aren't answered as stored.
+                assert server.dispatch("POST", "/habits/server/checks", {"check": True, "date": "2025-01-21"})[0] == 409
+                assert server.dispatch("POST", "/habits/server/checks", {"checks": [[True, "2025-01-20"]]})[0] == 409
+                # A malformed batch is refused before anything is written.
+                assert server.dispatch("POST", "/batch", [
+                    {"method": "POST", "path": "/habits/server/checks", "body": {"check": True, "date": "2025-01-22"}},
+                    {"method": "GET"},
+                ])[0] == 400
+                # A rolled back batch drops the habits, which it checked-off, from the cache.
+                server._streaks = lambda query, body: 1 / 0
+                with pytest.raises(ZeroDivisionError):
+                    server.dispatch("POST", "/batch", [
+                        {"method": "POST", "path": "/habits/server/checks",
+                         "body": {"check": True, "date": "2025-01-22"}},
+                        {"path": "/streaks"},
+                    ])
+                del server._streaks
+                status, response = server.dispatch("POST", "/habits/server/checks",
+                                                   {"check": True, "date": "2025-01-22"})
+                assert status == 200 and response["current_streak"] == 3
+                assert server.dispatch("DELETE", "/habits/server")[0] == 200
+                assert server.dispatch("DELETE", "/habits/server")[0] == 404
+                assert server.dispatch("PUT", "/habits")[0] == 405 and server.dispatch("GET", "/nope")[0] == 404
+            finally:
+                server.close()
+
+        def test_users(self):
+            """
+            Checks that the habits of the users are kept apart, also after upgrading an older database.
+
+            :return: None
+            """
+            # The habits created before the users belong to the default user.
+            assert [row.name for row in Analysis.iter_all_habits(self.db)] == ["test_habit"]
+            DB.set_user(self.db, "alice")
+            assert list(Analysis.iter_all_habits(self.db)) == []
+            habit = DbHabit("test_habit", "Alice's habit", "2025-01-20", "2025-03-20", "Daily")
+            habit.store(self.db)
+            habit.add_habit_check(self.db, True, "2025-01-20")
+            assert DbHabit.load(self.db, DB.name_to_id(self.db, "test_habit")).description == "Alice's habit"
+            assert [row.current_streak for row in Analysis.iter_all_habits(self.db)] == [1]
+            assert DB.add_habit(self.db, "test_habit", "", "2025-01-20", "2025-03-20", "Daily")
+            DB.delete_habit(self.db, "test_habit")
+            DB.set_user(self.db, DB.DEFAULT_USER)
+            assert [row.name for row in Analysis.iter_all_habits(self.db)] == ["test_habit"]
+            # The habits are listed in the order of their creation, not in the order of the users' indexes.
+            DB.set_user(self.db, "carol")
+            DB.add_habit(self.db, "zeta", "", "2025-01-20", "2025-03-20", "Weekly")
+            DB.add_habit(self.db, "alpha", "", "2025-01-20", "2025-03-20", "Daily")
+            assert [row.name for row in Analysis.iter_all_habits(self.db)] == ["zeta", "alpha"]
+            assert [row.name for row in Analysis.iter_currently_tracked_habits(self.db)] == ["zeta", "alpha"]
+            assert [row[0] for row in DB.get_habit_data(self.db)] == ["zeta", "alpha"]
+            DB.set_user(self.db, DB.DEFAULT_USER)
+            # The user is kept by the connection itself, so a connection opened later never inherits it.
+            bound = DB.connect(self.db_title, "alice", read_only=True)
+            assert DB.user_of(bound) == "alice"
+            bound.close()
+            raw = sqlite3.connect(self.db_title)
+            try:
+                assert DB.user_of(raw) == DB.DEFAULT_USER
+                with pytest.raises(TypeError):
+                    DB.set_user(raw, "alice")
+            finally:
+                raw.close()
+            # An older database is upgraded in place, its habits keep their ids.
+            old = DB.get_db("test_users.db")
+            try:
+                old.executescript("""
+                DROP TABLE habit;
+                CREATE TABLE habit (habit_id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT UNIQUE, description TEXT,
+                start_date TEXT, valid_till TEXT, periodicity TEXT, status TEXT, streak INTEGER, last_check TEXT,
+                end_date TEXT, last_check_week TEXT, last_check_day TEXT);
+                INSERT INTO habit(habit_id, name, status) VALUES (7, 'old', 'Still in progress');
+                PRAGMA user_version = 2;
+                """)
+                assert DB.migrate(old) == len(DB.MIGRATIONS)
+                assert DB.name_to_id(old, "old") == 7
+                assert not DB.add_habit(old, "new", "", "2025-01-20", "2025-03-20", "Daily")
+                assert DB.name_to_id(old, "new") == 8
+            finally:
+                DB.db_close(old)
+                os.remove("test_users.db")
+
+        def test_shard_router(self):
+            """
+            Checks that every user is routed to the same shard and reads only their own habits.
+
+            :return: None
+            """
+            router = ShardRouter("test_shard_{}.db", shards=3, profile="default")
+            users = [f"user_{i}" for i in range(12)]
+            try:
+                assert [router.shard_of(user) for user in users] == [router.shard_of(user) for user in users]
+                assert len({router.shard_of(user) for user in users}) == 3
+                for user in users:
+                    with router.connect(user) as db:
+                        assert not DB.add_habit(db, "shared", user, "2025-01-20", "2025-03-20", "Weekly")
+                for user in users:
+                    with router.connect(user) as db:
+                        assert [row.name for row in Analysis.iter_same_periodicity_habits(db, "Weekly")] == ["shared"]
+                        assert DB.get_habit_data(db)[0][0] == "shared"
+                counts = [db.execute("SELECT COUNT(*) FROM habit").fetchone()[0] for db in router.each_shard()]
+                assert sum(counts) == len(users)
+            finally:
+                for path in router.paths():
+                    for suffix in ("", "-wal", "-shm"):
+                        if os.path.exists(path + suffix):
+                            os.remove(path + suffix)
+
+        def test_habit_table(self):
+            """
+            Checks that the habits are kept in slots and that the columns match the habits.
+
+            :return: None
+            """
+            assert not hasattr(DbHabit("slots", "", "2025-01-20", "2025-03-20", "Daily"), "__dict__")
+            for name, periodicity, checks in (("daily", "Daily", ["2025-01-20", "2025-01-21"]),
+                                              ("weekly", "Weekly", ["2025-01-22"]), ("fresh", "Weekly", [])):
+                habit = DbHabit(name, "", "2025-01-20", "2025-03-20", periodicity)
+                habit.store(self.db)
+                for check_date in checks:
+                    habit.add_habit_check(self.db, True, check_date)
+            table = HabitTable.load(self.db)
+            assert table.names == ["test_habit", "daily", "weekly", "fresh"]
+            assert table.select(periodicity="Weekly") == [2, 3]
+            day = datetime.date(2025, 2, 10)
+            missed = table.missed_periods(day)
+            for i, habit_id in enumerate(table.habit_ids):
+                habit = DbHabit.load(self.db, habit_id)
+                assert table.habit(i).current_streak == habit.current_streak
+                assert table.habit(i).last_check == habit.last_check
+                assert table.habit(i).last_check_day == habit.last_check_day
+                assert table.habit(i).last_check_week == habit.last_check_week
+                # The habits are broken after 3 missed periods, so fewer missed periods are returned.
+                found = habit.missed_dates(self.db, str(day), day, datetime.date.fromisoformat(habit.start_date))
+                assert len(found) == min(missed[i], 3)
+            assert table.nbytes() < 4 * 100
+
+        def test_ordinal_dates(self):
+            """
+            Checks that the days are stored as ordinals, also after upgrading an older database.
+
+            :return: None
+            """
+            habit = DbHabit("weekly", "", "2025-01-20", "2025-03-20", "Weekly")
+            habit.store(self.db)
+            habit.add_habit_check(self.db, True, "2025-01-22")
+            assert self.db.execute("SELECT typeof(start_date), typeof(last_check) FROM habit WHERE name = 'weekly'"
+                                   ).fetchone() == ("integer", "integer")
+            assert self.db.execute("SELECT typeof(date) FROM tracker").fetchall() == [("integer",)] * 2
+            loaded = DbHabit.load(self.db, DB.name_to_id(self.db, "weekly"))
+            assert (loaded.start_date, loaded.last_check, loaded.last_check_week, loaded.last_check_day) == (
+                "2025-01-20", "2025-01-20", "2025-01-20 : 2025-01-26", "2025-01-22")
+            assert self.db.execute("SELECT last_break FROM streak_iso").fetchall() == [("Not broken",)]
+            # An older database storing the ISO dates is upgraded in place, its rows keep their ids.
+            old = DB.get_db("test_dates.db")
+            try:
+                old.executescript("""
+                DROP VIEW tracker_iso;
+                DROP VIEW streak_iso;
+                DROP TABLE tracker;
+                DROP TABLE streak;
+                CREATE TABLE tracker (tracker_id INTEGER PRIMARY KEY AUTOINCREMENT, habit_id INTEGER,
+                checked_off INTEGER, date TEXT);
+                CREATE TABLE streak (habit_id INTEGER PRIMARY KEY, current_streak INTEGER, longest_streak INTEGER,
+                break_count INTEGER, last_break TEXT);
+                INSERT INTO tracker VALUES (5, 1, 1, '2025-01-20'), (9, 2, 0, '2025-01-21');
+                INSERT INTO streak VALUES (1, 1, 1, 0, 'Not broken'), (2, 0, 0, 1, '2025-01-21');
+                PRAGMA user_version = 3;
+                """)
+                assert DB.migrate(old) == len(DB.MIGRATIONS)
+                assert old.execute("SELECT tracker_id, date FROM tracker_iso").fetchall() == [
+                    (5, "2025-01-20"), (9, "2025-01-21")]
+                assert old.execute("SELECT last_break FROM streak").fetchall() == [
+                    (None,), (datetime.date(2025, 1, 21).toordinal(),)]
+                old.execute("INSERT INTO tracker(habit_id, checked_off, date) VALUES (1, 1, 0)")
+                assert old.execute("SELECT MAX(tracker_id) FROM tracker").fetchone()[0] == 10
+            finally:
+                DB.db_close(old)
+                os.remove("test_dates.db")
+
+        def test_headless(self):
+            """
+            Checks that the headless interface creates, checks-off, reports and deletes the habits.
+
+            :return: None
+            """
+            def run(*argv):
+                output = io.StringIO()
+                with contextlib.redirect_stdout(output):
+                    code = headless.main(["--db", self.db_title, "--quiet", *argv])
+                return code, output.getvalue()
+
+            assert run("create", "cron", "--start", "2025-01-20", "--till", "2025-03-20")[0] == 0
+            assert run("create", "cron", "--start", "2025-01-20", "--till", "2025-03-20")[0] == 1
+            assert run("checkoff", "cron", "--date", "2025-01-20")[0] == 0
+            assert run("checkoff", "missing")[0] == 1
+            lines = io.StringIO("cron,2025-01-21\ncron,2025-01-22,0\n\ntest_habit,2025-01-21\n")
+            assert headless.checkoff_many(self.db, lines) == 0
+            # The period of "2025-01-22" is already checked-off, so the check-off is rejected.
+            assert headless.checkoff_many(self.db, io.StringIO("cron,2025-01-22\n")) == 1
+            code, output = run("report", "actions", "--name", "cron", "--json")
+            assert code == 0 and [row["checked_off"] for row in json.loads(output)] == [1, 1, 0]
+            code, output = run("report", "longest-streak", "--name", "cron", "--json")
+            assert json.loads(output) == [{"name": "cron", "status": "Still in progress", "longest_streak": 2}]
+            assert run("report", "tracked")[1].count("\n") == 3  # The header and two habits.
+            # The wrong dates and lines are reported without a traceback, and nothing is stored.
+            with pytest.raises(SystemExit) as exit_code, contextlib.redirect_stderr(io.StringIO()):
+                run("create", "bad", "--till", "2025-13-01")
+            assert exit_code.value.code == 2
+            errors = io.StringIO()
+            with contextlib.redirect_stderr(errors):
+                assert headless.checkoff_many(self.db, io.StringIO("cron,2025-01-23\ncron\ncron,2025-02-30\n")) == 2
+            assert errors.getvalue().startswith("line 2: ") and "line 3: " in errors.getvalue()
+            assert len(list(Analysis.iter_all_actions(self.db, "cron"))) == 3
+            # The result of a command is printed, though its messages are silenced.
+            habit_id = DB.name_to_id(self.db, "cron")
+            with DB.transaction(self.db):
+                self.db.execute("UPDATE streak SET longest_streak = 99 WHERE habit_id = ?", (habit_id,))
+            code, output = run("recover", "--check")
+            assert code == 1 and output.split() == [str(habit_id)]
+            with pytest.raises(SystemExit) as exit_code, contextlib.redirect_stderr(io.StringIO()):
+                run("report", "leaderboard", "--after", "5")
+            assert exit_code.value.code == 2
+            assert run("delete", "cron")[0] == 0 and run("delete", "cron")[0] == 1
+
+        def test_fixtures(self):
+            """
+            Checks that the fixtures are deterministic and match the habits checked-off by DbHabit.
+
+            :return: None
+            """
+            assert PredefinedHabits.seed(self.db) == 5
+            assert PredefinedHabits.seed(self.db) == 0
+            DB.set_user(self.db, "fixtures")
+            inserted = Fixtures.generate(self.db, habits=40, days=90, seed=3)
+            assert inserted > 0 and Fixtures.generate(self.db, habits=40, days=90, seed=3) == 0
+            generated = DB.get_habit_data(self.db)
+            assert {row[4] for row in generated} == {"Still in progress", "Completed", "Broken"}
+            # The same check-offs replayed by DbHabit give the same habits.
+            DB.set_user(self.db, "replay")
+            for name, start_date, valid_till, periodicity, *_ in generated:
+                checks = self.db.execute("""SELECT tracker.checked_off, tracker.date FROM tracker_iso AS tracker
+                JOIN habit on tracker.habit_id = habit.habit_id
+                WHERE habit.name = ? AND habit.user_id = 'fixtures'""", (name,)).fetchall()
+                habit = DbHabit(name, "", start_date, valid_till, periodicity)
+                habit.store(self.db)
+                assert habit.add_habit_checks(self.db, checks) == len(checks)
+            assert DB.get_habit_data(self.db) == generated
+            other = DB.get_db("test_fixtures.db")
+            try:
+                assert Fixtures.generate(other, habits=40, days=90, seed=3) == inserted
+                assert DB.get_habit_data(other) == generated
+            finally:
+                DB.db_close(other)
+                os.remove("test_fixtures.db")
+
+        def test_metrics(self):
+            """
+            Checks that the statements and the operations are measured only while the metrics are enabled.
+
+            :return: None
+            """
+            add_habit = DB.__dict__["add_habit"]
+            Metrics.reset()
+            Metrics.enable(self.db)
+            try:
+                assert DB.__dict__["add_habit"] is not add_habit
+                DbHabit("metered", "", "2025-01-20", "2025-03-20", "Daily").store(self.db)
+                habit = DbHabit.load(self.db, DB.name_to_id(self.db, "metered"))
+                habit.add_habit_check(self.db, True, "2025-01-20")
+                habit.add_habit_check(self.db, True, "2025-01-21")
+                assert len(list(Analysis.iter_all_habits(self.db))) == 2
+            finally:
+                Metrics.disable(self.db)
+            assert DB.__dict__["add_habit"] is add_habit
+            DB.add_habit(self.db, "unmetered", "", "2025-01-20", "2025-03-20", "Daily")
+            snapshot = Metrics.snapshot()
+            operations = snapshot["operations"]
+            assert operations["DbHabit.add_habit_check"]["count"] == 2
+            # The logged creation of the habit is counted too.
+            assert operations["DB.insert_habit"]["count"] == 1 and operations["DB.insert_habit"]["rows"] == 2
+            assert operations["Analysis.iter_all_habits"]["timed"] == 1
+            # The statements are grouped without their values, e.g. the names of the habits.
+            statements = snapshot["statements"]
+            assert not any("metered" in statement for statement in statements)
+            inserts = [measurement for statement, measurement in statements.items()
+                       if statement.startswith("INSERT INTO tracker")]
+            assert inserts and inserts[0]["count"] == 2 and inserts[0]["rows"] == 2
+            assert inserts[0]["buckets"]["+Inf"] == inserts[0]["timed"] == 2
+            assert Metrics.top(1, by="count")[0][1]["count"] >= 2
+            text = Metrics.to_prometheus()
+            assert "# TYPE habit_tracker_operation_seconds histogram" in text
+            assert 'habit_tracker_operation_calls_total{operation="DbHabit.add_habit_check"} 2' in text
+            assert json.loads(Metrics.to_json())["operations"].keys() == operations.keys()
+            Metrics.reset()
+            assert Metrics.snapshot() == {"statements": {}, "operations": {}}
+
+        def test_transfer(self):
+            """
+            Checks that the exported habits are imported unchanged, validated and continued from the last checkpoint.
+
+            :return: None
+            """
+            def state():
+                rows = self.db.execute("""SELECT habit.name, tracker.checked_off, tracker.date, rollup.completed,
+                rollup.missed
+                FROM habit JOIN tracker ON habit.habit_id = tracker.habit_id
+                LEFT JOIN rollup ON habit.habit_id = rollup.habit_id AND tracker.date = rollup.period_start
+                WHERE habit.user_id = ? ORDER BY habit.name, tracker.date""", (DB.user_of(self.db),)).fetchall()
+                return DB.get_habit_data(self.db), rows
+
+            DB.set_user(self.db, "source")
+            Fixtures.generate(self.db, habits=12, days=60, seed=5)
+            expected = state()
+            exported = {}
+            for format in ("jsonl", "csv"):
+                exported[format] = io.StringIO(newline="")
+                count = Transfer.dump(self.db, exported[format], format, size=7)
+                assert count == len(exported[format].getvalue().splitlines())
+            for format, user in (("jsonl", "jsonl"), ("csv", "csv")):
+                DB.set_user(self.db, user)
+                exported[format].seek(0)
+                assert Transfer.load(self.db, exported[format], format, size=5) == count
+                assert state() == expected
+            # A check-off breaking the rules rolls the whole import back.
+            lines = exported["jsonl"].getvalue().splitlines(keepends=True)
+            broken = lines[:-1] + ['{"table": "tracker", "name": "fixture_0", "checked_off": 1, "date": "2023-01-01"}\n']
+            DB.set_user(self.db, "broken")
+            with pytest.raises(ValueError, match=f"Line {len(lines)}: Check-off date"):
+                Transfer.load(self.db, io.StringIO("".join(broken)))
+            assert DB.get_habit_data(self.db) == []
+            # An interrupted import continues after the last committed line.
+            with pytest.raises(ValueError):
+                Transfer.load(self.db, io.StringIO("".join(broken)), source="export.jsonl", checkpoint=10)
+            committed = Transfer.checkpoint_of(self.db, "export.jsonl")
+            assert committed == (len(lines) - 1) // 10 * 10
+            resumed = Transfer.load(self.db, io.StringIO("".join(lines)), source="export.jsonl", checkpoint=10)
+            assert resumed == len(lines) - committed
+            assert state() == expected and Transfer.checkpoint_of(self.db, "export.jsonl") == 0
+
+        def test_habit_ids(self):
+            """
+            Checks that a stored habit keeps its id and is written without looking up its name.
+
+            :return: None
+            """
+            habit = DbHabit("test_habit_1", "", "2025-01-20", "2025-01-22", "Daily")
+            assert habit.store(self.db) is None and habit.habit_id == DB.id_of(self.db, "test_habit_1")
+            assert DbHabit("test_habit_1", "", "2025-01-20", "2025-01-22", "Daily").store(self.db) is True
+            statements = []
+            self.db.set_trace_callback(statements.append)
+            habit.add_habit_check(self.db, True, "2025-01-20")
+            habit.add_habit_checks(self.db, [(True, "2025-01-21"), (True, "2025-01-22")])
+            self.db.set_trace_callback(None)
+            assert statements and not any("name =" in statement for statement in statements)
+            assert habit.status == "Completed" and DB.get_cur_streak_by_id(self.db, habit.habit_id) == 3
+            assert DbHabit.load(self.db, habit.habit_id).habit_id == habit.habit_id
+            # The habit, which was created without store(), looks its id up once.
+            other = DbHabit("test_habit", "test_description", "2025-01-20", "2025-01-30", "Daily",
+                            last_check="2025-01-20")
+            other.add_habit_check(self.db, True, "2025-01-21")
+            assert other.habit_id == DB.id_of(self.db, "test_habit") and DB.get_cur_streak(self.db, "test_habit") == 1
+            habit.drop(self.db)
+            assert habit.habit_id is None and DB.id_of(self.db, "test_habit_1") is None
+
+        def test_fleet_report(self):
+            """
+            Checks that the reports of many files are merged from the processes' partial aggregates.
+
+            :return: None
+            """
+            paths = [f"test_fleet_{i}.db" for i in range(3)]
+            habits = []
+            try:
+                for i, path in enumerate(paths):
+                    db = DB.get_db(path, user=f"user_{i}")
+                    Fixtures.generate(db, habits=20, days=60, seed=i)
+                    habits += [(row.longest_streak or 0, row.name, f"user_{i}", path)
+                               for row in Analysis.iter_all_habits(db)]
+                    DB.db_close(db)
+                report = FleetReport(paths + ["test_fleet_missing.db"], workers=2, top=3, batch=2,
+                                     memory_limit=2 ** 31).run()
+                assert report["files"] == 4 and report["users"] == 3 and report["habits"] == len(habits)
+                assert sum(report["statuses"].values()) == sum(report["longest_streaks"].values()) == len(habits)
+                assert [tuple(row.values()) for row in report["top"]] == sorted(habits, reverse=True)[:3]
+                assert 0 < report["period_completion_rate"] < 1
+                assert [error["path"] for error in report["errors"]] == ["test_fleet_missing.db"]
+                # The files are only read.
+                assert not os.path.exists("test_fleet_missing.db")
+            finally:
+                for path in paths:
+                    os.remove(path)
+
+        def test_streak_as_of(self):
+            """
+            Checks that the past streak data are replayed from the snapshots taken by the check-offs and by the
+            backfill.
+
+            :return: None
+            """
+            start = datetime.date(2025, 1, 20)
+            valid_till = str(start + datetime.timedelta(days=44))
+            habit = DbHabit("test_as_of", "", str(start), valid_till, "Daily")
+            batch = DbHabit("test_as_of_batch", "", str(start), valid_till, "Daily")
+            habit.store(self.db)
+            batch.store(self.db)
+            checks = [(i != 20, str(start + datetime.timedelta(days=i))) for i in range(45) if i != 30]
+            expected = {}
+            for check, check_date in checks:
+                habit.add_habit_check(self.db, check, check_date)
+                expected[check_date] = (habit.status, habit.current_streak, habit.longest_streak, habit.break_count,
+                                        habit.last_break or "Not broken")
+            batch.add_habit_checks(self.db, checks)
+            days = [str(start + datetime.timedelta(days=i)) for i in range(46)]
+            rows = list(Analysis.iter_streak_as_of(self.db, "test_as_of", reversed(days)))[::-1]
+            assert [tuple(row[2:]) for row in rows if row.date in expected] == list(expected.values())
+            # The day without a check-off keeps the state of the day before.
+            assert rows[30][2:] == rows[29][2:] and rows[-1][2:] == rows[-2][2:]
+            assert rows[-1][2:] == ("Completed", 14, 20, 2, "2025-02-20")
+            assert Analysis.iter_streak_as_of(self.db, "test_as_of", ["2025-01-19"]).__next__().status == "Not started"
+            assert Analysis.streak_as_of(self.db, "test_as_of", "2025-02-11").current_streak == 2
+            assert Analysis.streak_as_of(self.db, "missing", "2025-02-10") is None
+
+            # A snapshot is taken by the first check-off of every block of periods, one by one, at once and by the
+            # backfill alike.
+            snapshots = "SELECT day, last_index, current_streak, status FROM streak_snapshot WHERE habit_id = ?"
+            taken = self.db.execute(snapshots, (habit.habit_id,)).fetchall()
+            assert [row[1] for row in taken] == list(range(0, 45, DB.SNAPSHOT_PERIODS))
+            assert self.db.execute(snapshots, (batch.habit_id,)).fetchall() == taken
+            assert Rebuild.backfill_snapshots(self.db, [habit.habit_id, batch.habit_id]) == 2 * len(taken)
+            assert self.db.execute(snapshots, (habit.habit_id,)).fetchall() == taken
+            # The habit without snapshots is replayed from the start.
+            self.db.execute("DELETE FROM streak_snapshot")
+            assert list(Analysis.iter_streak_as_of(self.db, "test_as_of", days)) == rows
+            habit.drop(self.db)
+            assert self.db.execute("SELECT COUNT(*) FROM streak_snapshot").fetchone()[0] == 0
+
+        def test_event_log(self):
+            """
+            Checks that every change of the habits is logged and that the habits are recovered from the log.
+
+            :return: None
+            """
+            broken = DbHabit("test_broken", "", "2025-01-20", "2025-03-20", "Daily")
+            completed = DbHabit("test_completed", "", "2025-01-20", "2025-02-10", "Weekly")
+            deleted = DbHabit("test_deleted", "", "2025-01-20", "2025-03-20", "Daily")
+            for habit in (broken, completed, deleted):
+                habit.store(self.db)
+            for day in range(20, 31):
+                broken.add_habit_check(self.db, True, f"2025-01-{day}")
+            broken.add_habit_check(self.db, True, "2025-02-05")
+            completed.add_habit_checks(self.db, [(True, "2025-01-21"), (False, "2025-01-28"), (True, "2025-02-12")])
+            deleted.add_habit_check(self.db, True, "2025-01-20")
+            deleted.drop(self.db)
+            kinds = [row.kind for row in Analysis.iter_events(self.db, "test_broken")]
+            assert kinds == ["create"] + ["check"] * 12 + ["break"]
+            assert [row.kind for row in Analysis.iter_events(self.db, "test_completed")][-1] == "complete"
+            assert [row.kind for row in Analysis.iter_events(self.db, "test_deleted")] == ["create", "check", "delete"]
+            with pytest.raises(sqlite3.IntegrityError):
+                self.db.execute("UPDATE habit_event SET kind = 'check'")
+            with pytest.raises(sqlite3.IntegrityError):
+                self.db.execute("DELETE FROM habit_event")
+
+            # The habits written by DbHabit match the log, the setup's check-off was written without DbHabit.
+            ids = [broken.habit_id, completed.habit_id]
+            assert Rebuild.verify(self.db) == [DB.id_of(self.db, "test_habit")]
+            rows = "SELECT * FROM habit LEFT JOIN streak USING (habit_id) WHERE habit_id IN (?, ?) ORDER BY habit_id"
+            expected = self.db.execute(rows, ids).fetchall()
+            with DB.transaction(self.db):
+                self.db.execute("UPDATE habit SET status = 'Still in progress', streak = 0 WHERE habit_id = ?",
+                                (broken.habit_id,))
+                self.db.execute("DELETE FROM streak WHERE habit_id = ?", (completed.habit_id,))
+                self.db.execute("DELETE FROM habit WHERE habit_id = ?", (completed.habit_id,))
+            assert Rebuild.verify(self.db, ids) == ids
+            # The snapshots are only a shortcut, the habit without them is replayed from its first check-off.
+            self.db.execute("DELETE FROM streak_snapshot WHERE habit_id = ?", (completed.habit_id,))
+            assert Rebuild.recover(self.db) == 4
+            assert Rebuild.verify(self.db) == [] and self.db.execute(rows, ids).fetchall() == expected
+            assert DB.get_cur_streak(self.db, "test_habit") == 1 and DB.id_of(self.db, "test_deleted") is None
+            # The habits of the shipped database, whose ending isn't reflected by the stored check-offs, are recovered
+            # from their logged break, and the check-offs of the missing habits aren't logged.
+            shutil.copy(os.path.join(os.path.dirname(__file__), "main.db"), "test_main.db")
+            shipped = DB.get_db("test_main.db")
+            try:
+                assert Rebuild.verify(shipped) == []
+                assert shipped.execute("""SELECT COUNT(*) FROM habit_event
+                WHERE habit_id NOT IN (SELECT habit_id FROM habit)""").fetchone()[0] == 0
+            finally:
+                DB.db_close(shipped)
+                os.remove("test_main.db")
+
+        def test_leaderboard(self):
+            """
+            Checks that the leaderboard's pages are found by their keys along the streaks' index.
+
+            :return: None
+            """
+            # The habits of another user are neither listed nor walked by the default user's pages.
+            DB.set_user(self.db, "other")
+            Fixtures.generate(self.db, habits=30, days=90, seed=5)
+            DB.set_user(self.db, DB.DEFAULT_USER)
+            Fixtures.generate(self.db, habits=60, days=90)
+            rows = [row for row in Analysis.iter_all_habits(self.db) if row.longest_streak is not None]
+            for by, status, periodicity in (("longest_streak", None, None), ("current_streak", None, None),
+                                            ("longest_streak", "Broken", None), ("current_streak", None, "Weekly")):
+                expected = sorted(((getattr(row, by), DB.id_of(self.db, row.name)) for row in rows
+                                   if status in (None, row.status) and periodicity in (None, row.periodicity)),
+                                  reverse=True)
+                pages = []
+                after = None
+                while True:
+                    page = list(Analysis.iter_leaderboard(self.db, by, status, periodicity, after, limit=7))
+                    if not page:
+                        break
+                    assert len(page) <= 7
+                    pages += [(getattr(row, by), row.habit_id) for row in page]
+                    after = pages[-1]
+                assert expected and pages == expected
+            plan = " ".join(row[-1] for row in self.db.execute(
+                "EXPLAIN QUERY PLAN SELECT streak.habit_id FROM streak CROSS JOIN habit "
+                "on habit.habit_id = streak.habit_id WHERE streak.user_id = 'default' "
+                "AND (streak.longest_streak, streak.habit_id) < (5, 10) "
+                "ORDER BY streak.longest_streak DESC, streak.habit_id DESC LIMIT 20"))
+            assert "streak_user_longest (user_id=?" in plan and "TEMP B-TREE" not in plan
+            assert len(Analysis.leaderboard(self.db, limit=3)) == 3
+            with pytest.raises(ValueError):
+                list(Analysis.iter_leaderboard(self.db, "break_count"))
+            server = HabitServer(("127.0.0.1", 0), self.db_title, "default")
+            try:
+                status, page = server.dispatch("GET", f"/leaderboard?by=current_streak&limit=2&after={expected[1][0]},"
+                                                      f"{expected[1][1]}&periodicity=Weekly")
+                assert status == 200 and [(row["current_streak"], row["habit_id"]) for row in page] == expected[2:4]
+                assert server.dispatch("GET", "/leaderboard?after=5")[0] == 400
+            finally:
+                server.close()
+
         def teardown_method(self):
             """
             Closes and removes the "test.db".
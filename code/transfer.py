@@ -0,0 +1,408 @@
+import contextlib
+import csv
+import json
+import sqlite3
+
+from db import DB
+from period import Period
+from rebuild import Rebuild
+
+
+class Transfer:
+    """The Transfer class streams the habits, the streaks and the check-offs of a user to and from CSV or JSONL files,
+    e.g. to move them to another database.
+
+    A JSONL line is an object with the "table" and the table's COLUMNS, a CSV row is the table followed by the values
+    of its COLUMNS, where an empty value means no value. The habits are identified by their names, so they get new ids
+    in the database, into which they are imported. The days are written as ISO dates.
+
+    The rows are read and written in chunks, so the memory doesn't grow with the count of check-offs, only with the
+    count of habits.
+
+    Methods:
+        dump(db, file, format="jsonl", size=10000): Writes the user's habits, streaks and check-offs into the file.
+        load(db, file, format="jsonl", source=None, checkpoint=None, size=10000): Validates and inserts the habits,
+        streaks and check-offs from the file.
+        checkpoint_of(db, source): Returns the count of the source's lines, which have already been imported.
+    """
+    # The exported columns of the tables, in the order of the CSV rows.
+    COLUMNS = {
+        "habit": ("name", "description", "start_date", "valid_till", "periodicity", "status", "streak", "last_check",
+                  "end_date", "last_check_day"),
+        "streak": ("name", "current_streak", "longest_streak", "break_count", "last_break"),
+        "tracker": ("name", "checked_off", "date"),
+    }
+    # The statuses of the habits.
+    STATUSES = ("Still in progress", "Completed", "Broken")
+    # The queries reading the tables of the user, the tables are exported in this order.
+    QUERIES = {
+        "habit": """SELECT name, description, start_date, valid_till, periodicity, status, streak, last_check, end_date,
+        last_check_day
+        FROM habit_iso
+        WHERE user_id = ?
+        ORDER BY habit_id""",
+        "streak": f"""SELECT habit.name, streak.current_streak, streak.longest_streak, streak.break_count,
+        date(streak.last_break + {DB.JULIAN_OFFSET})
+        FROM streak JOIN habit on streak.habit_id = habit.habit_id
+        WHERE habit.user_id = ?
+        ORDER BY streak.habit_id""",
+        "tracker": """SELECT habit.name, tracker.checked_off, tracker.date
+        FROM tracker_iso AS tracker JOIN habit on tracker.habit_id = habit.habit_id
+        WHERE habit.user_id = ?
+        ORDER BY tracker.habit_id, tracker.date, tracker.tracker_id""",
+    }
+
+    @classmethod
+    def dump(cls, db, file, format="jsonl", size=10000):
+        """
+        Writes the habits of the connection's user, then their streaks, then their check-offs into the file.
+
+        :param db: The database, to which you are connected.
+        :type db: class
+        :param file: The file opened for writing text, a CSV file should be opened with newline="".
+        :type file: class
+        :param format: The format, i.e. "jsonl" or "csv" (default "jsonl").
+        :type format: str
+        :param size: The count of rows fetched at once (default 10000).
+        :type size: int
+        :return: Returns the count of written rows.
+        :rtype: int
+        """
+        if format not in ("jsonl", "csv"):
+            raise ValueError(f"There is no \"{format}\" format!")
+        writer = csv.writer(file) if format == "csv" else None
+        count = 0
+        cur = db.cursor()
+        for table, query in cls.QUERIES.items():
+            cur.execute(query, (DB.user_of(db),))
+            while True:
+                rows = cur.fetchmany(size)
+                if not rows:
+                    break
+                if writer:
+                    writer.writerows((table, *("" if value is None else value for value in row)) for row in rows)
+                else:
+                    file.writelines(json.dumps(dict(zip(cls.COLUMNS[table], row), table=table)) + "\n"
+                                    for row in rows)
+                count += len(rows)
+        return count
+
+    @classmethod
+    def load(cls, db, file, format="jsonl", source=None, checkpoint=None, size=10000):
+        """
+        Validates and inserts the habits, the streaks and the check-offs from the file into the connection's user's
+        habits. The rows are checked by the same rules as DbHabit enforces, e.g. a check-off can't be earlier than the
+        start date, and a habit can't be checked-off twice during a period. The check-offs are inserted with
+        executemany() in chunks of the size, and the Rollup and the StreakSnapshot tables of the imported habits are
+        computed from them. The imported habits and check-offs are logged as events, just like the ones stored by the
+        DB methods.
+
+        Without the checkpoint, the whole file is imported in one transaction, or not at all. With the checkpoint, the
+        rows are committed every checkpoint lines, together with the count of imported lines of the source, so an
+        interrupted import of the same source continues after the last committed line. The count is deleted once the
+        file is imported.
+
+        :param db: The database, to which you are connected.
+        :type db: class
+        :param file: The file opened for reading text, a CSV file should be opened with newline="".
+        :type file: class
+        :param format: The format, i.e. "jsonl" or "csv" (default "jsonl").
+        :type format: str
+        :param source: The name of the imported file, under which the checkpoints are stored (default None).
+        :type source: str
+        :param checkpoint: The count of lines committed at once, if not passed, the file is imported in one
+        transaction (default None).
+        :type checkpoint: int
+        :param size: The count of rows inserted at once (default 10000).
+        :type size: int
+        :return: Returns the count of imported rows.
+        :rtype: int
+        :raises ValueError: If a row breaks the rules, the rows after the last checkpoint are rolled back.
+        """
+        if format not in ("jsonl", "csv"):
+            raise ValueError(f"There is no \"{format}\" format!")
+        if checkpoint and not source:
+            raise ValueError("The checkpoints need the name of the source!")
+        user = DB.user_of(db)
+        cur = db.cursor()
+        skipped = cls.checkpoint_of(db, source) if checkpoint else 0
+        # The [habit id, ordinal of the start date, length of the period, index of the last checked-off period] of the
+        # habits by their names, the habits imported before the last checkpoint are read from the database when needed.
+        habits = {}
+        streaks = []
+        tracker = []
+        # The ids of the habits, whose check-offs are in the current chunk.
+        touched = set()
+        count = 0
+
+        def habit_of(name, line):
+            if name not in habits:
+                cur.execute("""SELECT habit.habit_id, habit.start_date, habit.periodicity, MAX(tracker.date)
+                FROM habit LEFT JOIN tracker on habit.habit_id = tracker.habit_id
+                WHERE habit.user_id = ? AND habit.name = ?
+                GROUP BY habit.habit_id""", (user, name))
+                row = cur.fetchone()
+                if not row:
+                    raise ValueError(f"Line {line}: There is no habit {name}!")
+                habit_id, start, periodicity, last_day = row
+                length = Period.LENGTHS[periodicity]
+                habits[name] = [habit_id, start, length, (last_day - start) // length if last_day else -1]
+            return habits[name]
+
+        def flush():
+            cur.executemany("""
+            INSERT INTO
+            streak(habit_id, current_streak, longest_streak, break_count, last_break, user_id)
+            VALUES (?1, ?2, ?3, ?4, ?5, (SELECT user_id FROM habit WHERE habit_id = ?1))
+            """, streaks)
+            cur.executemany("INSERT INTO tracker(habit_id, checked_off, date) VALUES (?, ?, ?)", tracker)
+            cur.executemany("INSERT INTO habit_event(habit_id, kind, day, checked_off) VALUES (?1, 'check', ?3, ?2)",
+                            tracker)
+            if touched:
+                Rebuild.backfill_rollup(db, touched)
+                Rebuild.backfill_snapshots(db, touched)
+            streaks.clear()
+            tracker.clear()
+            touched.clear()
+
+        def chunks():
+            # Yields the numbered records of every chunk, which is committed at once.
+            chunk = []
+            for line, record in enumerate(cls._read(file, format), start=1):
+                if line <= skipped:
+                    continue
+                chunk.append((line, record))
+                if checkpoint and len(chunk) >= checkpoint:
+                    yield chunk
+                    chunk = []
+            yield chunk
+
+        # Without the checkpoint, the chunks are the savepoints of one transaction.
+        with contextlib.nullcontext() if checkpoint else DB.transaction(db):
+            for chunk in chunks():
+                with DB.transaction(db):
+                    for line, (table, row) in chunk:
+                        if table == "habit":
+                            name, *data = cls._habit(line, row)
+                            try:
+                                cur.execute("""
+                                INSERT INTO
+                                habit(name, description, start_date, valid_till, periodicity, status, streak, last_check,
+                                end_date, last_check_day, user_id)
+                                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                                """, (name, *data, user))
+                            except sqlite3.IntegrityError:
+                                raise ValueError(f"Line {line}: The habit {name} already exists!") from None
+                            habit_id = cur.lastrowid
+                            cur.execute(DB.CREATE_EVENT + " WHERE habit_id = ?", (habit_id,))
+                            if data[4] in DB.ENDED_EVENTS:
+                                cur.execute("INSERT INTO habit_event(habit_id, kind, day) VALUES (?, ?, ?)",
+                                            (habit_id, DB.ENDED_EVENTS[data[4]], data[7]))
+                            length = Period.LENGTHS[data[3]]
+                            habits[name] = [habit_id, data[1], length, -1]
+                        elif table == "streak":
+                            name, *data = cls._streak(line, row)
+                            streaks.append((habit_of(name, line)[0], *data))
+                        else:
+                            name, checked_off, day = cls._check(line, row)
+                            habit = habit_of(name, line)
+                            habit_id, start, length, last_index = habit
+                            if day < start:
+                                raise ValueError(f"Line {line}: Check-off date can't be earlier than the start date!")
+                            index = (day - start) // length
+                            if index <= last_index:
+                                raise ValueError(f"Line {line}: The habit {name} has already been checked-off during "
+                                                 f"the period!")
+                            habit[3] = index
+                            tracker.append((habit_id, checked_off, day))
+                            touched.add(habit_id)
+                        count += 1
+                        if len(tracker) >= size or len(streaks) >= size:
+                            flush()
+                    flush()
+                    if checkpoint and chunk:
+                        cur.execute("""
+                        INSERT INTO
+                        import_checkpoint(user_id, source, line)
+                        VALUES (?, ?, ?)
+                        ON CONFLICT(user_id, source) DO UPDATE SET line = excluded.line
+                        """, (user, source, chunk[-1][0]))
+        if checkpoint:
+            with DB.transaction(db):
+                cur.execute("DELETE FROM import_checkpoint WHERE user_id = ? AND source = ?", (user, source))
+        return count
+
+    @staticmethod
+    def checkpoint_of(db, source):
+        """
+        Returns the count of the source's lines, which have already been imported by the connection's user.
+
+        :param db: The database, to which you are connected.
+        :type db: class
+        :param source: The name of the imported file.
+        :type source: str
+        :return: Returns the count of lines, 0 if the source hasn't been imported yet.
+        :rtype: int
+        """
+        row = db.execute("SELECT line FROM import_checkpoint WHERE user_id = ? AND source = ?",
+                         (DB.user_of(db), source)).fetchone()
+        return row[0] if row else 0
+
+    @classmethod
+    def _habit(cls, line, row):
+        """
+        Validates the row of the Habit table.
+
+        :param line: The number of the row's line.
+        :type line: int
+        :param row: The values by the columns.
+        :type row: dict
+        :return: Returns the name, the description, the ordinals of the start and the expiration dates, the
+        periodicity, the status, the streak flag and the ordinals of the last check, of the end date and of the last
+        checked-off day.
+        :rtype: tuple
+        """
+        name = cls._name(line, row)
+        start_date = cls._day(line, row, "start_date", True)
+        valid_till = cls._day(line, row, "valid_till", True)
+        if valid_till < start_date:
+            raise ValueError(f"Line {line}: The expiration date can't be before the start date!")
+        periodicity = row.get("periodicity")
+        if periodicity not in Period.LENGTHS:
+            raise ValueError(f"Line {line}: There is no {periodicity} periodicity!")
+        status = row.get("status") or "Still in progress"
+        if status not in cls.STATUSES:
+            raise ValueError(f"Line {line}: There is no {status} status!")
+        last_check = cls._day(line, row, "last_check")
+        if last_check is not None and last_check < start_date:
+            raise ValueError(f"Line {line}: The last check can't be earlier than the start date!")
+        return (name, row.get("description") or "", start_date, valid_till, periodicity, status,
+                cls._number(line, row, "streak", 1), last_check, cls._day(line, row, "end_date"),
+                cls._day(line, row, "last_check_day"))
+
+    @classmethod
+    def _streak(cls, line, row):
+        """
+        Validates the row of the Streak table.
+
+        :param line: The number of the row's line.
+        :type line: int
+        :param row: The values by the columns.
+        :type row: dict
+        :return: Returns the name, the current streak, the longest streak, the break count and the ordinal of the last
+        break date.
+        :rtype: tuple
+        """
+        current_streak = cls._number(line, row, "current_streak")
+        longest_streak = cls._number(line, row, "longest_streak")
+        if longest_streak < current_streak:
+            raise ValueError(f"Line {line}: The longest streak can't be shorter than the current streak!")
+        return (cls._name(line, row), current_streak, longest_streak,
+                cls._number(line, row, "break_count"), cls._day(line, row, "last_break"))
+
+    @classmethod
+    def _check(cls, line, row):
+        """
+        Validates the row of the Tracker table.
+
+        :param line: The number of the row's line.
+        :type line: int
+        :param row: The values by the columns.
+        :type row: dict
+        :return: Returns the name, the check-off and the ordinal of the check-off date.
+        :rtype: tuple
+        """
+        return cls._name(line, row), cls._number(line, row, "checked_off", 1), cls._day(line, row, "date", True)
+
+    @staticmethod
+    def _name(line, row):
+        """
+        Returns the name of the habit of the row.
+
+        :param line: The number of the row's line.
+        :type line: int
+        :param row: The values by the columns.
+        :type row: dict
+        :return: Returns the name.
+        :rtype: str
+        """
+        name = row.get("name")
+        if not isinstance(name, str) or not name.strip():
+            raise ValueError(f"Line {line}: The habit has no name!")
+        return name
+
+    @staticmethod
+    def _day(line, row, column, required=False):
+        """
+        Returns the ordinal of the row's ISO date in the column.
+
+        :param line: The number of the row's line.
+        :type line: int
+        :param row: The values by the columns.
+        :type row: dict
+        :param column: The column.
+        :type column: str
+        :param required: Whether the date can't be empty (default False).
+        :type required: bool
+        :return: Returns the ordinal, or None if the date is empty.
+        :rtype: int
+        """
+        try:
+            day = DB.ordinal(row.get(column))
+        except (TypeError, ValueError):
+            raise ValueError(f"Line {line}: The {column} {row.get(column)!r} isn't a YYYY-MM-DD date!") from None
+        if required and day is None:
+            raise ValueError(f"Line {line}: The {column} is missing!")
+        return day
+
+    @staticmethod
+    def _number(line, row, column, maximum=None):
+        """
+        Returns the row's non-negative integer in the column, an empty value is 0.
+
+        :param line: The number of the row's line.
+        :type line: int
+        :param row: The values by the columns.
+        :type row: dict
+        :param column: The column.
+        :type column: str
+        :param maximum: The largest allowed value, if not passed, there is no limit (default None).
+        :type maximum: int
+        :return: Returns the integer.
+        :rtype: int
+        """
+        try:
+            number = int(row.get(column) or 0)
+        except (TypeError, ValueError):
+            number = -1
+        if number < 0 or maximum is not None and number > maximum:
+            raise ValueError(f"Line {line}: The {column} {row.get(column)!r} is out of range!")
+        return number
+
+    @classmethod
+    def _read(cls, file, format):
+        """
+        Yields the (table, row) pairs of the file's lines, the row maps the table's columns to the values.
+
+        :param file: The file opened for reading text.
+        :type file: class
+        :param format: The format, i.e. "jsonl" or "csv".
+        :type format: str
+        :return: Yields the pairs.
+        :rtype: generator
+        """
+        if format == "csv":
+            for line, row in enumerate(csv.reader(file), start=1):
+                if not row or row[0] not in cls.COLUMNS:
+                    raise ValueError(f"Line {line}: There is no table {row[0] if row else ''}!")
+                yield row[0], dict(zip(cls.COLUMNS[row[0]], (value if value != "" else None for value in row[1:])))
+        else:
+            for line, text in enumerate(file, start=1):
+                try:
+                    row = json.loads(text)
+                except ValueError:
+                    raise ValueError(f"Line {line}: The line isn't valid JSON!") from None
+                table = row.pop("table", None) if isinstance(row, dict) else None
+                if table not in cls.COLUMNS:
+                    raise ValueError(f"Line {line}: There is no table {table}!")
+                yield table, row